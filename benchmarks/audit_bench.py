@@ -0,0 +1,100 @@
+"""
+Audit log benchmark: measures the cost of AuditLogger.log() on the caller,
+batched insert throughput into a temporary copy of the database, and page
+latency when walking the log newest first with keyset pagination compared
+with LIMIT/OFFSET at the same depth.
+
+    python benchmarks/audit_bench.py --entries 2000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from realestate import audit, schema
+
+def synthetic_entries(n, admins, days, seed=3):
+    rng = random.Random(seed)
+    now = int(time.time())
+    start = now - days * 86400
+    step = days * 86400 / n
+    actions = list(audit.ACTIONS)
+    return [(int(start + i * step), f"admin{rng.randrange(admins)}", rng.choice(actions),
+             rng.randrange(1, 100_000), None) for i in range(n)]
+
+def page_latency(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2_000_000)
+    parser.add_argument("--admins", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--page-size", type=int, default=audit.AUDIT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="audit_bench_")
+    try:
+        db_file = os.path.join(workdir, "real_estate.db")
+        shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+        schema.init_database(db_file)
+
+        logger = audit.AuditLogger(db_file)
+        start = time.perf_counter()
+        for i in range(100_000):
+            logger.log("admin0", audit.VERIFY_OWNER, i)
+        print(f"log() on the caller: {(time.perf_counter() - start) * 1e6 / 100_000:.2f} us per entry")
+
+        entries = synthetic_entries(args.entries, args.admins, args.days)
+        conn = sqlite3.connect(db_file)
+        start = time.perf_counter()
+        for i in range(0, len(entries), audit.AUDIT_BATCH):
+            audit.write_entries(conn, entries[i:i + audit.AUDIT_BATCH])
+        elapsed = time.perf_counter() - start
+        print(f"batched insert: {args.entries:,} entries in {elapsed:.1f} s ({args.entries / elapsed:,.0f} entries/s)")
+        size = os.path.getsize(db_file) - os.path.getsize(os.path.join(REPO_DIR, "real_estate.db"))
+        print(f"storage: {size / args.entries:.0f} bytes per entry including indexes")
+
+        start = time.perf_counter()
+        one = audit.write_entries(conn, [(int(time.time()), "admin0", audit.VERIFY_OWNER, 1, None)])
+        print(f"single-entry transaction: {(time.perf_counter() - start) * 1000:.2f} ms ({one} entry)")
+
+        # Walk to a deep page with keyset cursors, then time that page both ways
+        depth = min(args.entries // args.page_size - 1, 10_000)
+        cursor = None
+        walk_start = time.perf_counter()
+        for _ in range(depth):
+            _, cursor = audit.audit_page(conn, limit=args.page_size, before=cursor)
+        walk = time.perf_counter() - walk_start
+        print(f"walked {depth:,} pages in {walk:.2f} s ({walk / depth * 1000:.2f} ms per page)")
+
+        first = page_latency(lambda: audit.audit_page(conn, limit=args.page_size))
+        deep = page_latency(lambda: audit.audit_page(conn, limit=args.page_size, before=cursor))
+        offset = page_latency(lambda: conn.execute("""
+            SELECT entry_id FROM AdminAudit ORDER BY logged_at DESC, entry_id DESC LIMIT ? OFFSET ?
+        """, (args.page_size, depth * args.page_size)).fetchall(), repeat=5)
+        print(f"page 1: {first:.2f} ms  page {depth + 1:,} keyset: {deep:.2f} ms  same page via OFFSET: {offset:.1f} ms")
+
+        day_start = int(time.time()) - 7 * 86400
+        ranged = page_latency(lambda: audit.audit_page(conn, start=day_start, end=day_start + 86400,
+                                                       actor="admin3", limit=args.page_size))
+        print(f"one admin, one day: {ranged:.2f} ms")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Multi-process deployment benchmark: runs 1, 2, 4 and 8 worker processes,
+each acting like an app process serving customers (mostly listing searches,
+some reserve-then-cancel checkouts), against a temporary copy of the
+database. Compares workers that each keep a private listing cache and
+write directly with workers that share a coordinator (one listing cache,
+one writer connection), reporting throughput, write latency and how many
+writes failed with "database is locked".
+
+    python benchmarks/cluster_bench.py --seconds 10 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import secrets
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from realestate import coordinator, listing_cache, schema, writer
+from realestate.db import create_connection
+
+FILTERS = [("rent", t, lo, hi) for t in ("All", "apartment", "villa", "room")
+           for lo, hi in ((0, 0), (1000, 0), (0, 3000))]
+
+def worker(db_file, address, authkey, seconds, write_share, seed, start_event, results):
+    rng = random.Random(seed)
+    conn = create_connection(db_file)
+    if address:
+        client = coordinator.CoordinatorClient(address, authkey)
+        cache, write = client, client.write
+    else:
+        cache = listing_cache.ListingCache()
+        def write(name, *args):
+            return writer.WRITE_OPERATIONS[name](conn, *args)
+    cur = conn.cursor()
+    cur.execute("SELECT property_id, rent FROM Property WHERE sale_renting = 'rent'")
+    rentals = cur.fetchall()
+    cur.execute("SELECT customer_id FROM Customer")
+    customers = [row[0] for row in cur.fetchall()]
+    searches = writes = locked = 0
+    write_ms = []
+    start_event.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if rng.random() < write_share:
+            property_id, rent = rng.choice(rentals)
+            customer_id = rng.choice(customers)
+            start = time.perf_counter()
+            try:
+                receipt_id = write("hold_property", customer_id, property_id, rent)
+                if receipt_id is not None:
+                    write("cancel_hold", customer_id, receipt_id)
+                writes += 1
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                locked += 1
+            write_ms.append((time.perf_counter() - start) * 1000)
+        else:
+            cache.search(conn, *rng.choice(FILTERS))
+            searches += 1
+    results.put((searches, writes, locked, write_ms))
+
+def run(db_file, address, authkey, processes, seconds, write_share):
+    ctx = multiprocessing.get_context("spawn")
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    workers = [ctx.Process(target=worker, args=(db_file, address, authkey, seconds, write_share, seed, start_event, results))
+               for seed in range(processes)]
+    for p in workers:
+        p.start()
+    time.sleep(1.0 + 0.3 * processes)  # let the workers import and connect
+    start_event.set()
+    totals = [results.get() for _ in workers]
+    for p in workers:
+        p.join()
+    searches = sum(t[0] for t in totals)
+    writes = sum(t[1] for t in totals)
+    locked = sum(t[2] for t in totals)
+    write_ms = sorted(ms for t in totals for ms in t[3])
+    p99 = write_ms[int(len(write_ms) * 0.99)] if write_ms else 0
+    return searches / seconds, writes / seconds, locked, statistics.median(write_ms) if write_ms else 0, p99
+
+def serve(address, authkey, db_file):
+    coordinator.Coordinator(address, authkey, db_file=db_file).serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-share", type=float, default=0.1, help="share of operations that are checkouts")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cluster_bench_")
+    authkey = secrets.token_bytes(32)
+    try:
+        print(f"{'mode':<12}{'workers':>8}{'searches/s':>12}{'checkouts/s':>13}{'locked':>8}"
+              f"{'write p50 ms':>14}{'write p99 ms':>14}")
+        for mode in ("direct", "coordinated"):
+            for processes in args.workers:
+                db_file = os.path.join(workdir, f"{mode}_{processes}.db")
+                shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+                schema.init_database(db_file)
+                server = None
+                address = None
+                if mode == "coordinated":
+                    address = os.path.join(workdir, "coordinator.sock")
+                    server = multiprocessing.get_context("spawn").Process(target=serve, args=(address, authkey, db_file), daemon=True)
+                    server.start()
+                    while not os.path.exists(address):
+                        time.sleep(0.05)
+                searches, writes, locked, p50, p99 = run(db_file, address, authkey, processes, args.seconds, args.write_share)
+                if server is not None:
+                    server.terminate()
+                    server.join()
+                    os.remove(address)
+                print(f"{mode:<12}{processes:>8}{searches:>12,.0f}{writes:>13,.0f}{locked:>8}{p50:>14.2f}{p99:>14.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Roommate matching benchmark: solves a synthetic batch of applicants and
+rooms in memory, then runs match_pending() end to end against a temporary
+copy of the database (full batch, followed by an incremental run for a few
+newly queued customers).
+
+    python benchmarks/matching_bench.py --applicants 20000 --rooms 10000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from realestate import matching, schema
+
+ID_OFFSET = 1_000_000  # keeps synthetic rows clear of the seed data
+
+def synthetic_problem(applicants, rooms, cities, seed=7):
+    rng = random.Random(seed)
+    city_names = [f"city {i}" for i in range(cities)]
+    room_rows = [{
+        "room_id": ID_OFFSET + i,
+        "monthly_rent": float(rng.randint(300, 2_000)),
+        "total_beds": rng.randint(2, 6),
+        "city": rng.choice(city_names),
+    } for i in range(rooms)]
+    for room in room_rows:
+        room["available_beds"] = rng.randint(1, room["total_beds"])
+    preferences, shortlists = {}, {}
+    for i in range(applicants):
+        customer_id = ID_OFFSET + i
+        if rng.random() < 0.9:
+            preferences[customer_id] = (
+                rng.choice(city_names) if rng.random() < 0.8 else None,
+                float(rng.randint(400, 2_000)),
+                None,
+                rng.choice([None, None, 4]),
+            )
+        else:
+            preferences[customer_id] = None
+        shortlists[customer_id] = [room["room_id"] for room in rng.sample(room_rows, rng.randint(0, 3))]
+    return preferences, shortlists, room_rows
+
+def load_into_database(conn, preferences, shortlists, rooms):
+    cur = conn.cursor()
+    cur.executemany("""
+        INSERT INTO Property (property_id, owner_id, property_type, sale_renting, cost, street, city, pin, area, rent)
+        VALUES (?, 1, 'apartment', 'rent', 0, 'Bench St', ?, '00000', 800, ?)
+    """, [(room["room_id"], room["city"], room["monthly_rent"] * room["total_beds"]) for room in rooms])
+    cur.executemany("""
+        INSERT INTO SharedRoom (room_id, property_id, monthly_rent, total_beds, available_beds)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(room["room_id"], room["room_id"], room["monthly_rent"], room["total_beds"], room["available_beds"])
+          for room in rooms])
+    cur.executemany("""
+        INSERT INTO Customer (customer_id, username, first_name, last_name, email)
+        VALUES (?, ?, 'Bench', 'Customer', ?)
+    """, [(cid, f"bench{cid}", f"bench{cid}@example.com") for cid in preferences])
+    cur.executemany("""
+        INSERT INTO RoommatePreference (customer_id, city, max_rent, min_beds, max_beds) VALUES (?, ?, ?, ?, ?)
+    """, [(cid,) + pref for cid, pref in preferences.items() if pref is not None])
+    cur.executemany("INSERT INTO Interested_In_Sharing (customer_id, room_id) VALUES (?, ?)",
+                    [(cid, room_id) for cid, room_ids in shortlists.items() for room_id in room_ids])
+    conn.commit()
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applicants", type=int, default=20_000)
+    parser.add_argument("--rooms", type=int, default=10_000)
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--incremental", type=int, default=100, help="customers queued after the full run")
+    args = parser.parse_args()
+
+    preferences, shortlists, rooms = synthetic_problem(args.applicants, args.rooms, args.cities)
+    beds = sum(room["available_beds"] for room in rooms)
+    print(f"applicants: {args.applicants:,}  rooms: {args.rooms:,}  free beds: {beds:,}  cities: {args.cities}")
+
+    catalog, catalog_s = timed(matching.RoomCatalog, rooms)
+    candidates, candidates_s = timed(lambda: {
+        cid: catalog.candidates(pref, shortlists.get(cid, ())) for cid, pref in preferences.items()
+    })
+    edges = sum(len(options) for options in candidates.values())
+    capacity = {room["room_id"]: room["available_beds"] for room in rooms}
+    assignment, auction_s = timed(matching.auction_assign, candidates, capacity)
+    score = sum(candidates[cid][room_id] for cid, room_id in assignment.items())
+    solve_s = catalog_s + candidates_s + auction_s
+    print(f"candidates: {edges:,} edges in {candidates_s:.2f} s (catalog {catalog_s * 1000:.0f} ms)")
+    print(f"auction: placed {len(assignment):,} (total score {score:,.1f}) in {auction_s:.2f} s")
+    print(f"in-memory solve: {args.applicants / solve_s:,.0f} applicants/s")
+
+    workdir = tempfile.mkdtemp(prefix="matching_bench_")
+    try:
+        db_file = os.path.join(workdir, "real_estate.db")
+        shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+        schema.init_database(db_file)
+        conn = sqlite3.connect(db_file)
+        load_into_database(conn, preferences, shortlists, rooms)
+
+        result, _ = timed(matching.match_pending, conn)
+        print(f"full run (database): placed {result['placed']:,} of {result['waiting']:,} "
+              f"in {result['seconds']:.2f} s ({result['waiting'] / result['seconds']:,.0f} applicants/s)")
+
+        # New interest rows queue only their customers; everyone else still waiting rejoins the auction
+        cur = conn.cursor()
+        cur.execute("SELECT customer_id FROM Customer WHERE customer_id >= ? LIMIT ?", (ID_OFFSET, args.incremental))
+        newcomers = [row[0] + args.applicants for row in cur.fetchall()]
+        load_into_database(conn, {cid: (None, 2_000.0, None, None) for cid in newcomers}, {}, [])
+        result, _ = timed(matching.match_pending, conn)
+        print(f"incremental run after {len(newcomers)} new preferences: placed {result['placed']:,} "
+              f"of {result['waiting']:,} waiting in {result['seconds'] * 1000:.0f} ms")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
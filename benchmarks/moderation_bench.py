@@ -0,0 +1,104 @@
+"""
+Homeowner moderation benchmark: adds synthetic pending owners to a
+temporary copy of the database, then times approving a selection one owner
+per transaction (the old per-owner update) against set_verification_statuses()
+for the same batch sizes, and the pending queue's page latency with keyset
+pagination compared with LIMIT/OFFSET at the same depth.
+
+    python benchmarks/moderation_bench.py --owners 100000 --batches 1000 5000 20000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from realestate import moderation, schema
+from realestate.repository import users
+
+FIRST_OWNER_ID = 1_000_000
+
+def add_pending_owners(conn, n):
+    credentials = [(f"pending{i}", "pw", "owner") for i in range(n)]
+    owners = [(FIRST_OWNER_ID + i, f"pending{i}", "Pending", f"Owner{i}", f"pending{i}@example.com", "555")
+              for i in range(n)]
+    conn.executemany("INSERT INTO Credentials (username, password, user_type) VALUES (?, ?, ?)", credentials)
+    conn.executemany("""
+        INSERT INTO HomeOwner (owner_id, username, first_name, last_name, email, phone_number, verification_status)
+        VALUES (?, ?, ?, ?, ?, ?, 'pending')
+    """, owners)
+    conn.commit()
+
+def page_latency(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--owners", type=int, default=100_000, help="synthetic pending owners")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--single-limit", type=int, default=5000,
+                        help="largest batch also timed one owner per transaction")
+    parser.add_argument("--page-size", type=int, default=moderation.MODERATION_PAGE_SIZE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="moderation_bench_")
+    try:
+        db_file = os.path.join(workdir, "real_estate.db")
+        shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+        schema.init_database(db_file)
+        conn = sqlite3.connect(db_file)
+        conn.row_factory = sqlite3.Row
+        start = time.perf_counter()
+        add_pending_owners(conn, args.owners)
+        print(f"added {args.owners:,} pending owners in {time.perf_counter() - start:.1f} s")
+
+        # Walk the pending queue to a deep page, then time that page both ways
+        depth = min(args.owners // args.page_size - 1, 500)
+        cursor = None
+        for _ in range(depth):
+            _, cursor = moderation.moderation_page(conn, "pending", after=cursor, limit=args.page_size)
+        first = page_latency(lambda: moderation.moderation_page(conn, "pending", limit=args.page_size))
+        deep = page_latency(lambda: moderation.moderation_page(conn, "pending", after=cursor, limit=args.page_size))
+        offset = page_latency(lambda: conn.execute("""
+            SELECT * FROM HomeOwner WHERE verification_status = 'pending' ORDER BY owner_id LIMIT ? OFFSET ?
+        """, (args.page_size, depth * args.page_size)).fetchall(), repeat=5)
+        searched = page_latency(lambda: moderation.moderation_page(conn, "pending", search="Owner4242",
+                                                                   limit=args.page_size), repeat=5)
+        print(f"page 1: {first:.2f} ms  page {depth + 1:,} keyset: {deep:.2f} ms  "
+              f"same page via OFFSET: {offset:.2f} ms  name search: {searched:.1f} ms")
+
+        print(f"{'batch':>8}{'mode':>10}{'seconds':>10}{'owners/s':>12}")
+        next_id = FIRST_OWNER_ID
+        for size in args.batches:
+            modes = ("single", "bulk") if size <= args.single_limit else ("bulk",)
+            for mode in modes:
+                owner_ids = list(range(next_id, next_id + size))
+                next_id += size
+                if next_id > FIRST_OWNER_ID + args.owners:
+                    raise SystemExit("not enough pending owners left; raise --owners")
+                start = time.perf_counter()
+                if mode == "single":
+                    for owner_id in owner_ids:
+                        users.set_verification_status(conn, owner_id, "verified")
+                else:
+                    changed = moderation.set_verification_statuses(conn, owner_ids, "verified")
+                    assert len(changed) == size
+                elapsed = time.perf_counter() - start
+                print(f"{size:>8,}{mode:>10}{elapsed:>10.2f}{size / elapsed:>12,.0f}")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
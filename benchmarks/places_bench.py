@@ -0,0 +1,117 @@
+"""
+Place autocomplete benchmark: builds a PlaceTrie over synthetic street
+names (a skewed number of properties per name), reports build time and
+memory, then the latency of prefix completion, completion of misspelled
+prefixes, and resolve() of exact names and typos. Finally times
+PlaceIndex's incremental refresh after a few property edits on a temporary
+copy of the database.
+
+    python benchmarks/places_bench.py --names 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from realestate import places, schema
+from realestate.db import create_connection
+
+SYLLABLES = ["ba", "ran", "kor", "mal", "vi", "sha", "pur", "nag", "del", "hi", "che", "nai",
+             "lu", "ko", "ta", "mum", "jay", "sun", "dar", "gao", "ven", "kat", "ri", "am"]
+SUFFIXES = ["Street", "Road", "Lane", "Avenue", "Nagar", "Marg", "Cross", "Main Road"]
+
+def synthetic_names(n, seed=7):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        names.add(f"{word} {rng.choice(SUFFIXES)}" + (f" {rng.randint(1, 9)}" if rng.random() < 0.3 else ""))
+    return sorted(names)
+
+def typo(rng, text):
+    i = rng.randrange(1, len(text) - 1)
+    if rng.random() < 0.5:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]   # transposition
+    return text[:i] + rng.choice("aeiou") + text[i + 1:]          # substitution
+
+def latency_us(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100_000, help="distinct names in the trie")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(11)
+
+    names = synthetic_names(args.names)
+    counts = [max(1, int(rng.paretovariate(1.2))) for _ in names]
+    def build():
+        trie = places.PlaceTrie()
+        for name, n in zip(names, counts):
+            trie.add(name, n)
+        return trie
+    start = time.perf_counter()
+    trie = build()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    copy = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copy
+    print(f"built {len(trie):,} names in {elapsed:.2f} s, {memory / 2**20:.0f} MiB")
+
+    sample = [rng.choice(names) for _ in range(args.queries)]
+    prefixes = [name[:rng.randint(2, 8)] for name in sample]
+    cases = [
+        ("complete, first lookup of prefix", trie.complete, prefixes),
+        ("complete, repeated prefix", trie.complete, prefixes),
+        ("complete, misspelled prefix", trie.complete, [typo(rng, name[:rng.randint(6, 10)]) for name in sample]),
+        ("resolve, known name", trie.resolve, sample),
+        ("resolve, typo", trie.resolve, [typo(rng, name) for name in sample]),
+    ]
+    print(f"{'lookup':<36}{'p50 us':>10}{'p99 us':>10}")
+    for label, fn, queries in cases:
+        p50, p99 = latency_us(fn, queries)
+        print(f"{label:<36}{p50:>10.1f}{p99:>10.1f}")
+
+    workdir = tempfile.mkdtemp(prefix="places_bench_")
+    try:
+        db_file = os.path.join(workdir, "real_estate.db")
+        shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+        schema.init_database(db_file)
+        conn = create_connection(db_file)
+        index = places.PlaceIndex()
+        start = time.perf_counter()
+        index.refresh(conn)
+        print(f"PlaceIndex load from Property: {(time.perf_counter() - start) * 1000:.2f} ms {index.stats()}")
+        property_ids = [row[0] for row in conn.execute("SELECT property_id FROM Property LIMIT 5")]
+        conn.executemany("UPDATE Property SET street = street || ' East' WHERE property_id = ?",
+                         [(property_id,) for property_id in property_ids])
+        conn.commit()
+        start = time.perf_counter()
+        reread = index.refresh(conn)
+        print(f"incremental refresh after editing {reread} properties: {(time.perf_counter() - start) * 1000:.2f} ms")
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"database part skipped: {e}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Price estimation benchmark: fits the stratified least-squares models on
+synthetic listings in memory, measures batch and single predictions, then
+rebuilds the models from a temporary copy of the database holding the same
+listings and times an incremental refit after a handful of edits.
+
+    python benchmarks/pricing_bench.py --rows 1000000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import numpy as np
+
+from realestate import pricing, schema
+
+PROPERTY_TYPES = ["apartment", "house", "condo", "villa", "room"]
+ID_OFFSET = 1_000_000  # keeps synthetic rows clear of the seed data
+
+def synthetic_listings(n, cities, seed=7):
+    """Column arrays for n listings priced by a known log-linear rule plus noise."""
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, cities, n)
+    ptype = rng.integers(0, len(PROPERTY_TYPES), n)
+    kind = rng.integers(0, 2, n)  # 0 = rent, 1 = sale
+    area = rng.uniform(200, 5_000, n)
+    amenities = rng.integers(0, 6, n)
+    city_effect = rng.normal(0, 0.3, cities)[city]
+    log_price = np.where(kind == 0, 1.5, 6.0) + 0.8 * np.log(area) + 0.05 * amenities + city_effect
+    price = np.exp(log_price + rng.normal(0, 0.15, n))
+    return kind, city, ptype, area, amenities, price
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def load_into_database(conn, listings):
+    kind, city, ptype, area, amenities, price = listings
+    cur = conn.cursor()
+    # Bulk load without the per-row maintenance triggers; init_database() recreates them
+    cur.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'Property'")
+    for (name,) in cur.fetchall():
+        cur.execute(f"DROP TRIGGER {name}")
+    names = ["pool", "gym", "parking", "balcony", "garden"]
+    cur.executemany("""
+        INSERT INTO Property (property_id, owner_id, property_type, sale_renting, cost, street, city, pin, area, rent, amenities)
+        VALUES (?, 1, ?, ?, ?, 'Bench St', ?, '00000', ?, ?, ?)
+    """, ((ID_OFFSET + i, PROPERTY_TYPES[ptype[i]], "rent" if kind[i] == 0 else "sale",
+           0 if kind[i] == 0 else int(price[i]), f"City {city[i]}", float(area[i]),
+           float(round(price[i], 2)) if kind[i] == 0 else 0, ", ".join(names[:amenities[i]]))
+          for i in range(len(kind))))
+    conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=20, help="listings changed before the incremental refit")
+    args = parser.parse_args()
+
+    listings = synthetic_listings(args.rows, args.cities)
+    kind, city, ptype, area, amenities, price = listings
+    X = pricing.design_matrix(area, amenities)
+    y = np.log(price)
+    groups = (kind * args.cities + city) * len(PROPERTY_TYPES) + ptype
+    (counts, stats), stats_s = timed(pricing.grouped_stats, groups, X, y)
+    (beta, residual_std), solve_s = timed(pricing.solve_models, counts, stats)
+    print(f"rows: {args.rows:,}  strata: {len(counts):,}")
+    print(f"fit: sufficient statistics {stats_s * 1000:.0f} ms + batched solve {solve_s * 1000:.1f} ms")
+
+    _, predict_s = timed(lambda: np.exp(np.einsum("ij,ij->i", X, beta[groups])))
+    print(f"batch predict: {args.rows / predict_s / 1e6:.1f} M rows/s ({predict_s * 1000:.0f} ms)")
+
+    workdir = tempfile.mkdtemp(prefix="pricing_bench_")
+    try:
+        db_file = os.path.join(workdir, "real_estate.db")
+        shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+        schema.init_database(db_file)
+        conn = sqlite3.connect(db_file)
+        _, load_s = timed(load_into_database, conn, listings)
+        conn.close()
+        schema.init_database(db_file)
+        conn = sqlite3.connect(db_file)
+        print(f"database load: {load_s:.1f} s")
+
+        estimator = pricing.PriceEstimator(db_file)
+        _, rebuild_s = timed(estimator.rebuild, conn)
+        print(f"full rebuild from database: {rebuild_s:.2f} s ({len(estimator.models):,} models)")
+
+        latencies = []
+        rng = np.random.default_rng(1)
+        for _ in range(1_000):
+            c, t = int(rng.integers(0, args.cities)), PROPERTY_TYPES[rng.integers(0, len(PROPERTY_TYPES))]
+            _, elapsed = timed(estimator.estimate, "rent", f"City {c}", t, float(rng.uniform(200, 5_000)), "pool, gym")
+            latencies.append(elapsed * 1e6)
+        print(f"single estimate: p50 {statistics.median(latencies):.0f} us")
+
+        ids = rng.choice(args.rows, size=args.edits, replace=False) + ID_OFFSET
+        conn.executemany("UPDATE Property SET area = area * 1.1 WHERE property_id = ?", [(int(i),) for i in ids])
+        conn.commit()
+        strata, refresh_s = timed(estimator.refresh, conn)
+        print(f"incremental refit after {args.edits} edits: {strata} strata rescanned in {refresh_s * 1000:.0f} ms")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
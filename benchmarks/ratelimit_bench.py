@@ -0,0 +1,97 @@
+"""
+Login rate limiter benchmark: replays a credential-stuffing storm (a few
+attacking clients cycling through many usernames, mixed with legitimate
+users) through LoginRateLimiter, and compares the limiter's per-attempt
+cost with the Credentials lookup it saves. Also times LRU eviction at the
+key cap and a save/load round trip of the persisted state.
+
+    python benchmarks/ratelimit_bench.py --attempts 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from realestate import ratelimit
+from realestate.repository import users
+
+def storm(n, usernames, attackers, legit_share, seed=11):
+    """(username, client) attempts: attackers spray usernames, legit users come from their own address."""
+    rng = random.Random(seed)
+    attempts = []
+    for _ in range(n):
+        if rng.random() < legit_share:
+            user = rng.randrange(1_000)
+            attempts.append((f"user{user}", f"10.1.{user // 256}.{user % 256}"))
+        else:
+            attempts.append((f"user{rng.randrange(usernames)}", f"203.0.113.{rng.randrange(attackers)}"))
+    return attempts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=1_000_000)
+    parser.add_argument("--usernames", type=int, default=200_000, help="distinct usernames sprayed by attackers")
+    parser.add_argument("--attackers", type=int, default=50)
+    parser.add_argument("--legit-share", type=float, default=0.01)
+    parser.add_argument("--max-keys", type=int, default=ratelimit.MAX_TRACKED_KEYS)
+    args = parser.parse_args()
+
+    attempts = storm(args.attempts, args.usernames, args.attackers, args.legit_share)
+    # Replay the storm over one simulated minute so buckets refill realistically
+    clock = [time.time()]
+    limiter = ratelimit.LoginRateLimiter(max_keys=args.max_keys, clock=lambda: clock[0])
+    step = 60.0 / args.attempts
+    allowed = legit = legit_allowed = 0
+    start = time.perf_counter()
+    for username, client in attempts:
+        clock[0] += step
+        ok = limiter.attempt(username, client)[0]
+        allowed += ok
+        if client.startswith("10."):
+            legit += 1
+            legit_allowed += ok
+    elapsed = time.perf_counter() - start
+    print(f"storm: {args.attempts:,} attempts, {allowed:,} reached the database ({allowed / args.attempts:.2%}); "
+          f"legitimate users got through {legit_allowed / max(legit, 1):.1%} of the time")
+    print(f"limiter: {elapsed / args.attempts * 1e6:.2f} us per attempt ({args.attempts / elapsed:,.0f} attempts/s)")
+    print(f"tracked keys: {len(limiter.usernames.buckets):,} usernames, {len(limiter.clients.buckets):,} clients "
+          f"(cap {args.max_keys:,})")
+
+    workdir = tempfile.mkdtemp(prefix="ratelimit_bench_")
+    try:
+        db_file = os.path.join(workdir, "real_estate.db")
+        shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+        conn = sqlite3.connect(db_file)
+        sample = attempts[:20_000]
+        start = time.perf_counter()
+        for username, _ in sample:
+            users.check_credentials(conn, username, "wrong-password")
+        per_query = (time.perf_counter() - start) / len(sample)
+        conn.close()
+        print(f"credentials lookup: {per_query * 1e6:.2f} us per attempt; "
+              f"without the limiter the storm costs {per_query * args.attempts:.1f} s of database time, "
+              f"with it {per_query * allowed + elapsed:.1f} s including the limiter")
+
+        state_file = os.path.join(workdir, "limits.json")
+        limiter.state_file = state_file
+        start = time.perf_counter()
+        limiter.save()
+        save_s = time.perf_counter() - start
+        start = time.perf_counter()
+        restored = ratelimit.LoginRateLimiter(state_file=state_file, max_keys=args.max_keys)
+        load_s = time.perf_counter() - start
+        print(f"persistence: save {save_s * 1000:.0f} ms, load {load_s * 1000:.0f} ms, "
+              f"{len(restored.usernames.buckets) + len(restored.clients.buckets):,} buckets, "
+              f"{os.path.getsize(state_file) / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Similar-listings benchmark: builds a kNN index over synthetic listings and
+measures single-query latency, neighbour-list computation throughput and
+the cost of an incremental update.
+
+    python benchmarks/recommend_bench.py --listings 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from realestate.recommend import PROPERTY_TYPES, SimilarityIndex
+
+AMENITIES = ["pool", "gym", "parking", "balcony", "garden", "elevator", "laundry", "wifi",
+             "air conditioning", "fireplace", "security", "pet friendly"]
+
+def synthetic_listings(n, cities=500, seed=7):
+    rng = random.Random(seed)
+    city_names = [f"City {i}" for i in range(cities)]
+    rows = []
+    for pid in range(1, n + 1):
+        sale_renting = rng.choice(["rent", "sale"])
+        rows.append({
+            "property_id": pid,
+            "property_type": rng.choice(PROPERTY_TYPES),
+            "sale_renting": sale_renting,
+            "cost": rng.randint(50_000, 2_000_000),
+            "rent": rng.randint(300, 8_000),
+            "area": rng.uniform(200, 5_000),
+            "city": rng.choice(city_names),
+            "coord_X": rng.uniform(-90, 90),
+            "coord_Y": rng.uniform(-180, 180),
+            "amenities": ", ".join(rng.sample(AMENITIES, rng.randint(0, 5))),
+        })
+    return rows
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = synthetic_listings(args.listings)
+    index = SimilarityIndex(args.k)
+    _, build_s = timed(index.build, rows)
+    print(f"listings: {len(index):,}  features: {index.X.shape[1]}  matrix: {index.X.nbytes / 1e6:.1f} MB")
+    print(f"build (fit + transform): {build_s:.2f} s")
+
+    rng = np.random.default_rng(0)
+    latencies = []
+    for pid in rng.integers(1, args.listings + 1, args.queries):
+        vector = index.X[index.position[int(pid)]]
+        _, elapsed = timed(index.query, vector, exclude_id=pid)
+        latencies.append(elapsed * 1000)
+    latencies.sort()
+    print(f"single query: p50 {statistics.median(latencies):.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms")
+
+    sample = rng.choice(len(index), size=min(2_000, len(index)), replace=False)
+    _, batch_s = timed(lambda: list(index.neighbours_for_positions(sample)))
+    per_row_ms = batch_s / len(sample) * 1000
+    print(f"neighbour lists: {len(sample) / batch_s:,.0f} rows/s "
+          f"(full table for {len(index):,} listings ~ {per_row_ms * len(index) / 1000:.0f} s)")
+
+    changed = synthetic_listings(10, seed=99)
+    for i, row in enumerate(changed):
+        row["property_id"] = int(rng.integers(1, args.listings + 1))
+    def incremental():
+        index.upsert(changed)
+        vectors = index.X[[index.position[row["property_id"]] for row in changed]]
+        within = (np.sqrt(index.distances(vectors)) < index.radius[None, :]).any(axis=0)
+        return int(within.sum())
+    _, upsert_s = timed(incremental)
+    print(f"incremental update of {len(changed)} listings (upsert + affected scan): {upsert_s * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
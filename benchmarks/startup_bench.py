@@ -0,0 +1,117 @@
+"""
+Startup benchmark for the Streamlit entry point.
+
+Runs final.py's login page in a fresh interpreter with `-X importtime`,
+reports the packages that take longest to import and the time to first
+render (process start until main() has drawn the login page), and whether
+pandas/plotly.express/numpy were imported on that path. Each run is made against a temporary copy of
+real_estate.db so background jobs never touch the real database.
+
+    python benchmarks/startup_bench.py --runs 5 --record benchmarks/startup_history.jsonl
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in the child process. Streamlit runs in "bare" mode here, which
+# is enough to exercise the same code path as a real first page load.
+CHILD_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import final
+try:
+    final.main()
+except BaseException:
+    pass  # st.stop() ends the login page
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "render_seconds": elapsed,
+    "pandas_loaded": "pandas" in sys.modules,
+    "plotly_loaded": "plotly.express" in sys.modules,
+    "numpy_loaded": "numpy" in sys.modules,
+}}))
+"""
+
+def parse_importtime(stderr):
+    """Return {top-level package: microseconds spent in its own modules} from -X importtime output."""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        # Self time is exclusive of nested imports, so summing it per
+        # package attributes every microsecond exactly once.
+        self_us, name = int(parts[0]), parts[2]
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+def run_once(workdir):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT.format(repo=REPO_DIR)],
+        cwd=workdir, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    result = None
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            result = json.loads(line)
+            break
+    if result is None:
+        raise RuntimeError(f"benchmark child failed:\n{proc.stderr[-2000:]}")
+    result["wall_seconds"] = wall
+    result["imports"] = parse_importtime(proc.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to show")
+    parser.add_argument("--record", help="append a summary line to this JSONL file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="startup_bench_")
+    try:
+        shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), workdir)
+        runs = [run_once(workdir) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    render = [r["render_seconds"] for r in runs]
+    wall = [r["wall_seconds"] for r in runs]
+    print(f"runs: {len(runs)}")
+    print(f"time to first render: median {statistics.median(render) * 1000:.1f} ms, min {min(render) * 1000:.1f} ms")
+    print(f"process wall time:    median {statistics.median(wall) * 1000:.1f} ms")
+    print(f"pandas imported on login path: {runs[-1]['pandas_loaded']}")
+    print(f"plotly.express imported on login path: {runs[-1]['plotly_loaded']}")
+    print(f"numpy imported on login path: {runs[-1]['numpy_loaded']}")
+    print("\nslowest packages to import (last run, self time):")
+    imports = sorted(runs[-1]["imports"].items(), key=lambda kv: kv[1], reverse=True)
+    for name, us in imports[:args.top]:
+        print(f"  {name:<30} {us / 1000:8.1f} ms")
+
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "render_ms_median": round(statistics.median(render) * 1000, 1),
+                "wall_ms_median": round(statistics.median(wall) * 1000, 1),
+                "pandas_loaded": runs[-1]["pandas_loaded"],
+                "plotly_loaded": runs[-1]["plotly_loaded"],
+                "numpy_loaded": runs[-1]["numpy_loaded"],
+            }) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Group commit benchmark: concurrent callers (threads, like Streamlit
+sessions) each run a stream of app writes (signups, reserve-then-cancel
+checkouts, shortlists) against a temporary copy of the database, either
+committing every write on their own connection, through a WriteQueue that
+commits one job at a time, or through a WriteQueue that group-commits.
+Reports writes/s, caller latency and jobs per commit.
+
+    python benchmarks/writer_bench.py --writes 2000 --callers 1 8 32
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from realestate import schema, writer
+from realestate.db import create_connection
+from realestate.repository import bookings, shared_rooms, users
+
+def caller(run_write, ids, writes, seed, latencies, errors):
+    rng = random.Random(seed)
+    rentals, customers, rooms = ids
+    for i in range(writes):
+        start = time.perf_counter()
+        try:
+            kind = i % 3
+            if kind == 0:
+                run_write(users.create_customer, f"bench{seed}_{i}", "pw", "Bench", "User", f"bench{seed}_{i}@example.com", "555")
+            elif kind == 1:
+                property_id, rent = rng.choice(rentals)
+                customer_id = rng.choice(customers)
+                receipt_id = run_write(bookings.hold_property, customer_id, property_id, rent)
+                if receipt_id is not None:
+                    run_write(bookings.cancel_hold, customer_id, receipt_id)
+            else:
+                run_write(shared_rooms.shortlist_room, rng.choice(customers), rng.choice(rooms))
+        except sqlite3.OperationalError:
+            errors.append(1)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+def run(db_file, mode, callers, writes):
+    conn = create_connection(db_file)
+    ids = (
+        [tuple(row) for row in conn.execute("SELECT property_id, rent FROM Property WHERE sale_renting = 'rent'")],
+        [row[0] for row in conn.execute("SELECT customer_id FROM Customer")],
+        [row[0] for row in conn.execute("SELECT room_id FROM SharedRoom")],
+    )
+    conn.close()
+    queue = None
+    if mode == "direct":
+        local = threading.local()
+        def run_write(fn, *args):
+            if not hasattr(local, "conn"):
+                local.conn = create_connection(db_file)
+            return fn(local.conn, *args)
+    else:
+        queue = writer.WriteQueue(db_file, max_jobs=1 if mode == "serial" else writer.GROUP_COMMIT_MAX_JOBS)
+        queue.start()
+        run_write = queue.call
+    latencies, errors = [], []
+    threads = [threading.Thread(target=caller, args=(run_write, ids, writes // callers, seed, latencies, errors))
+               for seed in range(callers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    per_commit = None
+    if queue is not None:
+        per_commit = queue.stats()["jobs_per_commit"]
+        queue.stop()
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)], \
+        len(errors), per_commit
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=2000, help="writes per run, split across callers")
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--wal", action="store_true", help="run with journal_mode=WAL")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="writer_bench_")
+    try:
+        print(f"{'mode':<8}{'callers':>8}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'locked':>8}{'jobs/commit':>13}")
+        for mode in ("direct", "serial", "group"):
+            for callers in args.callers:
+                db_file = os.path.join(workdir, f"{mode}_{callers}.db")
+                shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), db_file)
+                schema.init_database(db_file)
+                if args.wal:
+                    conn = sqlite3.connect(db_file)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.close()
+                rate, p50, p99, locked, per_commit = run(db_file, mode, callers, args.writes)
+                print(f"{mode:<8}{callers:>8}{rate:>10,.0f}{p50:>9.2f}{p99:>9.2f}{locked:>8}"
+                      f"{'-' if per_commit is None else f'{per_commit:.1f}':>13}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,26 @@
 import streamlit as st
+import atexit
+import contextlib
+import datetime
+import os
 import sqlite3
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import time
+
+from realestate import archive, audit, blobs, changes, coordinator, db, holds, images, listing_cache, maintenance, matching, moderation, outbox, places, portfolio, pricing, ratelimit, recommend, replica, rollups, schema, writer
+from realestate.lazy import LazyModule, pd
+from realestate.repository import bookings, properties, reports, shared_rooms, users
+
+px = LazyModule("plotly.express")
+
+LISTING_REFRESH_SECONDS = 10  # how often listing grids check the change log for updates
+# Where browsers reach the thumbnail proxy (python -m realestate.images); when
+# unset, cards use the original photo URLs and no proxy is started
+IMAGE_PROXY_URL = os.environ.get("IMAGE_PROXY_URL")
+# Set when several app processes share a coordinator (python -m realestate.coordinator)
+COORDINATOR_ADDRESS = os.environ.get("REALESTATE_COORDINATOR")
+# Reverse proxies whose X-Forwarded-For is believed (comma-separated addresses);
+# login attempts from anyone else are bucketed by their socket address
+TRUSTED_PROXIES = {a.strip() for a in os.environ.get("REALESTATE_TRUSTED_PROXIES", "").split(",") if a.strip()}
 
 st.set_page_config(page_title="Real Estate App", layout="wide")
 
@@ -155,6 +173,50 @@ def get_property_image(property_id, property_type):
     index = (property_id * 13) % len(PROPERTY_IMAGES)  # Using prime number multiplication for better distribution
     return PROPERTY_IMAGES[index]
 
+@st.cache_resource
+def get_image_cache():
+    return images.ImageCache()
+
+@st.cache_resource
+def get_image_proxy():
+    """The embedded thumbnail proxy, or None unless IMAGE_PROXY_URL says where browsers reach it."""
+    if not IMAGE_PROXY_URL:
+        return None
+    proxy = images.ImageProxy(cache=get_image_cache())
+    proxy.start()
+    return proxy
+
+def image_proxy_up():
+    proxy = get_image_proxy()
+    return proxy is not None and not proxy.last_error
+
+def thumbnail_url(image_url):
+    """Card-sized thumbnail of a photo through the image proxy (the original if there is no proxy)."""
+    if not image_proxy_up():
+        return image_url
+    return IMAGE_PROXY_URL + images.thumbnail_path(image_url)
+
+def listing_photo(prop):
+    """
+    Card-sized thumbnail bytes of the owner's first photo of a listing, or
+    None if there is none (or it cannot be read). The bytes go to st.image(),
+    so Streamlit serves them and no proxy address is involved.
+    """
+    photo = prop.get('photo')
+    if not isinstance(photo, str):
+        return None
+    try:
+        return images.card_thumbnail(f"blob:{photo}", get_image_cache())
+    except (images.SourceError, OSError, ValueError):
+        return None
+
+def card_image_html(photo, stock_url):
+    """The stock photo's <img> for a listing card; nothing when the owner's photo is shown instead."""
+    if photo is not None:
+        return ""
+    return (f'<img src="{thumbnail_url(stock_url)}" style="width: 100%; height: 200px; '
+            'object-fit: cover; border-radius: 5px; margin-bottom: 10px;">')
+
 # -------------------------
 # Helper: Styled Table Display
 # -------------------------
@@ -206,39 +268,267 @@ def create_rent_distribution_chart(df):
 # -------------------------
 # 1. Database Connection and Helpers
 # -------------------------
-def create_connection(db_file="real_estate.db"):
+def create_connection(db_file=db.DB_FILE):
     """Create and return a database connection."""
     try:
-        conn = sqlite3.connect(db_file, check_same_thread=False)
-        conn.row_factory = sqlite3.Row  # Allows accessing columns by name
-        return conn
+        return db.create_connection(db_file)
     except sqlite3.Error as e:
         st.error(f"Error connecting to database: {e}")
         return None
 
+@contextlib.contextmanager
+def fragment_connection():
+    """
+    A connection for one run of a fragment. Fragment-only reruns call the
+    fragment after main() has closed its connection, so fragments open their
+    own instead of keeping the one they were first called with.
+    """
+    conn = create_connection()
+    if conn is None:
+        st.stop()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
 def check_credentials(conn, username, password):
     """
     Check the given username and password against the Credentials table.
     Returns a tuple (True, user_type) if valid or (False, None) if not.
     """
-    if not username or not password:
-        return (False, None)
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT user_type 
-            FROM Credentials 
-            WHERE username = ? AND password = ?
-        """, (username, password))
-        result = cur.fetchone()
-        if result:
-            return (True, result["user_type"])
-        else:
-            return (False, None)
+        return users.check_credentials(conn, username, password)
     except Exception as e:
         st.error(f"Error checking credentials: {e}")
         return (False, None)
 
+@st.cache_resource
+def get_login_limiter():
+    """Login throttling shared by all sessions; lockouts survive a restart."""
+    limiter = ratelimit.LoginRateLimiter(state_file=ratelimit.LOGIN_STATE_FILE)
+    atexit.register(limiter.save)
+    return limiter
+
+def client_address():
+    """
+    The client's address for the login rate limiter: the socket peer, or,
+    when the peer is a trusted proxy, the rightmost X-Forwarded-For hop that
+    is not itself a trusted proxy. Hops further left are whatever the client
+    sent, so they are never used.
+    """
+    # Streamlit reports loopback peers (a proxy on the same host) as None
+    peer = st.context.ip_address if isinstance(st.context.ip_address, str) else None
+    if (peer or "127.0.0.1") not in TRUSTED_PROXIES:
+        return peer
+    hops = [hop.strip() for hop in st.context.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return peer
+
+@st.cache_resource
+def init_database(db_file=db.DB_FILE):
+    """Create the auxiliary tables, indexes and views once per server process."""
+    schema.init_database(db_file)
+    return True
+
+# -------------------------
+# 1b. Background Jobs (shared across sessions)
+# -------------------------
+@st.cache_resource
+def get_replica_sync():
+    """Start the replica job once per server process and share it across sessions."""
+    sync = replica.ReplicaSync()
+    sync.start()
+    return sync
+
+def start_job(job):
+    """
+    Start a database job in this process, unless a coordinator is configured:
+    it then runs the one copy of each job (coordinator.BACKGROUND_JOBS) and
+    this process only keeps the handle for the admin page's "run now" buttons.
+    """
+    if not COORDINATOR_ADDRESS:
+        job.start()
+    return job
+
+@st.cache_resource
+def get_receipt_archiver():
+    return start_job(archive.ReceiptArchiver())
+
+@st.cache_resource
+def get_roommate_matcher():
+    return start_job(matching.RoommateMatcher())
+
+@st.cache_resource
+def get_hold_sweeper():
+    return start_job(holds.HoldSweeper())
+
+@st.cache_resource
+def get_audit_logger():
+    return start_job(audit.AuditLogger())
+
+def audit_action(action, target_id=None, detail=None):
+    """Queue an audit entry for the logged-in admin (written in the background)."""
+    username = st.session_state.get("username")
+    if COORDINATOR_ADDRESS:
+        # No logger thread here to drain a queue; the coordinator's writer batches the entry instead
+        queued_write("write_audit_entries", [(int(time.time()), username, action, target_id, detail)])
+    else:
+        get_audit_logger().log(username, action, target_id, detail)
+
+@st.cache_resource
+def get_change_compactor():
+    return start_job(changes.ChangeLogCompactor())
+
+@st.cache_resource
+def get_notification_dispatcher():
+    """Deliver outbox notifications in the background, off the request path."""
+    return start_job(outbox.NotificationDispatcher())
+
+@st.cache_resource
+def get_coordinator():
+    """Handle on the multi-process coordinator, or None when this process runs on its own."""
+    return coordinator.CoordinatorClient(COORDINATOR_ADDRESS) if COORDINATOR_ADDRESS else None
+
+@st.cache_resource
+def get_write_queue():
+    """Writer shared by all sessions; group-commits their writes."""
+    write_queue = writer.WriteQueue()
+    write_queue.start()
+    return write_queue
+
+def queued_write(operation, *args):
+    """Run a named write (writer.WRITE_OPERATIONS) on the shared writer, or the coordinator's if there is one."""
+    client = get_coordinator()
+    if client is not None:
+        return client.write(operation, *args)
+    return get_write_queue().call(writer.WRITE_OPERATIONS[operation], *args)
+
+@st.cache_resource
+def get_listing_cache():
+    """Listing search results shared across sessions (and processes, behind a coordinator); invalidated from the change log."""
+    return get_coordinator() or listing_cache.ListingCache()
+
+@st.cache_resource
+def get_maintenance_scheduler():
+    return start_job(maintenance.MaintenanceScheduler())
+
+@st.cache_resource
+def get_price_estimator():
+    """Price models shared across sessions; refitted in the background as listings change."""
+    # Behind a coordinator only the coordinator refits; this copy reloads what it stored
+    estimator = pricing.PriceEstimator(refit=not COORDINATOR_ADDRESS)
+    estimator.start()
+    return estimator
+
+# -------------------------
+# 1c. Trend Charts
+# -------------------------
+def render_trend_charts(conn, owner_id=rollups.ALL_OWNERS, key="trends"):
+    freq = st.radio("Granularity", ["Daily", "Monthly"], horizontal=True, key=f"{key}_freq")
+    freq = "D" if freq == "Daily" else "M"
+    revenue = rollups.get_revenue_series(conn, owner_id, freq)
+    if not revenue.empty:
+        fig = px.line(revenue, x="period", y="revenue", markers=True, title="Revenue")
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No completed payments yet.")
+    occupancy = rollups.get_occupancy_series(conn, owner_id, freq)
+    if not occupancy.empty:
+        fig = px.line(occupancy, x="period", y=["occupancy_rate", "bed_fill_rate"],
+                      title="Occupancy and Bed Fill Rate")
+        fig.update_yaxes(tickformat=".0%", range=[0, 1])
+        st.plotly_chart(fig, use_container_width=True)
+
+# -------------------------
+# 1d. Similar Listings
+# -------------------------
+@st.cache_resource
+def get_neighbour_refresher():
+    """Keeps the precomputed neighbour lists current in the background."""
+    return start_job(recommend.NeighbourRefresher())
+
+def render_similar_listings(conn, property_id, limit=3):
+    try:
+        # Only reads the precomputed neighbours; get_neighbour_refresher() keeps them current
+        similar = recommend.get_similar_properties(conn, int(property_id), limit)
+    except Exception as e:
+        st.error(f"Error loading similar listings: {e}")
+        return
+    if similar:
+        st.markdown("**Similar listings**")
+        for other in similar:
+            price = other['rent'] if other['sale_renting'] == 'rent' else other['cost']
+            st.write(f"- {other['property_type'].title()} at {other['street']}, {other['city']} (${float(price):,.2f})")
+
+# -------------------------
+# 1e. Price Suggestions
+# -------------------------
+def render_price_suggestion(sale_renting, city, property_type, area, amenities):
+    estimator = get_price_estimator()
+    if not estimator.models:
+        # Fitted in the background (started with the homeowner view); never on this request
+        st.info("No price estimate yet; the price models are still being fitted.")
+        return
+    try:
+        suggestion = estimator.estimate(sale_renting, city, property_type, area, amenities)
+    except Exception as e:
+        st.error(f"Error estimating price: {e}")
+        return
+    if suggestion is None:
+        st.info("Enter the area to get a suggested price.")
+        return
+    label = "monthly rent" if sale_renting == "rent" else "price"
+    where = "all cities" if suggestion['city'] == pricing.ANY else suggestion['city'].title()
+    kind = "properties" if suggestion['property_type'] == pricing.ANY else f"{suggestion['property_type']}s"
+    st.info(f"💡 Suggested {label}: ${suggestion['estimate']:,.0f} "
+            f"(typical range ${suggestion['low']:,.0f} - ${suggestion['high']:,.0f}), "
+            f"based on {suggestion['comparables']} {kind} for {sale_renting} in {where}.")
+
+# -------------------------
+# 1f. City and Street Autocomplete
+# -------------------------
+@st.cache_resource
+def get_place_index():
+    """Shared city/street tries; loaded from Property on their first refresh."""
+    return places.PlaceIndex()
+
+def normalize_places(conn, city, street):
+    """
+    City and street in the spelling existing listings already use. Returns
+    (city, street, hints), with a hint for each name that is new but close
+    to a known one.
+    """
+    index = get_place_index()
+    resolved, hints = [], []
+    for field, text in (("city", city), ("street", street)):
+        known, near = index.resolve(conn, field, text)
+        resolved.append(known or " ".join(text.split()))
+        if near:
+            hints.append(f"{field.title()} \"{text.strip()}\" is new; did you mean {' or '.join(near[:3])}?")
+    return resolved[0], resolved[1], hints
+
+def listings_in_city(conn, rows, city):
+    """
+    Listings in `city`. What was typed is completed to the most common city
+    starting with it, or the closest spelling when none does.
+    """
+    if not city.strip():
+        return rows
+    index = get_place_index()
+    known, _ = index.resolve(conn, "city", city)
+    if known is None:
+        completions = index.complete(conn, "city", city)
+        if not completions:
+            st.caption(f"No city matches \"{city.strip()}\".")
+            return []
+        known = completions[0]
+        others = f" Also: {', '.join(completions[1:4])}." if len(completions) > 1 else ""
+        st.caption(f"Showing listings in {known}.{others}")
+    key = places.place_key(known)
+    return [row for row in rows if places.place_key(row["city"]) == key]
+
 # -------------------------
 # 2a. Admin View
 # -------------------------
@@ -246,6 +536,13 @@ def admin_view(conn):
     st.title("🏢 Admin Dashboard")
     st.markdown("---")
     
+    # Reports and analytics can be served from the read replica so they
+    # don't compete with live bookings on the primary database
+    replica_job = get_replica_sync()
+    use_replica = st.sidebar.checkbox("Read reports from replica", value=True, key="use_replica")
+    replica_conn = replica.create_replica_connection() if use_replica else None
+    read_conn = replica_conn if replica_conn is not None else conn
+    
     # Create tabs for better organization
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "👥 User Management", "🏠 Property Management", "📈 Reports"])
     
@@ -254,65 +551,72 @@ def admin_view(conn):
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            total_users = pd.read_sql_query("SELECT COUNT(*) as count FROM Credentials", conn)['count'][0]
+            total_users = users.count_users(read_conn)
             st.metric("Total Users", total_users)
         
         with col2:
-            total_properties = pd.read_sql_query("SELECT COUNT(*) as count FROM Property", conn)['count'][0]
+            total_properties = properties.count_properties(read_conn)
             st.metric("Total Properties", total_properties)
         
         with col3:
-            available_properties = pd.read_sql_query("SELECT COUNT(*) as count FROM Property WHERE is_available = 1", conn)['count'][0]
+            available_properties = properties.count_properties(read_conn, available_only=True)
             st.metric("Available Properties", available_properties)
         
         # Property Type Distribution Chart
         st.subheader("Property Type Distribution")
-        property_types = pd.read_sql_query("SELECT property_type, COUNT(*) as count FROM Property GROUP BY property_type", conn)
+        property_types = pd.DataFrame(properties.property_type_counts(read_conn))
         create_property_distribution_chart(property_types)
+        
+        # Revenue and occupancy trends from the precomputed rollups
+        st.subheader("Revenue & Occupancy Trends")
+        try:
+            render_trend_charts(read_conn, key="admin_trends")
+        except Exception as e:
+            st.error(f"Error loading trends: {e}")
+        
+        # Replication status
+        st.subheader("Read Replica")
+        metrics = replica_job.metrics()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            lag = metrics["lag_seconds"]
+            st.metric("Replication Lag", f"{lag:.0f}s" if lag is not None else "N/A")
+        with col2:
+            duration = metrics["last_duration"]
+            st.metric("Last Sync Duration", f"{duration:.2f}s" if duration is not None else "N/A")
+        with col3:
+            st.metric("Pages Copied", metrics["last_pages"])
+        with col4:
+            st.metric("Snapshots Taken", metrics["sync_count"])
+        st.caption(f"Reports are reading from the {'replica' if replica_conn is not None else 'primary'} database.")
+        if metrics["last_error"]:
+            st.error(f"Last replica sync failed: {metrics['last_error']}")
+        if st.button("Sync Replica Now", key="sync_replica"):
+            if replica_job.sync_now():
+                st.success("Replica refreshed!")
+            else:
+                st.error(f"Replica sync failed: {replica_job.last_error}")
     
     with tab2:
         st.subheader("User Management")
         
         # User Type Distribution
-        user_types = pd.read_sql_query("SELECT user_type, COUNT(*) as count FROM Credentials GROUP BY user_type", conn)
+        user_types = pd.DataFrame(users.user_type_counts(read_conn))
         fig = px.pie(user_types, values='count', names='user_type', title='User Type Distribution')
         st.plotly_chart(fig, use_container_width=True)
         
         # User Tables
         st.write("### All Users")
         try:
-            df = pd.read_sql_query("SELECT username, user_type FROM Credentials", conn)
+            df = pd.DataFrame(users.list_credentials(conn))
             display_styled_table(df)
         except Exception as e:
             st.error(f"Error retrieving credentials: {e}")
         
         # Homeowner Management
-        st.write("### Homeowner Management")
+        st.write("### Homeowner Moderation")
         try:
-            df_homeowners = pd.read_sql_query("""
-                SELECT owner_id, username, first_name, last_name, email, phone_number, verification_status
-                FROM HomeOwner
-            """, conn)
-            display_styled_table(df_homeowners)
-            
-            # Verification Status Update
-            st.markdown("#### Update Verification Status")
-            homeowners_df = pd.read_sql_query("""
-                SELECT owner_id, username, first_name, last_name, verification_status 
-                FROM HomeOwner
-            """, conn)
-            
-            owner_options = {f"{row['owner_id']} - {row['first_name']} {row['last_name']} ({row['verification_status']})": row["owner_id"]
-                            for row in homeowners_df.to_dict("records")}
-            selected_owner = st.selectbox("Select Homeowner to update", list(owner_options.keys()))
-            new_status = st.selectbox("New Verification Status", options=["pending", "verified", "rejected"])
-            
-            if st.button("Update Status", key="update_status"):
-                owner_id = owner_options[selected_owner]
-                cur = conn.cursor()
-                cur.execute("UPDATE HomeOwner SET verification_status = ? WHERE owner_id = ?", (new_status, owner_id))
-                conn.commit()
-                st.success("Verification status updated successfully!")
+            render_moderation_queue(conn)
         except Exception as e:
             st.error(f"Error in homeowner management: {e}")
     
@@ -322,106 +626,67 @@ def admin_view(conn):
         # Property Statistics
         col1, col2 = st.columns(2)
         with col1:
-            avg_rent = pd.read_sql_query("SELECT AVG(rent) as avg_rent FROM Property WHERE sale_renting = 'rent'", conn)['avg_rent'][0]
+            avg_rent = properties.average_rent(conn)
             st.metric("Average Rent", f"${avg_rent:.2f}")
         
         with col2:
-            total_available = pd.read_sql_query("SELECT COUNT(*) as count FROM Property WHERE is_available = 1", conn)['count'][0]
+            total_available = properties.count_properties(conn, available_only=True)
             st.metric("Available Properties", total_available)
         
         # Property List
         st.write("### All Properties")
         try:
-            df_properties = pd.read_sql_query("""
-                SELECT p.*, h.first_name || ' ' || h.last_name AS owner_name
-                FROM Property p
-                JOIN HomeOwner h ON p.owner_id = h.owner_id
-            """, conn)
+            df_properties = pd.DataFrame(properties.list_properties_with_owner(conn))
             display_styled_table(df_properties)
             
             # Property Availability Update
             st.markdown("#### Update Property Availability")
-            properties = pd.read_sql_query("SELECT property_id, street, city FROM Property", conn)
             prop_options = {f"{row['property_id']} - {row['street']}, {row['city']}": row["property_id"] 
-                          for row in properties.to_dict("records")}
+                          for row in properties.list_property_choices(conn)}
             selected_prop = st.selectbox("Select Property", list(prop_options.keys()))
             new_status = st.selectbox("New Availability Status", options=["Available", "Unavailable"])
             
             if st.button("Update Status", key="update_property"):
                 prop_id = prop_options[selected_prop]
-                cur = conn.cursor()
-                cur.execute("UPDATE Property SET is_available = ? WHERE property_id = ?", 
-                          (1 if new_status == "Available" else 0, prop_id))
-                conn.commit()
+                queued_write("set_availability", prop_id, new_status == "Available")
+                audit_action(audit.SET_AVAILABILITY, prop_id, new_status)
                 st.success("Property status updated successfully!")
         except Exception as e:
             st.error(f"Error in property management: {e}")
     
     with tab4:
         st.subheader("Analytics & Reports")
-        admin_reports(conn)
+        admin_reports(conn, read_conn)
+    
+    if replica_conn is not None:
+        replica_conn.close()
+
+def admin_reports(conn, read_conn=None):
+    # Read-only report queries go to read_conn (the replica when enabled);
+    # writes and the audit log always use the primary connection.
+    if read_conn is None:
+        read_conn = conn
 
-def admin_reports(conn):
     st.markdown("## Admin Reports and Actions")
 
     # 1. List All Available Properties for Rent
     with st.expander("1. List All Available Properties for Rent"):
-        query = """
-        SELECT 
-            p.property_id,
-            p.property_type,
-            p.city,
-            p.street,
-            p.cost,
-            p.rent,
-            p.is_available,
-            h.first_name || ' ' || h.last_name AS owner_name
-        FROM Property p
-        JOIN HomeOwner h ON p.owner_id = h.owner_id
-        WHERE p.sale_renting = 'rent' AND p.is_available = 1;
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.available_rentals(read_conn)))
         except Exception as e:
             st.error(f"Error fetching available rental properties: {e}")
 
     # 2. List Verified Homeowners
     with st.expander("2. List Verified Homeowners"):
-        query = """
-        SELECT 
-            owner_id,
-            first_name,
-            last_name,
-            email,
-            phone_number
-        FROM HomeOwner
-        WHERE verification_status = 'verified';
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.verified_homeowners(read_conn)))
         except Exception as e:
             st.error(f"Error fetching verified homeowners: {e}")
 
     # 3. Get All Shared Rooms with Available Beds
     with st.expander("3. Get All Shared Rooms with Available Beds"):
-        query = """
-        SELECT 
-            sr.room_id,
-            sr.property_id,
-            sr.total_beds,
-            sr.available_beds,
-            sr.monthly_rent,
-            p.city,
-            p.street
-        FROM SharedRoom sr
-        JOIN Property p ON sr.property_id = p.property_id
-        WHERE sr.available_beds > 0;
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.shared_rooms_with_beds(read_conn)))
         except Exception as e:
             st.error(f"Error fetching shared rooms with available beds: {e}")
 
@@ -429,19 +694,8 @@ def admin_reports(conn):
     with st.expander("4. Show All Customers Interested in Sharing a Particular Room"):
         room_id = st.number_input("Enter Room ID", min_value=1, step=1)
         if st.button("Show Interested Customers", key="show_interested_customers"):
-            query = """
-            SELECT 
-                c.customer_id,
-                c.first_name,
-                c.last_name,
-                c.email
-            FROM Interested_In_Sharing iis
-            JOIN Customer c ON iis.customer_id = c.customer_id
-            WHERE iis.room_id = ?
-            """
             try:
-                df = pd.read_sql_query(query, conn, params=(room_id,))
-                display_styled_table(df)
+                display_styled_table(pd.DataFrame(reports.customers_interested_in_room(read_conn, room_id)))
             except Exception as e:
                 st.error(f"Error fetching interested customers: {e}")
 
@@ -449,15 +703,14 @@ def admin_reports(conn):
     # 7. Mark a Property as Unavailable
     with st.expander("7. Mark a Property as Unavailable"):
         try:
-            properties = pd.read_sql_query("SELECT property_id, street, city FROM Property WHERE is_available = 1", conn)
-            if not properties.empty:
-                prop_options = {f"{row['property_id']} - {row['street']}, {row['city']}": row["property_id"] for row in properties.to_dict("records")}
+            available = properties.list_property_choices(conn, available_only=True)
+            if available:
+                prop_options = {f"{row['property_id']} - {row['street']}, {row['city']}": row["property_id"] for row in available}
                 selected_prop = st.selectbox("Select Property to Mark as Unavailable", list(prop_options.keys()))
                 if st.button("Mark as Unavailable", key="mark_property"):
                     prop_id = prop_options[selected_prop]
-                    cur = conn.cursor()
-                    cur.execute("UPDATE Property SET is_available = 0 WHERE property_id = ?", (prop_id,))
-                    conn.commit()
+                    queued_write("set_availability", prop_id, False)
+                    audit_action(audit.MARK_UNAVAILABLE, prop_id)
                     st.success("Property marked as unavailable!")
             else:
                 st.write("No available properties found.")
@@ -469,9 +722,8 @@ def admin_reports(conn):
         room_id_decrement = st.number_input("Enter Room ID to Decrease Available Beds", min_value=1, step=1, key="room_id_decrement")
         if st.button("Decrease Available Beds", key="decrease_beds"):
             try:
-                cur = conn.cursor()
-                cur.execute("UPDATE SharedRoom SET available_beds = available_beds - 1 WHERE room_id = ? AND available_beds > 0", (room_id_decrement,))
-                conn.commit()
+                queued_write("decrease_available_beds", room_id_decrement)
+                audit_action(audit.DECREASE_BEDS, room_id_decrement)
                 st.success("Available beds decreased!")
             except Exception as e:
                 st.error(f"Error decreasing available beds: {e}")
@@ -479,15 +731,14 @@ def admin_reports(conn):
     # 10. Delete a Customer and Cascade Delete Related Records
     with st.expander("10. Delete a Customer"):
         try:
-            customers = pd.read_sql_query("SELECT customer_id, username, first_name, last_name FROM Customer", conn)
-            if not customers.empty:
-                cust_options = {f"{row['customer_id']} - {row['first_name']} {row['last_name']}": row["customer_id"] for row in customers.to_dict("records")}
+            customers = users.list_customers(conn)
+            if customers:
+                cust_options = {f"{row['customer_id']} - {row['first_name']} {row['last_name']}": row["customer_id"] for row in customers}
                 selected_cust = st.selectbox("Select Customer to Delete", list(cust_options.keys()))
                 if st.button("Delete Customer", key="delete_customer"):
                     cust_id = cust_options[selected_cust]
-                    cur = conn.cursor()
-                    cur.execute("DELETE FROM Customer WHERE customer_id = ?", (cust_id,))
-                    conn.commit()
+                    queued_write("delete_customer", cust_id)
+                    audit_action(audit.DELETE_CUSTOMER, cust_id, selected_cust)
                     st.success("Customer deleted!")
             else:
                 st.write("No customers found.")
@@ -497,15 +748,15 @@ def admin_reports(conn):
     # 11. Delete a Property
     with st.expander("11. Delete a Property"):
         try:
-            properties_all = pd.read_sql_query("SELECT property_id, street, city FROM Property", conn)
-            if not properties_all.empty:
-                prop_options_all = {f"{row['property_id']} - {row['street']}, {row['city']}": row["property_id"] for row in properties_all.to_dict("records")}
+            properties_all = properties.list_property_choices(conn)
+            if properties_all:
+                prop_options_all = {f"{row['property_id']} - {row['street']}, {row['city']}": row["property_id"] for row in properties_all}
                 selected_prop_del = st.selectbox("Select Property to Delete", list(prop_options_all.keys()))
                 if st.button("Delete Property", key="delete_property"):
                     prop_id = prop_options_all[selected_prop_del]
-                    cur = conn.cursor()
-                    cur.execute("DELETE FROM Property WHERE property_id = ?", (prop_id,))
-                    conn.commit()
+                    released = queued_write("delete_property", prop_id)
+                    queued_write("remove_released_photos", released)
+                    audit_action(audit.DELETE_PROPERTY, prop_id, selected_prop_del)
                     st.success("Property deleted!")
             else:
                 st.write("No properties found.")
@@ -514,120 +765,300 @@ def admin_reports(conn):
 
     # 12. List Properties That Have Shared Rooms Fully Occupied
     with st.expander("12. Properties with Fully Occupied Shared Rooms"):
-        query = """
-        SELECT 
-            p.property_id,
-            p.property_type,
-            p.city
-        FROM Property p
-        JOIN SharedRoom sr ON p.property_id = sr.property_id
-        WHERE sr.available_beds = 0;
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.fully_occupied_shared_rooms(read_conn)))
         except Exception as e:
             st.error(f"Error fetching fully occupied shared rooms: {e}")
 
     # 13. Count of Properties Per City
     with st.expander("13. Count of Properties Per City"):
-        query = """
-        SELECT 
-            city,
-            COUNT(property_id) AS total_properties
-        FROM Property
-        GROUP BY city;
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.properties_per_city(read_conn)))
         except Exception as e:
             st.error(f"Error counting properties per city: {e}")
 
     # 14. Find Customers Participating in Room Sharing with Their Details
     with st.expander("14. Customers Participating in Room Sharing"):
-        query = """
-        SELECT 
-            c.customer_id,
-            c.first_name,
-            c.last_name,
-            sr.room_id,
-            p.city,
-            p.street
-        FROM Participates pr
-        JOIN Customer c ON pr.customer_id = c.customer_id
-        JOIN SharedRoom sr ON pr.room_id = sr.room_id
-        JOIN Property p ON sr.property_id = p.property_id;
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.sharing_participants(read_conn)))
         except Exception as e:
             st.error(f"Error fetching participating customers: {e}")
 
     # 15. Top 5 Cities with Most Properties Available for Rent
     with st.expander("15. Top 5 Cities with Most Properties Available for Rent"):
-        query = """
-        SELECT 
-            city,
-            COUNT(property_id) AS available_properties
-        FROM Property
-        WHERE sale_renting = 'rent' AND is_available = 1
-        GROUP BY city
-        ORDER BY available_properties DESC
-        LIMIT 5;
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.top_rental_cities(read_conn)))
         except Exception as e:
             st.error(f"Error fetching top cities: {e}")
 
     # 16. Revenue Generated From Property Sales/Rent (Completed Payments Only)
     with st.expander("16. Total Revenue from Completed Payments"):
-        query = """
-        SELECT 
-            SUM(amount) AS total_revenue
-        FROM Receipt
-        WHERE payment_status = 'completed';
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.total_revenue(read_conn)))
         except Exception as e:
             st.error(f"Error calculating revenue: {e}")
 
     # 17. Find Homeowners Who Own Properties That Are All Unavailable
     with st.expander("17. Homeowners with All Properties Unavailable"):
-        query = """
-        SELECT 
-            h.owner_id,
-            h.first_name,
-            h.last_name
-        FROM HomeOwner h
-        WHERE NOT EXISTS (
-            SELECT 1
-            FROM Property p
-            WHERE p.owner_id = h.owner_id AND p.is_available = 1
-        );
-        """
         try:
-            df = pd.read_sql_query(query, conn)
-            display_styled_table(df)
+            display_styled_table(pd.DataFrame(reports.owners_with_nothing_available(read_conn)))
         except Exception as e:
             st.error(f"Error fetching homeowners with all properties unavailable: {e}")
 
+    # 18. Receipt Archive Partitions
+    with st.expander("18. Receipt Archive Partitions"):
+        try:
+            display_styled_table(pd.DataFrame(reports.receipt_archive_partitions(read_conn)))
+        except Exception as e:
+            st.error(f"Error fetching archive partitions: {e}")
+        archiver = get_receipt_archiver()
+        if archiver.last_error:
+            st.error(f"Last archival run failed: {archiver.last_error}")
+        if st.button("Archive Old Receipts Now", key="archive_receipts"):
+            try:
+                moved = archive.archive_old_receipts(conn)
+                st.success(f"Archived {moved} receipts!")
+            except Exception as e:
+                st.error(f"Error archiving receipts: {e}")
+
+    # 19. Roommate Matching Queue
+    with st.expander("19. Roommate Matching Queue"):
+        try:
+            display_styled_table(pd.DataFrame(reports.roommate_match_queue(conn)))
+        except Exception as e:
+            st.error(f"Error fetching the matching queue: {e}")
+        matcher = get_roommate_matcher()
+        if matcher.last_error:
+            st.error(f"Last matching run failed: {matcher.last_error}")
+        if matcher.last_result:
+            result = matcher.last_result
+            st.caption(f"Last run: placed {result['placed']} of {result['waiting']} waiting customers "
+                       f"across {result['rooms']} rooms in {result['seconds'] * 1000:.0f} ms")
+        if st.button("Run Matching Now", key="run_matching"):
+            matcher.run_once(force=True)
+            if matcher.last_error:
+                st.error(f"Error running matching: {matcher.last_error}")
+            else:
+                st.success(f"Placed {matcher.last_result['placed']} customers!")
+
+    # 20. Pending Checkouts
+    with st.expander("20. Pending Checkouts"):
+        try:
+            display_styled_table(pd.DataFrame(reports.pending_checkouts(conn)))
+        except Exception as e:
+            st.error(f"Error fetching pending checkouts: {e}")
+        sweeper = get_hold_sweeper()
+        if sweeper.last_error:
+            st.error(f"Last hold sweep failed: {sweeper.last_error}")
+        if st.button("Release Expired Holds Now", key="release_holds"):
+            try:
+                released = holds.release_expired_holds(conn)
+                st.success(f"Released {released} expired holds!")
+            except Exception as e:
+                st.error(f"Error releasing holds: {e}")
+
+    # 21. Notification Outbox
+    with st.expander("21. Notification Outbox"):
+        try:
+            st.metric("Pending Notifications", outbox.pending_count(conn))
+            display_styled_table(pd.DataFrame(reports.notification_outbox(conn)))
+        except Exception as e:
+            st.error(f"Error fetching the outbox: {e}")
+        dispatcher = get_notification_dispatcher()
+        if COORDINATOR_ADDRESS:
+            st.caption(f"Delivered by the coordinator at {COORDINATOR_ADDRESS}")
+        else:
+            st.caption(f"Delivered {dispatcher.dispatched} notifications since startup")
+        if dispatcher.last_error:
+            st.error(f"Last delivery failed: {dispatcher.last_error}")
+
+    # 22. Change Feed
+    with st.expander("22. Change Feed"):
+        try:
+            col1, col2 = st.columns(2)
+            col1.metric("Latest Change", changes.latest_seq(conn))
+            col2.metric("Retained Changes", changes.retained_count(conn))
+            display_styled_table(pd.DataFrame(reports.change_feed_consumers(conn)))
+        except Exception as e:
+            st.error(f"Error fetching the change feed: {e}")
+        compactor = get_change_compactor()
+        if compactor.last_error:
+            st.error(f"Last compaction failed: {compactor.last_error}")
+        if st.button("Compact Change Log Now", key="compact_changes"):
+            try:
+                removed = changes.compact_changes(conn)
+                st.success(f"Removed {removed} consumed changes!")
+            except Exception as e:
+                st.error(f"Error compacting the change log: {e}")
+
+    # 23. Admin Audit Log
+    with st.expander("23. Admin Audit Log"):
+        render_audit_log(conn)
+
+    # 24. Listing Cache
+    with st.expander("24. Listing Cache"):
+        try:
+            stats = get_listing_cache().stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Hit Rate", "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.1%}")
+            col2.metric("Cached Searches", stats["entries"])
+            col3.metric("Cache Size", f"{stats['bytes'] / 1024:,.0f} KB")
+            st.caption(f"{stats['hits']} hits, {stats['misses']} misses, "
+                       f"{stats['invalidated']} invalidated, {stats['evicted']} evicted since startup")
+            if "writes" in stats:
+                st.caption(f"Coordinator at {COORDINATOR_ADDRESS}: {stats['clients']} connected sessions, "
+                           f"{stats['writes']} writes ({stats['failed_writes']} failed, "
+                           f"{stats['jobs_per_commit'] or 0:.1f} per commit), "
+                           f"{stats['queued_writes']} queued")
+        except Exception as e:
+            st.error(f"Error fetching listing cache stats: {e}")
+        if st.button("Clear Listing Cache", key="clear_listing_cache"):
+            try:
+                get_listing_cache().clear()
+                st.success("Listing cache cleared!")
+            except Exception as e:
+                st.error(f"Error clearing the listing cache: {e}")
+
+    # 25. Maintenance
+    with st.expander("25. Maintenance"):
+        try:
+            display_styled_table(pd.DataFrame(reports.maintenance_jobs(conn)))
+            st.markdown("**Recent Runs**")
+            display_styled_table(pd.DataFrame(reports.maintenance_runs(conn)))
+        except Exception as e:
+            st.error(f"Error fetching maintenance history: {e}")
+        scheduler = get_maintenance_scheduler()
+        if scheduler.last_error:
+            st.error(f"Last maintenance error: {scheduler.last_error}")
+        descriptions = {job.name: job.description for job in maintenance.JOBS}
+        job_name = st.selectbox("Job", list(descriptions), format_func=lambda name: f"{name} - {descriptions[name]}",
+                                key="maintenance_job")
+        if st.button("Run Now", key="run_maintenance"):
+            try:
+                if scheduler.run_job(job_name, force=True):
+                    st.success(f"Ran {job_name}!")
+                else:
+                    st.warning(f"{job_name} is already running.")
+            except Exception as e:
+                st.error(f"Error running {job_name}: {e}")
+
+def render_moderation_queue(conn):
+    counts = moderation.status_counts(conn)
+    for col, (status, count) in zip(st.columns(len(counts)), counts.items()):
+        col.metric(status.title(), count)
+    if "moderation_notice" in st.session_state:
+        st.success(st.session_state.pop("moderation_notice"))
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        statuses = {"All": None, **{status.title(): status for status in users.VERIFICATION_STATUSES}}
+        status = statuses[st.selectbox("Status", list(statuses), index=1, key="moderation_status")]
+    with col2:
+        search = st.text_input("Search name, username or email", key="moderation_search").strip()
+    with col3:
+        page_size = st.selectbox("Per page", [moderation.MODERATION_PAGE_SIZE, 500, 1000, 5000], key="moderation_page_size")
+
+    # Keyset cursors of the pages seen so far; reset whenever the filters change
+    filters = (status, search, page_size)
+    if st.session_state.get("moderation_filters") != filters:
+        st.session_state.moderation_filters = filters
+        st.session_state.moderation_cursors = [None]
+    cursors = st.session_state.moderation_cursors
+    rows, next_cursor = moderation.moderation_page(conn, status, search, after=cursors[-1], limit=page_size)
+    if not rows:
+        st.info("No homeowners match these filters.")
+        return
+
+    select_all = st.checkbox("Select all on this page", key="moderation_select_all")
+    # The editor's key changes after each batch so its checkboxes start cleared
+    edited = st.data_editor(
+        pd.DataFrame([{"select": select_all, **row} for row in rows]),
+        column_config={"select": st.column_config.CheckboxColumn("Select")},
+        disabled=list(rows[0]),
+        hide_index=True,
+        use_container_width=True,
+        key=f"moderation_editor_{st.session_state.get('moderation_batches', 0)}",
+    )
+    selected = [int(owner_id) for owner_id in edited.loc[edited["select"], "owner_id"]]
+
+    col1, col2, col3, col4, col5 = st.columns([1, 1, 1, 1, 2])
+    for col, label, done, new_status in ((col1, "Approve", "Approved", "verified"), (col2, "Reject", "Rejected", "rejected")):
+        if col.button(f"{label} Selected", key=f"moderation_{new_status}", disabled=not selected):
+            try:
+                changed = queued_write("set_verification_statuses", selected, new_status)
+            except Exception as e:
+                st.error(f"Error updating verification status: {e}")
+                return
+            for owner_id in changed:
+                audit_action(audit.VERIFY_OWNER, owner_id, new_status)
+            st.session_state.moderation_batches = st.session_state.get("moderation_batches", 0) + 1
+            st.session_state.moderation_notice = f"{done} {len(changed)} homeowner(s)."
+            st.rerun()
+    with col3:
+        if st.button("Previous", key="moderation_previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col4:
+        if st.button("Next", key="moderation_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+    with col5:
+        st.caption(f"Page {len(cursors)} · {len(selected)} selected")
+
+def render_audit_log(conn):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        start_date = st.date_input("From", value=datetime.date.today() - datetime.timedelta(days=30), key="audit_from")
+    with col2:
+        end_date = st.date_input("To", value=datetime.date.today(), key="audit_to")
+    with col3:
+        action_names = {"All": None, **{name.title(): code for code, name in audit.ACTIONS.items()}}
+        action = action_names[st.selectbox("Action", list(action_names), key="audit_action")]
+    start = int(time.mktime(start_date.timetuple()))
+    end = int(time.mktime((end_date + datetime.timedelta(days=1)).timetuple()))
+
+    # Keyset cursors of the pages seen so far; reset whenever the filters change
+    filters = (start, end, action)
+    if st.session_state.get("audit_filters") != filters:
+        st.session_state.audit_filters = filters
+        st.session_state.audit_cursors = [None]
+    cursors = st.session_state.audit_cursors
+    try:
+        # Read from the primary once the logger thread has written out queued
+        # entries, so the page includes the actions just taken (the replica
+        # can lag by a minute). Behind a coordinator they are already written.
+        get_audit_logger().sync()
+        rows, next_cursor = audit.audit_page(conn, start, end, action, before=cursors[-1])
+    except Exception as e:
+        st.error(f"Error reading the audit log: {e}")
+        return
+    if rows:
+        display_styled_table(pd.DataFrame(rows))
+    else:
+        st.info("No admin actions in this period.")
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        if st.button("Newer", key="audit_newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Older", key="audit_older", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+    with col3:
+        st.caption(f"Page {len(cursors)}")
+
 # -------------------------
 # 2b. Homeowner View
 # -------------------------
 def homeowner_view(conn, username):
     st.title("🏠 Welcome, Homeowner!")
     st.markdown("---")
+    # Fit the price models in the background while the owner fills in a listing
+    get_price_estimator()
     
     # Get homeowner details
-    homeowner = pd.read_sql_query("""
-        SELECT * FROM HomeOwner WHERE username = ?
-    """, conn, params=(username,)).iloc[0]
+    homeowner = users.get_homeowner(conn, username)
     
     # Display homeowner profile
     st.subheader("Your Profile")
@@ -677,53 +1108,40 @@ def homeowner_view(conn, username):
                 description = st.text_area("Description")
                 amenities = st.text_area("Amenities (separate by commas)")
                 sharing_allowed = st.checkbox("Allow Sharing")
+                keep_spelling = st.checkbox("Keep city and street as typed")
+                uploads = st.file_uploader("Photos", type=["jpg", "jpeg", "png", "webp"], accept_multiple_files=True)
                 
                 if st.form_submit_button("Add Property"):
-                    try:
-                        cur = conn.cursor()
-                        # Insert into Property table
-                        cur.execute("""
-                            INSERT INTO Property (
-                                owner_id, property_type, sale_renting, cost,
+                    # Match the spelling existing listings use, so per-city reports don't fragment
+                    city, street, hints = normalize_places(conn, city, street)
+                    if hints and not keep_spelling:
+                        st.warning(" ".join(hints) + " Tick \"Keep city and street as typed\" to add it anyway.")
+                    else:
+                        try:
+                            photos = []
+                            for upload in uploads or []:
+                                data = upload.getvalue()
+                                photos.append((data, blobs.photo_content_type(data)))
+                            # Rentals with sharing allowed are added to SharedRoom as well
+                            property_id, shared_room_added = queued_write(
+                                "add_property", homeowner['owner_id'], property_type, sale_renting, cost,
                                 building, street, city, pin, area, rent,
-                                description, amenities, is_available, sharing_allowed,
-                                coord_X, coord_Y
-                            ) VALUES (
-                                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?
+                                description, amenities, sharing_allowed,
+                                coord_X, coord_Y, photos
                             )
-                        """, (
-                            homeowner['owner_id'], property_type, sale_renting, cost,
-                            building, street, city, pin, area, rent,
-                            description, amenities, sharing_allowed,
-                            coord_X, coord_Y
-                        ))
-                        
-                        # Get the ID of the newly inserted property
-                        cur.execute("SELECT last_insert_rowid()")
-                        property_id = cur.fetchone()[0]
-                        
-                        # If sharing is allowed and it's a rental property, add to SharedRoom
-                        if sharing_allowed and sale_renting == 'rent':
-                            try:
-                                cur.execute("""
-                                    INSERT INTO SharedRoom (property_id, total_beds, available_beds, monthly_rent)
-                                    VALUES (?, 2, 2, ?)
-                                """, (property_id, rent / 2))
-                                conn.commit()
+                            if shared_room_added:
                                 st.success("Property has been added to Shared Rooms! You can manage it in the Sharing Management tab.")
-                            except Exception as e:
-                                st.error(f"Error adding to shared rooms: {str(e)}")
-                                conn.rollback()
-                        else:
-                            conn.commit()
                         
-                        st.success("Property added successfully!")
+                            st.success("Property added successfully!")
                         
-                        # Clear all form fields by forcing a page refresh
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error adding property: {str(e)}")
-                        conn.rollback()
+                            # Clear all form fields by forcing a page refresh
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error adding property: {str(e)}")
+
+                # Estimates come from cached model coefficients, so this is instant
+                if st.form_submit_button("💡 Suggest Price"):
+                    render_price_suggestion(sale_renting, city, property_type, area, amenities)
                         
                 # Add a note about shared properties
                 if sale_renting == "rent" and sharing_allowed:
@@ -735,22 +1153,20 @@ def homeowner_view(conn, username):
             st.write(f"Fetching properties for owner_id: {homeowner['owner_id']}")
             
             # First check if there are any properties for this owner - simplified query
-            properties = pd.read_sql_query("""
-                SELECT * FROM Property WHERE owner_id = ?
-            """, conn, params=(homeowner['owner_id'],))
+            owner_properties = pd.DataFrame(properties.get_owner_properties(conn, homeowner['owner_id']))
             
-            property_count = len(properties)
+            property_count = len(owner_properties)
             st.write(f"Total properties found: {property_count}")
             
             # Display the raw properties DataFrame for debugging
             st.write("Raw properties data:")
-            if not properties.empty:
+            if not owner_properties.empty:
                 # Now get owner information - using the current homeowner's information directly
                 owner_name = f"{homeowner['first_name']} {homeowner['last_name']}"
                 
                 # Display properties in a grid
                 cols = st.columns(3)
-                for idx, prop in properties.iterrows():
+                for idx, prop in owner_properties.iterrows():
                     with cols[idx % 3]:
                         # Get a random image for the property type
                         property_type = str(prop.get('property_type', 'apartment')).lower()
@@ -780,14 +1196,16 @@ def homeowner_view(conn, username):
                         area = float(prop.get('area', 0))
                         description = str(prop.get('description', 'No description available'))
                         
+                        photo = listing_photo(prop)
+                        if photo is not None:
+                            st.image(photo, width="stretch")
                         st.markdown(f"""
                             <div style='padding: 10px; 
                                     border-radius: 10px; 
                                     background-color: #1E1E1E; 
                                     color: #FFFFFF; 
                                     box-shadow: 0 4px 8px rgba(0,0,0,0.3); 
-                                    margin-bottom: 10px;'>
-                                <img src="{image_url}" style="width: 100%; height: 200px; object-fit: cover; border-radius: 5px; margin-bottom: 10px;">
+                                    margin-bottom: 10px;'>{card_image_html(photo, image_url)}
                                 <h4 style='color: #FFFFFF;'>{property_type}</h4>
                                 <p><strong>Location:</strong> {street}, {city}</p>
                                 <p><strong>Rent:</strong> ${rent:,.2f}</p>
@@ -800,27 +1218,7 @@ def homeowner_view(conn, username):
                         with col1:
                             if st.button("Rent Now", key=rent_key):
                                 try:
-                                    cur = conn.cursor()
-                                    # Add to Buy_Rent table
-                                    cur.execute("""
-                                        INSERT INTO Buy_Rent (customer_id, property_id)
-                                        VALUES (?, ?)
-                                    """, (homeowner['owner_id'], property_id))
-                                    
-                                    # Add to Receipt table
-                                    cur.execute("""
-                                        INSERT INTO Receipt (property_id, customer_id, amount, payment_status, payment_date)
-                                        VALUES (?, ?, ?, 'completed', DATE('now'))
-                                    """, (property_id, homeowner['owner_id'], rent))
-                                    
-                                    # Update property availability
-                                    cur.execute("""
-                                        UPDATE Property 
-                                        SET is_available = 0 
-                                        WHERE property_id = ?
-                                    """, (property_id,))
-                                    
-                                    conn.commit()
+                                    queued_write("book_property", homeowner['owner_id'], property_id, rent)
                                     st.success(f"You have successfully rented this property at {street}, {city}!")
                                 except Exception as e:
                                     st.error(f"Error processing rental: {str(e)}")
@@ -832,14 +1230,7 @@ def homeowner_view(conn, username):
                                 
                                 if sale_renting == 'rent' and is_available == 1:
                                     try:
-                                        cur = conn.cursor()
-                                        cur.execute("SELECT * FROM SharedRoom WHERE property_id = ?", (property_id,))
-                                        if not cur.fetchone():
-                                            cur.execute("""
-                                                INSERT INTO SharedRoom (property_id, total_beds, available_beds, monthly_rent)
-                                                VALUES (?, 2, 2, ?)
-                                            """, (property_id, rent / 2))
-                                            conn.commit()
+                                        if shared_rooms.create_shared_room(conn, property_id, rent):
                                             st.success(f"Room added to shared rooms! Monthly rent per bed: ${rent / 2:.2f}")
                                         else:
                                             st.info("This property is already available as a shared room.")
@@ -893,41 +1284,43 @@ def homeowner_view(conn, username):
         st.subheader("Financial Overview")
         
         try:
-            # Total properties value
-            total_value = pd.read_sql_query("""
-                SELECT SUM(cost) as total_value FROM Property WHERE owner_id = ?
-            """, conn, params=(homeowner['owner_id'],))['total_value'][0]
-
-            total_value = total_value if total_value is not None else 0
-            
-            # Monthly rental income
-            monthly_income = pd.read_sql_query("""
-                SELECT SUM(rent) as monthly_income 
-                FROM Property 
-                WHERE owner_id = ? AND sale_renting = 'rent' AND is_available = 1
-            """, conn, params=(homeowner['owner_id'],))['monthly_income'][0]
-
-            monthly_income = monthly_income if monthly_income is not None else 0
-
+            # One primary-key read of the precomputed portfolio rows (one per property type)
+            portfolio_rows = portfolio.get_portfolio(conn, homeowner['owner_id'])
+            totals = portfolio.portfolio_totals(portfolio_rows)
             
-            col1, col2 = st.columns(2)
+            col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Property Value", f"${total_value:,.2f}")
+                st.metric("Total Property Value", f"${totals['total_value']:,.2f}")
             with col2:
-                st.metric("Monthly Rental Income", f"${monthly_income:,.2f}")
+                st.metric("Monthly Rental Income", f"${totals['monthly_income']:,.2f}")
+            with col3:
+                st.metric("Available Properties", f"{totals['available']} of {totals['properties']}")
+            with col4:
+                occupied_beds = totals['total_beds'] - totals['available_beds']
+                st.metric("Occupied Beds", f"{occupied_beds} of {totals['total_beds']}")
+            st.caption(f"${totals['revenue']:,.2f} collected over {totals['completed_receipts']} completed payments")
             
             # Rental income by property type
-            income_by_type = pd.read_sql_query("""
-                SELECT property_type, SUM(rent) as total_rent
-                FROM Property
-                WHERE owner_id = ? AND sale_renting = 'rent' AND is_available = 1
-                GROUP BY property_type
-            """, conn, params=(homeowner['owner_id'],))
+            income_by_type = pd.DataFrame([
+                {"property_type": row['property_type'], "total_rent": row['monthly_income']}
+                for row in portfolio_rows if row['monthly_income'] > 0
+            ])
             
             if not income_by_type.empty:
                 fig = px.pie(income_by_type, values='total_rent', names='property_type', 
                            title='Rental Income by Property Type')
                 st.plotly_chart(fig, use_container_width=True)
+            
+            by_type = pd.DataFrame([row for row in portfolio_rows if row['properties'] > 0])
+            if not by_type.empty:
+                by_type['occupied'] = by_type['properties'] - by_type['available']
+                by_type['for_sale'] = by_type['properties'] - by_type['for_rent']
+                display_styled_table(by_type[['property_type', 'properties', 'available', 'occupied', 'for_rent',
+                                              'for_sale', 'total_beds', 'available_beds', 'revenue']])
+            
+            # Revenue and occupancy trends for this owner's portfolio
+            st.subheader("Revenue & Occupancy Trends")
+            render_trend_charts(conn, int(homeowner['owner_id']), key="owner_trends")
         except Exception as e:
             print(f"Error fetching financial data: {e}")
     
@@ -936,46 +1329,25 @@ def homeowner_view(conn, username):
         
         try:
             # Get shared rooms with all details
-            shared_rooms = pd.read_sql_query("""
-                SELECT DISTINCT
-                    sr.room_id,
-                    sr.property_id,
-                    sr.total_beds,
-                    sr.available_beds,
-                    sr.monthly_rent,
-                    p.street,
-                    p.city,
-                    p.rent,
-                    p.property_type,
-                    p.description,
-                    p.building
-                FROM SharedRoom sr
-                JOIN Property p ON sr.property_id = p.property_id
-                WHERE p.owner_id = ?
-                ORDER BY sr.room_id DESC
-            """, conn, params=(homeowner['owner_id'],))
+            owner_rooms = pd.DataFrame(shared_rooms.list_owner_shared_rooms(conn, homeowner['owner_id']))
             
             # Debug information
             st.write("Debug Information:")
             st.write(f"Owner ID being queried: {homeowner['owner_id']}")
-            st.write(f"Number of shared rooms found: {len(shared_rooms)}")
+            st.write(f"Number of shared rooms found: {len(owner_rooms)}")
             
             # Let's also check what properties this owner has that are sharing-enabled
-            sharing_enabled_properties = pd.read_sql_query("""
-                SELECT property_id, street, city, sharing_allowed
-                FROM Property
-                WHERE owner_id = ? AND sharing_allowed = 1
-            """, conn, params=(homeowner['owner_id'],))
+            sharing_enabled_properties = pd.DataFrame(properties.get_owner_sharing_properties(conn, homeowner['owner_id']))
             
             st.write("Properties with sharing enabled:")
             st.dataframe(sharing_enabled_properties)
             
-            if not shared_rooms.empty:
+            if not owner_rooms.empty:
                 st.write("Found shared rooms:")
-                st.dataframe(shared_rooms)
+                st.dataframe(owner_rooms)
                 
                 # Display shared rooms with interactive elements
-                for idx, room in shared_rooms.iterrows():
+                for idx, room in owner_rooms.iterrows():
                     with st.expander(f"{room['property_type']} at {room['building']}, {room['street']}, {room['city']}"):
                         col1, col2 = st.columns(2)
                         with col1:
@@ -990,28 +1362,34 @@ def homeowner_view(conn, username):
                         
                         # Show interested customers
                         st.subheader("Interested Customers")
-                        interested_customers = pd.read_sql_query("""
-                            SELECT 
-                                c.first_name,
-                                c.last_name,
-                                c.email,
-                                c.phone
-                            FROM Interested_In_Sharing iis
-                            JOIN Customer c ON iis.customer_id = c.customer_id
-                            WHERE iis.room_id = ?
-                        """, conn, params=(room['room_id'],))
+                        interested_customers = pd.DataFrame(shared_rooms.get_interested_customers(conn, room['room_id']))
                         
                         if not interested_customers.empty:
                             st.dataframe(interested_customers)
                         else:
                             st.info("No customers have shown interest in this room yet.")
                         
+                        # Applicants who found the room full; they get freed beds in this order
+                        waiting = pd.DataFrame(shared_rooms.get_room_waitlist(conn, room['room_id']))
+                        if not waiting.empty:
+                            st.subheader("Waitlist")
+                            st.dataframe(waiting)
+                        
                         # Add management buttons
+                        beds = st.number_input("Total Beds", min_value=1, step=1, value=int(room['total_beds']),
+                                               key=f"total_beds_{room['room_id']}")
+                        if st.button("Update Beds", key=f"update_beds_{room['room_id']}"):
+                            try:
+                                promoted = shared_rooms.set_total_beds(conn, room['room_id'], int(beds))
+                                if promoted is None:
+                                    st.error("A room can't have fewer beds than are occupied.")
+                                else:
+                                    st.success(f"Beds updated! {len(promoted)} customers moved in from the waitlist.")
+                            except Exception as e:
+                                st.error(f"Error updating beds: {str(e)}")
                         if st.button("Remove from Sharing", key=f"remove_sharing_{room['room_id']}"):
                             try:
-                                cur = conn.cursor()
-                                cur.execute("DELETE FROM SharedRoom WHERE room_id = ?", (room['room_id'],))
-                                conn.commit()
+                                shared_rooms.remove_shared_room(conn, room['room_id'])
                                 st.success("Room removed from sharing!")
                                 st.rerun()
                             except Exception as e:
@@ -1026,159 +1404,243 @@ def homeowner_view(conn, username):
 # -------------------------
 # 2c. Customer View
 # -------------------------
-def customer_view(conn, username):
-    st.title("👋 Welcome, Customer!")
-    st.markdown("---")
-    
-    # Get customer details
-    customer = pd.read_sql_query("""
-        SELECT * FROM Customer WHERE username = ?
-    """, conn, params=(username,)).iloc[0]
-    
-    # Display customer profile
-    st.subheader("Your Profile")
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write(f"**Name:** {customer['first_name']} {customer['last_name']}")
-        st.write(f"**Email:** {customer['email']}")
-    with col2:
-        st.write(f"**Phone:** {customer['phone']}")
-        st.write(f"**Username:** {customer['username']}")
-    
-    # Create tabs for different sections
-    tab1, tab2, tab3, tab4 = st.tabs(["🏠 Properties for Rent", "🏢 Properties for Sale", "🏠 Shared Rooms", "📋 Recent Purchases"])
+def live_listings(conn, sale_renting, property_type, min_price, max_price):
+    """
+    Listings for the current filters, kept in session state and brought up
+    to date from the change log: when the Property version moved, only the
+    properties changed since the last poll are re-queried. Filters that only
+    narrow the ones last fetched (a specific type instead of All, a tighter
+    price range) are applied to the fetched rows instead of querying again.
+    """
+    state_key = f"live_listings_{sale_renting}"
+    filters = listing_cache.normalize_filters(sale_renting, property_type, min_price, max_price)
+    # Read before querying, so anything written meanwhile is picked up next poll
+    version = changes.table_version(conn, "Property")
+    snapshot = st.session_state.get(state_key)
+    changed = None
+    if snapshot is not None and listing_cache.narrows(filters, snapshot["filters"]):
+        if snapshot["version"] == version:
+            return narrow_listings(snapshot, filters)
+        changed = changes.changed_row_ids(conn, "Property", snapshot["version"], version)
+    if changed is None:
+        fetched = filters
+        rows = get_listing_cache().search(conn, *fetched)
+        by_id = {row["property_id"]: row for row in rows}
+    else:
+        fetched = snapshot["filters"]
+        by_id = {row["property_id"]: row for row in snapshot["rows"]}
+        for property_id in changed:
+            by_id.pop(property_id, None)
+        if changed:
+            by_id.update((row["property_id"], row) for row in properties.search_listings(
+                conn, *fetched, property_ids=changed))
+    snapshot = {"filters": fetched, "version": version, "rows": [by_id[property_id] for property_id in sorted(by_id)]}
+    st.session_state[state_key] = snapshot
+    return narrow_listings(snapshot, filters)
 
-    with tab1:
-        st.subheader("Available Rental Properties")
-        
-        # Filter options for rental properties
-        col1, col2, col3 = st.columns(3)
+def narrow_listings(snapshot, filters):
+    if snapshot["filters"] == filters:
+        return snapshot["rows"]
+    return [row for row in snapshot["rows"] if listing_cache.matches(filters, row)]
+
+def listing_filters(sale_renting):
+    """
+    Filter controls for a listings tab. They sit in a form, so editing them
+    reruns nothing; the enclosing fragment reruns once when Search is pressed.
+    """
+    label, step = ("Rent", 100) if sale_renting == "rent" else ("Price", 10000)
+    with st.form(f"{sale_renting}_filters_form", border=False):
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
-            property_type = st.selectbox("Property Type", ["All", "apartment", "house", "condo", "villa", "room"], key="rental_property_type")
+            property_type = st.selectbox("Property Type", ["All"] + properties.PROPERTY_TYPES, key=f"{sale_renting}_property_type")
         with col2:
-            min_rent = st.number_input("Minimum Rent", min_value=0, step=100)
+            min_price = st.number_input(f"Minimum {label}", min_value=0, step=step, key=f"min_{sale_renting}_price")
         with col3:
-            max_rent = st.number_input("Maximum Rent", min_value=min_rent, step=100)
-        
-        # Build query for rental properties
-        query = """
-            SELECT p.*, h.first_name || ' ' || h.last_name AS owner_name
-            FROM Property p
-            JOIN HomeOwner h ON p.owner_id = h.owner_id
-            WHERE p.is_available = 1 AND p.sale_renting = 'rent'
-        """
-        params = []
-        
-        # Only add property type filter if a specific type is selected
-        if property_type != "All":
-            query += " AND p.property_type = ?"
-            params.append(property_type)
-        
-        if min_rent > 0:
-            query += " AND p.rent >= ?"
-            params.append(min_rent)
-        
-        if max_rent > min_rent:
-            query += " AND p.rent <= ?"
-            params.append(max_rent)
-        
-        try:
-            properties = pd.read_sql_query(query, conn, params=params)
-            if not properties.empty:
-                cols = st.columns(3)
-                for idx, prop in properties.iterrows():
-                    with cols[idx % 3]:
-                        # Get a random image for the property type
-                        property_type = prop['property_type'].lower()
-                        if property_type == 'apartment':
-                            image_url = PROPERTY_IMAGES[0]  # Modern apartment
-                        elif property_type == 'house':
-                            image_url = PROPERTY_IMAGES[5]  # Modern house
-                        elif property_type == 'condo':
-                            image_url = PROPERTY_IMAGES[10]  # Modern condo
-                        elif property_type == 'villa':
-                            image_url = PROPERTY_IMAGES[15]  # Luxury villa
-                        elif property_type == 'room':
-                            image_url = PROPERTY_IMAGES[20]  # Modern room
-                        else:
-                            # Default to first image if property type doesn't match
-                            image_url = PROPERTY_IMAGES[0]
-                        
-                        # Create a unique key for each property's buttons
-                        rent_key = f"rent_{prop['property_id']}"
-                        share_key = f"share_{prop['property_id']}"
-                        view_key = f"view_{prop['property_id']}"
-                        
+            max_price = st.number_input(f"Maximum {label}", min_value=0, step=step, key=f"max_{sale_renting}_price")
+        with col4:
+            city = st.text_input("City", placeholder="Any city", key=f"{sale_renting}_city")
+        st.form_submit_button("Search")
+    return property_type, min_price, max_price, city
+
+def toggle_details(key):
+    st.session_state[f"{key}_open"] = not st.session_state.get(f"{key}_open", False)
+
+@st.fragment(run_every=LISTING_REFRESH_SECONDS)
+def render_rental_listings(customer):
+    with fragment_connection() as conn:
+        rental_listings(conn, customer)
+
+def rental_listings(conn, customer):
+    property_type, min_rent, max_rent, city = listing_filters("rent")
+    try:
+        rentals = live_listings(conn, "rent", property_type, min_rent, max_rent)
+        rentals = pd.DataFrame(listings_in_city(conn, rentals, city))
+        if not rentals.empty:
+            cols = st.columns(3)
+            for idx, prop in rentals.iterrows():
+                with cols[idx % 3]:
+                    # Get a random image for the property type
+                    property_type = prop['property_type'].lower()
+                    if property_type == 'apartment':
+                        image_url = PROPERTY_IMAGES[0]  # Modern apartment
+                    elif property_type == 'house':
+                        image_url = PROPERTY_IMAGES[5]  # Modern house
+                    elif property_type == 'condo':
+                        image_url = PROPERTY_IMAGES[10]  # Modern condo
+                    elif property_type == 'villa':
+                        image_url = PROPERTY_IMAGES[15]  # Luxury villa
+                    elif property_type == 'room':
+                        image_url = PROPERTY_IMAGES[20]  # Modern room
+                    else:
+                        # Default to first image if property type doesn't match
+                        image_url = PROPERTY_IMAGES[0]
+                    
+                    # Create a unique key for each property's buttons
+                    rent_key = f"rent_{prop['property_id']}"
+                    share_key = f"share_{prop['property_id']}"
+                    view_key = f"view_{prop['property_id']}"
+                    
+                    photo = listing_photo(prop)
+                    if photo is not None:
+                        st.image(photo, width="stretch")
+                    st.markdown(f"""
+                        <div style='padding: 10px; 
+                                border-radius: 10px; 
+                                background-color: #1E1E1E; 
+                                color: #FFFFFF; 
+                                box-shadow: 0 4px 8px rgba(0,0,0,0.3); 
+                                margin-bottom: 10px;'>{card_image_html(photo, image_url)}
+                            <h4 style='color: #FFFFFF;'>{property_type.title()}</h4>
+                            <p><strong>Location:</strong> {prop['street']}, {prop['city']}</p>
+                            <p><strong>Price:</strong> ${float(prop['cost']):,.2f}</p>
+                            <p><strong>Owner:</strong> {prop['owner_name']}</p>
+                            <p><strong>Area:</strong> {prop['area']} sq ft</p>
+                        </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Add buttons in a row
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        if st.button("Rent Now", key=rent_key):
+                            start_checkout(conn, customer, prop['property_id'], prop['rent'])
+                    
+                    with col2:
+                        if st.button("Share Room", key=share_key):
+                            if prop['sale_renting'] == 'rent' and prop['is_available'] == 1:
+                                try:
+                                    if shared_rooms.create_shared_room(conn, prop['property_id'], prop['rent']):
+                                        st.success(f"Room added to shared rooms! Monthly rent per bed: ${prop['rent'] / 2:.2f}")
+                                    else:
+                                        st.info("This property is already available as a shared room.")
+                                except Exception as e:
+                                    st.error(f"Error adding to shared rooms: {e}")
+                            else:
+                                st.warning("This property is not available for renting. Only properties available for rent can be shared.")
+                    
+                    with col3:
+                        # Remembered across the periodic refreshes of this fragment
+                        if st.button("View More", key=view_key):
+                            toggle_details(view_key)
+                    
+                    if st.session_state.get(f"{view_key}_open"):
                         st.markdown(f"""
-                            <div style='padding: 10px; 
+                            <div style='padding: 15px; 
                                     border-radius: 10px; 
-                                    background-color: #1E1E1E; 
+                                    background-color: #2A2A2A; 
                                     color: #FFFFFF; 
                                     box-shadow: 0 4px 8px rgba(0,0,0,0.3); 
-                                    margin-bottom: 10px;'>
-                                <img src="{image_url}" style="width: 100%; height: 200px; object-fit: cover; border-radius: 5px; margin-bottom: 10px;">
-                                <h4 style='color: #FFFFFF;'>{property_type.title()}</h4>
-                                <p><strong>Location:</strong> {prop['street']}, {prop['city']}</p>
-                                <p><strong>Price:</strong> ${float(prop['cost']):,.2f}</p>
-                                <p><strong>Owner:</strong> {prop['owner_name']}</p>
-                                <p><strong>Area:</strong> {prop['area']} sq ft</p>
+                                    margin: 10px 0 20px 0;
+                                    border: 1px solid #444;
+                                    width: 100%;'>
+                                <h3 style='color: #FFFFFF; margin-bottom: 15px; border-bottom: 1px solid #444; padding-bottom: 10px;'>
+                                    Detailed Information
+                                </h3>
+                                <div style='display: grid; grid-template-columns: 1fr 1fr; gap: 15px;'>
+                                    <div>
+                                        <p><strong>Property ID:</strong> {prop['property_id']}</p>
+                                        <p><strong>Property Type:</strong> {property_type.title()}</p>
+                                        <p><strong>Location:</strong> {prop['street']}, {prop['city']}</p>
+                                    </div>
+                                    <div>
+                                        <p><strong>Price:</strong> ${float(prop['cost']):,.2f}</p>
+                                        <p><strong>Owner:</strong> {prop['owner_name']}</p>
+                                        <p><strong>Area:</strong> {prop['area']} sq ft</p>
+                                    </div>
+                                </div>
+                                <div style='margin-top: 15px; padding-top: 15px; border-top: 1px solid #444;'>
+                                    <p><strong>Description:</strong></p>
+                                    <p style='background-color: #1E1E1E; padding: 10px; border-radius: 5px;'>{prop['description']}</p>
+                                </div>
                             </div>
                         """, unsafe_allow_html=True)
-                        
-                        # Add buttons in a row
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            if st.button("Rent Now", key=rent_key):
-                                try:
-                                    cur = conn.cursor()
-                                    # Add to Buy_Rent table
-                                    cur.execute("""
-                                        INSERT INTO Buy_Rent (customer_id, property_id)
-                                        VALUES (?, ?)
-                                    """, (customer['customer_id'], prop['property_id']))
-                                    
-                                    # Add to Receipt table
-                                    cur.execute("""
-                                        INSERT INTO Receipt (property_id, customer_id, amount, payment_status, payment_date)
-                                        VALUES (?, ?, ?, 'completed', DATE('now'))
-                                    """, (prop['property_id'], customer['customer_id'], prop['rent']))
-                                    
-                                    # Update property availability
-                                    cur.execute("""
-                                        UPDATE Property 
-                                        SET is_available = 0 
-                                        WHERE property_id = ?
-                                    """, (prop['property_id'],))
-                                    
-                                    conn.commit()
-                                    st.success(f"You have successfully rented {prop['property_type']} at {prop['street']}, {prop['city']}!")
-                                except Exception as e:
-                                    st.error(f"Error processing rental: {e}")
-                        
-                        with col2:
-                            if st.button("Share Room", key=share_key):
-                                if prop['sale_renting'] == 'rent' and prop['is_available'] == 1:
-                                    try:
-                                        cur = conn.cursor()
-                                        cur.execute("SELECT * FROM SharedRoom WHERE property_id = ?", (prop['property_id'],))
-                                        if not cur.fetchone():
-                                            cur.execute("""
-                                                INSERT INTO SharedRoom (property_id, total_beds, available_beds, monthly_rent)
-                                                VALUES (?, 2, 2, ?)
-                                            """, (prop['property_id'], prop['rent'] / 2))
-                                            conn.commit()
-                                            st.success(f"Room added to shared rooms! Monthly rent per bed: ${prop['rent'] / 2:.2f}")
-                                        else:
-                                            st.info("This property is already available as a shared room.")
-                                    except Exception as e:
-                                        st.error(f"Error adding to shared rooms: {e}")
-                                else:
-                                    st.warning("This property is not available for renting. Only properties available for rent can be shared.")
-                        
-                        with col3:
-                            show_details = st.button("View More", key=view_key)
-                        
-                        if show_details:
+                        render_similar_listings(conn, prop['property_id'])
+        else:
+            st.info("No rental properties match your criteria.")
+    except Exception as e:
+        st.error(f"Error fetching rental properties: {e}")
+
+@st.fragment(run_every=LISTING_REFRESH_SECONDS)
+def render_sale_listings(customer):
+    with fragment_connection() as conn:
+        sale_listings(conn, customer)
+
+def sale_listings(conn, customer):
+    sale_property_type, min_price, max_price, city = listing_filters("sale")
+    try:
+        sale_properties = live_listings(conn, "sale", sale_property_type, min_price, max_price)
+        sale_properties = pd.DataFrame(listings_in_city(conn, sale_properties, city))
+        if not sale_properties.empty:
+            cols = st.columns(3)
+            for idx, prop in sale_properties.iterrows():
+                with cols[idx % 3]:
+                    # Get a random image for the property type
+                    property_type = prop['property_type'].lower()
+                    if property_type == 'apartment':
+                        image_url = PROPERTY_IMAGES[0]  # Modern apartment
+                    elif property_type == 'house':
+                        image_url = PROPERTY_IMAGES[5]  # Modern house
+                    elif property_type == 'condo':
+                        image_url = PROPERTY_IMAGES[10]  # Modern condo
+                    elif property_type == 'villa':
+                        image_url = PROPERTY_IMAGES[15]  # Luxury villa
+                    elif property_type == 'room':
+                        image_url = PROPERTY_IMAGES[20]  # Modern room
+                    else:
+                        # Default to first image if property type doesn't match
+                        image_url = PROPERTY_IMAGES[0]
+                    
+                    # Create unique keys for buttons
+                    buy_key = f"buy_{prop['property_id']}"
+                    view_key = f"view_sale_{prop['property_id']}"
+                    
+                    photo = listing_photo(prop)
+                    if photo is not None:
+                        st.image(photo, width="stretch")
+                    st.markdown(f"""
+                            <div style='padding: 10px; 
+                                border-radius: 10px; 
+                                background-color: #1E1E1E; 
+                                color: #FFFFFF; 
+                                box-shadow: 0 4px 8px rgba(0,0,0,0.3); 
+                                margin-bottom: 10px;'>{card_image_html(photo, image_url)}
+                            <h4 style='color: #FFFFFF;'>{property_type.title()}</h4>
+                            <p><strong>Location:</strong> {prop['street']}, {prop['city']}</p>
+                            <p><strong>Price:</strong> ${prop['cost']:,.2f}</p>
+                            <p><strong>Owner:</strong> {prop['owner_name']}</p>
+                            <p><strong>Area:</strong> {prop['area']} sq ft</p>
+                        </div>
+                    """, unsafe_allow_html=True)
+                    
+                    # Add buttons in a row
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("Buy Now", key=buy_key):
+                            start_checkout(conn, customer, prop['property_id'], prop['cost'])
+                    
+                    with col2:
+                        if st.button("View Details", key=view_key):
+                            toggle_details(view_key)
+                        if st.session_state.get(f"{view_key}_open"):
                             st.markdown(f"""
                                 <div style='padding: 15px; 
                                         border-radius: 10px; 
@@ -1198,7 +1660,7 @@ def customer_view(conn, username):
                                             <p><strong>Location:</strong> {prop['street']}, {prop['city']}</p>
                                         </div>
                                         <div>
-                                            <p><strong>Price:</strong> ${float(prop['cost']):,.2f}</p>
+                                            <p><strong>Price:</strong> ${prop['cost']:,.2f}</p>
                                             <p><strong>Owner:</strong> {prop['owner_name']}</p>
                                             <p><strong>Area:</strong> {prop['area']} sq ft</p>
                                         </div>
@@ -1209,174 +1671,54 @@ def customer_view(conn, username):
                                     </div>
                                 </div>
                             """, unsafe_allow_html=True)
-            else:
-                st.info("No rental properties match your criteria.")
-        except Exception as e:
-            st.error(f"Error fetching rental properties: {e}")
+                            render_similar_listings(conn, prop['property_id'])
+        else:
+            st.info("No properties for sale match your criteria.")
+    except Exception as e:
+        st.error(f"Error fetching properties for sale: {e}")
+
+def customer_view(conn, username):
+    st.title("👋 Welcome, Customer!")
+    st.markdown("---")
+    get_neighbour_refresher()
+    
+    # Get customer details
+    customer = users.get_customer(conn, username)
+    
+    # Display customer profile
+    st.subheader("Your Profile")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**Name:** {customer['first_name']} {customer['last_name']}")
+        st.write(f"**Email:** {customer['email']}")
+    with col2:
+        st.write(f"**Phone:** {customer['phone']}")
+        st.write(f"**Username:** {customer['username']}")
+    
+    render_checkout(conn, customer)
+    
+    # Create tabs for different sections
+    tab1, tab2, tab3, tab4 = st.tabs(["🏠 Properties for Rent", "🏢 Properties for Sale", "🏠 Shared Rooms", "📋 Recent Purchases"])
+
+    with tab1:
+        st.subheader("Available Rental Properties")
+        render_rental_listings(customer)
 
     with tab2:
         st.subheader("Properties for Sale")
-        
-        # Filter options for sale properties
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            sale_property_type = st.selectbox("Property Type", ["All", "apartment", "house", "condo", "villa", "room"], key="sale_property_type")
-        with col2:
-            min_price = st.number_input("Minimum Price", min_value=0, step=10000, key="min_sale_price")
-        with col3:
-            max_price = st.number_input("Maximum Price", min_value=min_price, step=10000, key="max_sale_price")
-        
-        # Build query for sale properties
-        sale_query = """
-            SELECT p.*, h.first_name || ' ' || h.last_name AS owner_name
-            FROM Property p
-            JOIN HomeOwner h ON p.owner_id = h.owner_id
-            WHERE p.is_available = 1 AND p.sale_renting = 'sale'
-        """
-        sale_params = []
-        
-        if sale_property_type != "All":
-            sale_query += " AND p.property_type = ?"
-            sale_params.append(sale_property_type)
-        
-        if min_price > 0:
-            sale_query += " AND p.cost >= ?"
-            sale_params.append(min_price)
-        
-        if max_price > min_price:
-            sale_query += " AND p.cost <= ?"
-            sale_params.append(max_price)
-        
-        try:
-            sale_properties = pd.read_sql_query(sale_query, conn, params=sale_params)
-            if not sale_properties.empty:
-                cols = st.columns(3)
-                for idx, prop in sale_properties.iterrows():
-                    with cols[idx % 3]:
-                        # Get a random image for the property type
-                        property_type = prop['property_type'].lower()
-                        if property_type == 'apartment':
-                            image_url = PROPERTY_IMAGES[0]  # Modern apartment
-                        elif property_type == 'house':
-                            image_url = PROPERTY_IMAGES[5]  # Modern house
-                        elif property_type == 'condo':
-                            image_url = PROPERTY_IMAGES[10]  # Modern condo
-                        elif property_type == 'villa':
-                            image_url = PROPERTY_IMAGES[15]  # Luxury villa
-                        elif property_type == 'room':
-                            image_url = PROPERTY_IMAGES[20]  # Modern room
-                        else:
-                            # Default to first image if property type doesn't match
-                            image_url = PROPERTY_IMAGES[0]
-                        
-                        # Create unique keys for buttons
-                        buy_key = f"buy_{prop['property_id']}"
-                        view_key = f"view_sale_{prop['property_id']}"
-                        
-                        st.markdown(f"""
-                                <div style='padding: 10px; 
-                                    border-radius: 10px; 
-                                    background-color: #1E1E1E; 
-                                    color: #FFFFFF; 
-                                    box-shadow: 0 4px 8px rgba(0,0,0,0.3); 
-                                    margin-bottom: 10px;'>
-                                <img src="{image_url}" style="width: 100%; height: 200px; object-fit: cover; border-radius: 5px; margin-bottom: 10px;">
-                                <h4 style='color: #FFFFFF;'>{property_type.title()}</h4>
-                                <p><strong>Location:</strong> {prop['street']}, {prop['city']}</p>
-                                <p><strong>Price:</strong> ${prop['cost']:,.2f}</p>
-                                <p><strong>Owner:</strong> {prop['owner_name']}</p>
-                                <p><strong>Area:</strong> {prop['area']} sq ft</p>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Add buttons in a row
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.button("Buy Now", key=buy_key):
-                                try:
-                                    cur = conn.cursor()
-                                    # Add to Buy_Rent table
-                                    cur.execute("""
-                                        INSERT INTO Buy_Rent (customer_id, property_id)
-                                        VALUES (?, ?)
-                                    """, (customer['customer_id'], prop['property_id']))
-                                    
-                                    # Add to Receipt table
-                                    cur.execute("""
-                                        INSERT INTO Receipt (property_id, customer_id, amount, payment_status, payment_date)
-                                        VALUES (?, ?, ?, 'completed', DATE('now'))
-                                    """, (prop['property_id'], customer['customer_id'], prop['cost']))
-                                    
-                                    # Update property availability
-                                    cur.execute("""
-                                        UPDATE Property 
-                                        SET is_available = 0 
-                                        WHERE property_id = ?
-                                    """, (prop['property_id'],))
-                                    
-                                    conn.commit()
-                                    st.success(f"You have successfully purchased {property_type.title()} at {prop['street']}, {prop['city']}!")
-                                except Exception as e:
-                                    st.error(f"Error processing purchase: {e}")
-                        
-                        with col2:
-                            if st.button("View Details", key=view_key):
-                                st.markdown(f"""
-                                    <div style='padding: 15px; 
-                                            border-radius: 10px; 
-                                            background-color: #2A2A2A; 
-                                            color: #FFFFFF; 
-                                            box-shadow: 0 4px 8px rgba(0,0,0,0.3); 
-                                            margin: 10px 0 20px 0;
-                                            border: 1px solid #444;
-                                            width: 100%;'>
-                                        <h3 style='color: #FFFFFF; margin-bottom: 15px; border-bottom: 1px solid #444; padding-bottom: 10px;'>
-                                            Detailed Information
-                                        </h3>
-                                        <div style='display: grid; grid-template-columns: 1fr 1fr; gap: 15px;'>
-                                            <div>
-                                                <p><strong>Property ID:</strong> {prop['property_id']}</p>
-                                                <p><strong>Property Type:</strong> {property_type.title()}</p>
-                                                <p><strong>Location:</strong> {prop['street']}, {prop['city']}</p>
-                                            </div>
-                                            <div>
-                                                <p><strong>Price:</strong> ${prop['cost']:,.2f}</p>
-                                                <p><strong>Owner:</strong> {prop['owner_name']}</p>
-                                                <p><strong>Area:</strong> {prop['area']} sq ft</p>
-                                            </div>
-                                        </div>
-                                        <div style='margin-top: 15px; padding-top: 15px; border-top: 1px solid #444;'>
-                                            <p><strong>Description:</strong></p>
-                                            <p style='background-color: #1E1E1E; padding: 10px; border-radius: 5px;'>{prop['description']}</p>
-                                        </div>
-                                    </div>
-                                """, unsafe_allow_html=True)
-            else:
-                st.info("No properties for sale match your criteria.")
-        except Exception as e:
-            st.error(f"Error fetching properties for sale: {e}")
+        render_sale_listings(customer)
 
     with tab3:
+        render_roommate_matching(conn, customer)
+
         st.subheader("Available Shared Rooms")
         
         try:
-            shared_rooms = pd.read_sql_query("""
-                SELECT 
-                    sr.*,
-                    p.street,
-                    p.city,
-                    p.rent,
-                    p.property_type,
-                    p.description,
-                    p.building
-                FROM SharedRoom sr
-                JOIN Property p ON sr.property_id = p.property_id
-                WHERE sr.available_beds > 0
-            """, conn)
+            available_rooms = pd.DataFrame(shared_rooms.list_available_shared_rooms(conn))
             
-            if not shared_rooms.empty:
+            if not available_rooms.empty:
                 # Display shared rooms with interactive elements
-                for idx, room in shared_rooms.iterrows():
+                for idx, room in available_rooms.iterrows():
                     with st.expander(f"Room at {room['street']}, {room['city']}"):
                         col1, col2 = st.columns(2)
                         with col1:
@@ -1392,16 +1734,7 @@ def customer_view(conn, username):
                             
                         # Show interested customers
                         st.subheader("Interested Customers")
-                        interested_customers = pd.read_sql_query("""
-                            SELECT 
-                                c.first_name,
-                                c.last_name,
-                                c.email,
-                                c.phone
-                            FROM Interested_In_Sharing iis
-                            JOIN Customer c ON iis.customer_id = c.customer_id
-                            WHERE iis.room_id = ?
-                        """, conn, params=(room['room_id'],))
+                        interested_customers = pd.DataFrame(shared_rooms.get_interested_customers(conn, room['room_id']))
                         
                         if not interested_customers.empty:
                             st.dataframe(interested_customers)
@@ -1409,8 +1742,23 @@ def customer_view(conn, username):
                             st.info("No customers have shown interest in this room yet.")
                         
                         # Add "Apply for Room" button
-                        if st.button("Apply for Room", key=f"apply_room_{room['room_id']}"):
-                            apply_for_sharing(conn, customer, room['room_id'])
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            if st.button("Apply for Room", key=f"apply_room_{room['room_id']}"):
+                                apply_for_sharing(conn, customer, room['room_id'])
+                        with col3:
+                            if st.button("Reserve Bed", key=f"reserve_bed_{room['room_id']}"):
+                                start_checkout(conn, customer, room_id=room['room_id'])
+                        with col2:
+                            # Shortlisted rooms are preferred by the roommate matcher
+                            if st.button("Add to Shortlist", key=f"shortlist_room_{room['room_id']}"):
+                                try:
+                                    if queued_write("shortlist_room", customer['customer_id'], room['room_id']):
+                                        st.success("Room added to your shortlist!")
+                                    else:
+                                        st.info("This room is already on your shortlist.")
+                                except Exception as e:
+                                    st.error(f"Error shortlisting room: {e}")
             else:
                 st.info("No shared rooms are currently available.")
         except Exception as e:
@@ -1419,28 +1767,12 @@ def customer_view(conn, username):
     with tab4:
         st.subheader("Recent Purchases")
         
+        # Older completed receipts live in the archive partitions
+        include_archived = st.checkbox("Include archived purchases", key="include_archived_purchases")
+        
         try:
             # Get all purchases (both rent and buy) for the customer with proper joins
-            purchases = pd.read_sql_query("""
-                SELECT DISTINCT
-                    p.property_id,
-                    p.property_type,
-                    p.street,
-                    p.city,
-                    p.sale_renting,
-                    CASE 
-                        WHEN p.sale_renting = 'rent' THEN p.rent
-                        ELSE p.cost
-                    END as amount,
-                    r.payment_date,
-                    r.payment_status
-                FROM Buy_Rent br
-                JOIN Property p ON br.property_id = p.property_id
-                JOIN Receipt r ON br.property_id = r.property_id 
-                    AND br.customer_id = r.customer_id
-                WHERE br.customer_id = ?
-                ORDER BY r.payment_date DESC
-            """, conn, params=(customer['customer_id'],))
+            purchases = pd.DataFrame(bookings.get_customer_purchases(conn, customer['customer_id'], include_archived))
             
             if not purchases.empty:
                 # Display purchases in a styled table
@@ -1470,50 +1802,126 @@ def customer_view(conn, username):
         except Exception as e:
             st.error(f"Error fetching purchases: {e}")
 
+def render_roommate_matching(conn, customer):
+    st.subheader("Roommate Matching")
+    try:
+        placements = shared_rooms.get_customer_placements(conn, customer['customer_id'])
+        waitlists = shared_rooms.get_customer_waitlists(conn, customer['customer_id'])
+        preferences = shared_rooms.get_roommate_preferences(conn, customer['customer_id']) or {}
+        waiting = shared_rooms.is_waiting_for_match(conn, customer['customer_id'])
+    except Exception as e:
+        st.error(f"Error loading roommate matching: {e}")
+        return
+
+    for room in placements:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.success(f"You have a bed in room {room['room_id']} at {room['street']}, {room['city']} "
+                       f"(${room['monthly_rent']:,.2f}/month)")
+        with col2:
+            if st.button("Leave Room", key=f"leave_room_{room['room_id']}"):
+                try:
+                    shared_rooms.leave_shared_room(conn, customer['customer_id'], room['room_id'])
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error leaving room: {e}")
+    for room in waitlists:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.info(f"Waitlisted for room {room['room_id']} at {room['street']}, {room['city']}: "
+                    f"position {room['position']}")
+        with col2:
+            if st.button("Leave Waitlist", key=f"leave_waitlist_{room['room_id']}"):
+                try:
+                    shared_rooms.cancel_waitlist(conn, customer['customer_id'], room['room_id'])
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error leaving waitlist: {e}")
+    if waiting:
+        st.info("You are in the matching queue; rooms are assigned automatically as beds become available.")
+
+    with st.form("roommate_preferences_form"):
+        st.write("Tell us what you are looking for and we'll match you with a shared room.")
+        col1, col2 = st.columns(2)
+        with col1:
+            city = st.text_input("Preferred City (optional)", value=preferences.get('city') or "")
+            max_rent = st.number_input("Maximum Rent per Bed", min_value=0.0, step=50.0,
+                                       value=float(preferences.get('max_rent') or 0))
+        with col2:
+            min_beds = st.number_input("Minimum Beds in Room", min_value=0, step=1,
+                                       value=int(preferences.get('min_beds') or 0))
+            max_beds = st.number_input("Maximum Beds in Room", min_value=0, step=1,
+                                       value=int(preferences.get('max_beds') or 0))
+        if st.form_submit_button("Save Preferences"):
+            try:
+                shared_rooms.save_roommate_preferences(conn, customer['customer_id'], city.strip(),
+                                                       max_rent, min_beds, max_beds)
+                st.success("Preferences saved! You'll be matched on the next run.")
+            except Exception as e:
+                st.error(f"Error saving preferences: {e}")
+
+def start_checkout(conn, customer, property_id=None, amount=None, room_id=None):
+    """Reserve a property (or a bed) and send the customer to the checkout panel."""
+    try:
+        if room_id is not None:
+            receipt_id = queued_write("hold_bed", customer['customer_id'], room_id)
+        else:
+            receipt_id = queued_write("hold_property", customer['customer_id'], property_id, amount)
+    except Exception as e:
+        st.error(f"Error starting checkout: {e}")
+        return
+    if receipt_id is None:
+        st.warning("Sorry, this is no longer available.")
+    else:
+        st.rerun()
+
+def render_checkout(conn, customer):
+    try:
+        pending = bookings.get_customer_holds(conn, customer['customer_id'])
+    except Exception as e:
+        st.error(f"Error loading your checkouts: {e}")
+        return
+    if not pending:
+        return
+    st.subheader("🧾 Checkout")
+    st.caption(f"Reservations are held for {bookings.HOLD_MINUTES} minutes; unpaid ones are released automatically.")
+    for hold in pending:
+        what = f"bed in room {hold['room_id']}" if hold['room_id'] is not None else hold['property_type']
+        minutes, seconds = divmod(max(hold['seconds_left'], 0), 60)
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            st.write(f"**{what.title()}** at {hold['street']}, {hold['city']} - ${hold['amount']:,.2f} "
+                     f"(expires in {minutes}:{seconds:02d})")
+        with col2:
+            if st.button("Complete Payment", key=f"confirm_hold_{hold['receipt_id']}"):
+                try:
+                    if queued_write("confirm_hold", customer['customer_id'], hold['receipt_id']) == bookings.CONFIRMED:
+                        st.success(f"Payment complete! The {what} at {hold['street']}, {hold['city']} is yours.")
+                    else:
+                        st.warning("This reservation has expired.")
+                except Exception as e:
+                    st.error(f"Error completing payment: {e}")
+        with col3:
+            if st.button("Cancel", key=f"cancel_hold_{hold['receipt_id']}"):
+                try:
+                    queued_write("cancel_hold", customer['customer_id'], hold['receipt_id'])
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error cancelling reservation: {e}")
+    st.markdown("---")
+
 def apply_for_sharing(conn, customer, room_id):
     try:
-        cur = conn.cursor()
-        
-        # First check if customer has already applied for this room
-        cur.execute("""
-            SELECT 1 FROM Interested_In_Sharing 
-            WHERE customer_id = ? AND room_id = ?
-        """, (customer['customer_id'], room_id))
-        
-        if cur.fetchone():
+        result = queued_write("apply_for_sharing", customer['customer_id'], room_id)
+        if result == shared_rooms.ALREADY_APPLIED:
             st.warning("You have already applied for this room.")
-            return
-        
-        # Check if room has available beds
-        cur.execute("SELECT available_beds FROM SharedRoom WHERE room_id = ?", (room_id,))
-        result = cur.fetchone()
-        
-        if result and result[0] > 0:
-            # Add to Interested_In_Sharing table
-            cur.execute("""
-                INSERT INTO Interested_In_Sharing (customer_id, room_id)
-                VALUES (?, ?)
-            """, (customer['customer_id'], room_id))
-            
-            # Update available beds
-            cur.execute("""
-                UPDATE SharedRoom 
-                SET available_beds = available_beds - 1 
-                WHERE room_id = ?
-            """, (room_id,))
-            
-            # Add to Receipt table
-            cur.execute("""
-                INSERT INTO Receipt (property_id, customer_id, amount, payment_status, payment_date)
-                SELECT sr.property_id, ?, sr.monthly_rent, 'completed', DATE('now')
-                FROM SharedRoom sr
-                WHERE sr.room_id = ?
-            """, (customer['customer_id'], room_id))
-            
-            conn.commit()
+        elif result == shared_rooms.APPLIED:
             st.success("Successfully applied for the shared room!")
+        elif result == shared_rooms.ALREADY_WAITLISTED:
+            st.warning("You are already on the waitlist for this room.")
         else:
-            st.warning("Sorry, this room is already full.")
+            st.info("This room is full, so you have been added to its waitlist. "
+                    "You'll get the next free bed in turn.")
     except Exception as e:
         st.error(f"Error applying for shared room: {e}")
 
@@ -1543,26 +1951,10 @@ def sign_up(conn):
                 else:
                     try:
                         # Check if username already exists
-                        cur = conn.cursor()
-                        cur.execute("SELECT username FROM Credentials WHERE username = ?", (username,))
-                        if cur.fetchone():
+                        if users.username_exists(conn, username):
                             st.error("Username already exists. Please choose another.")
                         else:
-                            # Insert into Credentials table
-                            cur.execute("INSERT INTO Credentials (username, password, user_type) VALUES (?, ?, 'customer')", 
-                                      (username, password))
-                            
-                            # Get the customer_id (should be the same as the last row id)
-                            cur.execute("SELECT last_insert_rowid()")
-                            customer_id = cur.fetchone()[0]
-                            
-                            # Insert into Customer table
-                            cur.execute("""
-                                INSERT INTO Customer (customer_id, username, first_name, last_name, email, phone)
-                                VALUES (?, ?, ?, ?, ?, ?)
-                            """, (customer_id, username, first_name, last_name, email, phone))
-                            
-                            conn.commit()
+                            queued_write("create_customer", username, password, first_name, last_name, email, phone)
                             st.success("Customer account created successfully! You can now log in.")
                     except Exception as e:
                         st.error(f"Error creating account: {e}")
@@ -1586,26 +1978,10 @@ def sign_up(conn):
                 else:
                     try:
                         # Check if username already exists
-                        cur = conn.cursor()
-                        cur.execute("SELECT username FROM Credentials WHERE username = ?", (username,))
-                        if cur.fetchone():
+                        if users.username_exists(conn, username):
                             st.error("Username already exists. Please choose another.")
                         else:
-                            # Insert into Credentials table
-                            cur.execute("INSERT INTO Credentials (username, password, user_type) VALUES (?, ?, 'owner')", 
-                                      (username, password))
-                            
-                            # Get the owner_id (should be the same as the last row id)
-                            cur.execute("SELECT last_insert_rowid()")
-                            owner_id = cur.fetchone()[0]
-                            
-                            # Insert into HomeOwner table
-                            cur.execute("""
-                                INSERT INTO HomeOwner (owner_id, username, first_name, last_name, email, phone_number, verification_status)
-                                VALUES (?, ?, ?, ?, ?, ?, 'pending')
-                            """, (owner_id, username, first_name, last_name, email, phone_number))
-                            
-                            conn.commit()
+                            queued_write("create_homeowner", username, password, first_name, last_name, email, phone_number)
                             st.success("Homeowner account created successfully! You can now log in. Note: Your account will be pending verification by an admin.")
                     except Exception as e:
                         st.error(f"Error creating account: {e}")
@@ -1616,10 +1992,19 @@ def sign_up(conn):
 def main():
     st.title("RealEstateHub: Rent, Share, Own")
 
+    init_database()
     conn = create_connection()
     if not conn:
         st.error("Could not connect to the database.")
         st.stop()
+    get_receipt_archiver()
+    get_roommate_matcher()
+    get_hold_sweeper()
+    get_notification_dispatcher()
+    get_change_compactor()
+    get_audit_logger()
+    get_image_proxy()
+    get_maintenance_scheduler()
     
     # Display sample credentials on the login sidebar
     if "logged_in" not in st.session_state:
@@ -1637,8 +2022,14 @@ def main():
             password = st.sidebar.text_input("Password", type="password")
 
             if st.sidebar.button("Login"):
-                valid, user_type = check_credentials(conn, username, password)
-                if valid:
+                limiter = get_login_limiter()
+                # Throttled attempts are turned away before they reach the database
+                allowed, wait = limiter.attempt(username, client_address())
+                valid, user_type = check_credentials(conn, username, password) if allowed else (False, None)
+                if not allowed:
+                    st.error(f"Too many login attempts. Please try again in {max(wait, 1):.0f} seconds.")
+                elif valid:
+                    limiter.succeeded(username)
                     st.session_state.logged_in = True
                     st.session_state.username = username
                     st.session_state.user_type = user_type
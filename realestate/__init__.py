@@ -0,0 +1,6 @@
+"""
+Data-access and service layer for RealEstateHub.
+
+The Streamlit app (final.py) and the JSON API (realestate.api) both go
+through these modules; nothing in this package depends on Streamlit.
+"""
@@ -0,0 +1,212 @@
+"""
+Headless JSON API over the repository layer, for mobile clients and bulk
+integrations that should not go through Streamlit script reruns.
+
+    python -m realestate.api --db real_estate.db --port 8080
+
+Endpoints (GET only):
+    /health
+    /properties?sale_renting=rent|sale&property_type=&min_price=&max_price=&limit=&offset=
+    /properties/<property_id>
+    /properties/<property_id>/similar?limit=
+    /shared-rooms
+    /reports/revenue
+    /reports/cities
+
+Every 200 response carries a strong ETag, and a request whose If-None-Match
+matches gets an empty 304. Rendered bodies are cached per URL and reused
+until PRAGMA data_version reports a commit from another connection, so
+repeated requests for unchanged data never touch the tables.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from . import recommend
+from .db import DB_FILE, create_connection, query_scalar
+from .repository import properties, reports, shared_rooms
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+RESPONSE_CACHE_SIZE = 1024
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+class BadRequest(Exception):
+    pass
+
+def _int_param(params, name, default=0, minimum=0, maximum=None):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise BadRequest(f"{name} is out of range")
+    return value
+
+class ApiServer:
+    def __init__(self, db_file=DB_FILE, cache_size=RESPONSE_CACHE_SIZE):
+        # A single connection used from a single worker thread keeps SQLite
+        # access serialized without blocking the event loop.
+        self.conn = create_connection(db_file)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-db")
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.data_version = None
+
+    # ---- request routing (runs on the db thread) ----
+
+    def _dispatch(self, path, params):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/properties":
+            sale_renting = params.get("sale_renting", ["rent"])[0]
+            if sale_renting not in ("rent", "sale"):
+                raise BadRequest("sale_renting must be 'rent' or 'sale'")
+            property_type = params.get("property_type", ["All"])[0]
+            if property_type != "All" and property_type not in properties.PROPERTY_TYPES:
+                raise BadRequest("unknown property_type")
+            limit = _int_param(params, "limit", DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+            offset = _int_param(params, "offset", 0)
+            rows = properties.search_listings(
+                self.conn, sale_renting, property_type,
+                _int_param(params, "min_price"), _int_param(params, "max_price"),
+                limit=limit, offset=offset,
+            )
+            return 200, {"items": rows, "limit": limit, "offset": offset}
+        match = re.fullmatch(r"/properties/(\d+)", path)
+        if match:
+            row = properties.get_property(self.conn, int(match.group(1)))
+            if row is None:
+                return 404, {"error": "property not found"}
+            return 200, row
+        match = re.fullmatch(r"/properties/(\d+)/similar", path)
+        if match:
+            limit = _int_param(params, "limit", 5, minimum=1, maximum=recommend.NEIGHBOURS_PER_PROPERTY)
+            return 200, {"items": recommend.get_similar_properties(self.conn, int(match.group(1)), limit)}
+        if path == "/shared-rooms":
+            return 200, {"items": shared_rooms.list_available_shared_rooms(self.conn)}
+        if path == "/reports/revenue":
+            return 200, reports.total_revenue(self.conn)[0]
+        if path == "/reports/cities":
+            return 200, {"items": reports.properties_per_city(self.conn)}
+        return 404, {"error": "not found"}
+
+    def render(self, target):
+        """Return (status, body, etag) for a GET target, serving from cache when the data is unchanged."""
+        version = query_scalar(self.conn, "PRAGMA data_version")
+        if version != self.data_version:
+            self.cache.clear()
+            self.data_version = version
+        cached = self.cache.get(target)
+        if cached is not None:
+            self.cache.move_to_end(target)
+            return cached
+
+        url = urlsplit(target)
+        try:
+            status, payload = self._dispatch(url.path.rstrip("/") or "/", parse_qs(url.query))
+        except BadRequest as e:
+            status, payload = 400, {"error": str(e)}
+        body = json.dumps(payload, default=str).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        response = (status, body, etag)
+        if status == 200:
+            self.cache[target] = response
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return response
+
+    # ---- HTTP plumbing (runs on the event loop) ----
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, 400, b"", None, keep_alive=False)
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+                if method not in ("GET", "HEAD"):
+                    await self._send(writer, 405, b"", None, keep_alive)
+                else:
+                    status, body, etag = await loop.run_in_executor(self.executor, self.render, target)
+                    if status == 200 and etag in _etags(headers.get("if-none-match", "")):
+                        await self._send(writer, 304, b"", etag, keep_alive)
+                    else:
+                        await self._send(writer, status, b"" if method == "HEAD" else body, etag, keep_alive,
+                                         content_length=len(body))
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, status, body, etag, keep_alive, content_length=None):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+        if status != 304:
+            lines.append("Content-Type: application/json")
+            lines.append(f"Content-Length: {len(body) if content_length is None else content_length}")
+        if etag:
+            lines.append(f"ETag: {etag}")
+            lines.append("Cache-Control: no-cache")  # always revalidate, cheap thanks to 304s
+        lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+def _etags(header):
+    """Parse an If-None-Match header into a set of entity tags."""
+    if header.strip() == "*":
+        return _AnyTag()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+class _AnyTag:
+    def __contains__(self, item):
+        return True
+
+def main():
+    parser = argparse.ArgumentParser(description="RealEstateHub JSON API")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    print(f"Serving {args.db} on http://{args.host}:{args.port}")
+    asyncio.run(ApiServer(args.db).serve(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import time
+
+from .db import DB_FILE
+
+RECEIPT_ARCHIVE_AFTER_DAYS = 365     # completed receipts older than this leave the hot table
+RECEIPT_ARCHIVE_INTERVAL = 24 * 3600  # seconds between archival runs
+RECEIPT_COLUMNS = "receipt_id, property_id, customer_id, amount, payment_status, payment_date"
+
+# Archived receipts keep their ids, so new ids must also clear the highest
+# id ever moved into a partition, not just the hot table's maximum.
+NEXT_RECEIPT_ID_SQL = """(SELECT MAX(id) + 1 FROM (
+    SELECT COALESCE(MAX(receipt_id), 0) AS id FROM Receipt
+    UNION ALL
+    SELECT COALESCE(MAX(max_receipt_id), 0) FROM ReceiptArchiveSummary
+))"""
+
+def receipt_partition_table(year):
+    """Name of the yearly archive partition for Receipt."""
+    return f"Receipt_Archive_{int(year)}"
+
+def list_receipt_partitions(conn):
+    """Return the archive partition table names, oldest first."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name LIKE 'Receipt_Archive_%'
+        ORDER BY name
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+def rebuild_receipt_view(conn):
+    """(Re)create Receipt_All as the union of the hot table and every archive partition."""
+    selects = [f"SELECT {RECEIPT_COLUMNS}, 0 AS archived FROM Receipt"]
+    for table in list_receipt_partitions(conn):
+        selects.append(f"SELECT {RECEIPT_COLUMNS}, 1 AS archived FROM {table}")
+    cur = conn.cursor()
+    cur.execute("DROP VIEW IF EXISTS Receipt_All")
+    cur.execute("CREATE VIEW Receipt_All AS " + " UNION ALL ".join(selects))
+
+def ensure_receipt_archive_schema(conn):
+    cur = conn.cursor()
+    # Per-partition revenue totals; archived partitions never change, so
+    # their sums are computed once when rows are moved in.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ReceiptArchiveSummary (
+            partition_year INTEGER PRIMARY KEY,
+            completed_revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            receipt_count INTEGER NOT NULL DEFAULT 0,
+            max_receipt_id INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("PRAGMA table_info(ReceiptArchiveSummary)")
+    if "max_receipt_id" not in [row[1] for row in cur.fetchall()]:
+        cur.execute("ALTER TABLE ReceiptArchiveSummary ADD COLUMN max_receipt_id INTEGER NOT NULL DEFAULT 0")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipt_status_date ON Receipt (payment_status, payment_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipt_customer ON Receipt (customer_id, payment_date)")
+    rebuild_receipt_view(conn)
+    conn.commit()
+
+def archive_old_receipts(conn, older_than_days=RECEIPT_ARCHIVE_AFTER_DAYS):
+    """
+    Move completed receipts older than the cutoff from Receipt into yearly
+    archive partitions and fold their amounts into ReceiptArchiveSummary.
+    Everything happens in one transaction. Returns the number of rows moved.
+    """
+    cutoff = f"-{int(older_than_days)} days"
+    cur = conn.cursor()
+    try:
+        # Opened explicitly: sqlite3 only begins implicitly before DML, which
+        # would leave the partition DDL below outside the transaction
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("""
+            SELECT DISTINCT strftime('%Y', payment_date) AS year
+            FROM Receipt
+            WHERE payment_status = 'completed' AND payment_date < DATE('now', ?)
+        """, (cutoff,))
+        years = [row[0] for row in cur.fetchall() if row[0] is not None]
+        moved = 0
+        for year in years:
+            table = receipt_partition_table(year)
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    receipt_id INT,
+                    property_id INT NOT NULL,
+                    customer_id INT NOT NULL,
+                    amount DECIMAL(10,2) NOT NULL,
+                    payment_status VARCHAR(20) NOT NULL,
+                    payment_date DATE NOT NULL
+                )
+            """)
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_customer ON {table} (customer_id)")
+            where = """
+                payment_status = 'completed' AND payment_date < DATE('now', ?)
+                AND payment_date >= ? AND payment_date < ?
+            """
+            bounds = (cutoff, f"{year}-01-01", f"{int(year) + 1}-01-01")
+            cur.execute(f"INSERT INTO {table} ({RECEIPT_COLUMNS}) SELECT {RECEIPT_COLUMNS} FROM Receipt WHERE {where}", bounds)
+            cur.execute(f"SELECT COUNT(*), COALESCE(SUM(amount), 0), COALESCE(MAX(receipt_id), 0) FROM Receipt WHERE {where}", bounds)
+            count, revenue, max_id = cur.fetchone()
+            cur.execute("""
+                INSERT INTO ReceiptArchiveSummary (partition_year, completed_revenue, receipt_count, max_receipt_id)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(partition_year) DO UPDATE SET
+                    completed_revenue = completed_revenue + excluded.completed_revenue,
+                    receipt_count = receipt_count + excluded.receipt_count,
+                    max_receipt_id = MAX(max_receipt_id, excluded.max_receipt_id)
+            """, (int(year), revenue, count, max_id))
+            cur.execute(f"DELETE FROM Receipt WHERE {where}", bounds)
+            moved += count
+        rebuild_receipt_view(conn)
+        conn.commit()
+        return moved
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+class ReceiptArchiver:
+    """Background job that periodically runs archive_old_receipts()."""
+
+    def __init__(self, db_file=DB_FILE, interval=RECEIPT_ARCHIVE_INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_run_at = None
+        self.last_moved = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="receipt-archiver", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.interval)
+
+    def run_once(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            self.last_moved = archive_old_receipts(conn)
+            self.last_error = None
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+        finally:
+            conn.close()
+        self.last_run_at = time.time()
+        return self.last_moved
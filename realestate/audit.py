@@ -0,0 +1,215 @@
+"""
+Append-only audit log of admin actions.
+
+Entries are small integer rows: when (unix seconds), who (an interned
+actor id), what (an action code from ACTIONS), on which row, plus an
+optional short detail. AuditLogger.log() only queues the entry; a
+background thread writes queued entries in batches with executemany, so
+auditing adds no database round trip to the admin's request. Entries still
+queued when the process dies are lost, which is the trade-off for that.
+
+audit_page() reads the log newest first with keyset pagination on
+(logged_at, entry_id), so page N costs the same as page 1 however large
+the table grows.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+from .db import DB_FILE
+
+# Action codes are stored, so only ever append to this table
+VERIFY_OWNER = 1
+SET_AVAILABILITY = 2
+MARK_UNAVAILABLE = 3
+DECREASE_BEDS = 4
+DELETE_CUSTOMER = 5
+DELETE_PROPERTY = 6
+
+ACTIONS = {
+    VERIFY_OWNER: "verify homeowner",
+    SET_AVAILABILITY: "set property availability",
+    MARK_UNAVAILABLE: "mark property unavailable",
+    DECREASE_BEDS: "decrease available beds",
+    DELETE_CUSTOMER: "delete customer",
+    DELETE_PROPERTY: "delete property",
+}
+
+AUDIT_FLUSH_INTERVAL = 1.0   # seconds between flushes of queued entries
+AUDIT_BATCH = 1000           # entries written per transaction
+AUDIT_SYNC_TIMEOUT = 5.0     # seconds sync() waits for the logger thread
+AUDIT_PAGE_SIZE = 50
+
+def ensure_audit_schema(conn):
+    cur = conn.cursor()
+    # Usernames are interned once so each entry stores a small integer
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS AuditActor (
+            actor_id INTEGER PRIMARY KEY,
+            username VARCHAR(50) NOT NULL UNIQUE
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS AdminAudit (
+            entry_id INTEGER PRIMARY KEY,
+            logged_at INTEGER NOT NULL,
+            actor_id INTEGER NOT NULL,
+            action INTEGER NOT NULL,
+            target_id INTEGER,
+            detail TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_time ON AdminAudit (logged_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_actor ON AdminAudit (actor_id, logged_at)")
+    conn.commit()
+
+def write_entries(conn, entries):
+    """
+    Insert (logged_at, username, action, target_id, detail) tuples in one
+    transaction. Returns the number written.
+    """
+    if not entries:
+        return 0
+    cur = conn.cursor()
+    try:
+        cur.executemany("INSERT OR IGNORE INTO AuditActor (username) VALUES (?)",
+                        [(username,) for username in {entry[1] for entry in entries}])
+        cur.executemany("""
+            INSERT INTO AdminAudit (logged_at, actor_id, action, target_id, detail)
+            VALUES (?, (SELECT actor_id FROM AuditActor WHERE username = ?), ?, ?, ?)
+        """, entries)
+        conn.commit()
+        return len(entries)
+    except Exception:
+        conn.rollback()
+        raise
+
+def audit_page(conn, start=None, end=None, action=None, actor=None, before=None, limit=AUDIT_PAGE_SIZE):
+    """
+    One page of entries with start <= logged_at < end (unix seconds),
+    newest first. `before` is the (logged_at, entry_id) cursor returned with
+    the previous page. Returns (rows, cursor for the next page or None).
+    """
+    where, params = [], []
+    if start is not None:
+        where.append("a.logged_at >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("a.logged_at < ?")
+        params.append(end)
+    if action is not None:
+        where.append("a.action = ?")
+        params.append(action)
+    if actor is not None:
+        where.append("a.actor_id = (SELECT actor_id FROM AuditActor WHERE username = ?)")
+        params.append(actor)
+    if before is not None:
+        where.append("(a.logged_at, a.entry_id) < (?, ?)")
+        params.extend(before)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT a.entry_id, a.logged_at, u.username, a.action, a.target_id, a.detail
+        FROM AdminAudit a
+        JOIN AuditActor u ON a.actor_id = u.actor_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY a.logged_at DESC, a.entry_id DESC
+        LIMIT ?
+    """, (*params, limit + 1))
+    rows = cur.fetchall()
+    next_cursor = (rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    return [{
+        "entry_id": entry_id,
+        "logged_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(logged_at)),
+        "admin": username,
+        "action": ACTIONS.get(action, str(action)),
+        "target_id": target_id,
+        "detail": detail,
+    } for entry_id, logged_at, username, action, target_id, detail in rows[:limit]], next_cursor
+
+class AuditLogger:
+    """Queues audit entries and writes them in batches from a background thread."""
+
+    def __init__(self, db_file=DB_FILE, interval=AUDIT_FLUSH_INTERVAL, batch_size=AUDIT_BATCH):
+        self.db_file = db_file
+        self.interval = interval
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()
+        self.stop_event = threading.Event()
+        self.wake = threading.Event()
+        self.thread = None
+        self.written = 0
+        self.last_error = None
+
+    def log(self, username, action, target_id=None, detail=None):
+        """Record an admin action; returns immediately."""
+        self.queue.put((int(time.time()), username, action, target_id, detail))
+
+    def sync(self, timeout=AUDIT_SYNC_TIMEOUT):
+        """
+        Have the logger thread write out everything queued before this call
+        and wait until it has. Returns False on timeout, or straight away if
+        the thread is not running (nothing is being queued then).
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        self.wake.set()
+        return done.wait(timeout)
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="audit-logger", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            while not self.stop_event.is_set():
+                self.wake.wait(self.interval)
+                self.wake.clear()
+                self.flush(conn)
+            self.flush(conn)
+        finally:
+            conn.close()
+
+    def flush(self, conn):
+        """
+        Write everything queued so far; runs on the logger thread. Returns
+        the number of entries written.
+        """
+        written = 0
+        while True:
+            batch, synced = [], []
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(entry, threading.Event):
+                    synced.append(entry)   # a sync() waiting for the entries queued before it
+                else:
+                    batch.append(entry)
+            if not batch and not synced:
+                return written
+            try:
+                written += write_entries(conn, batch)
+                self.last_error = None
+            except sqlite3.Error as e:
+                # Put the batch back and retry on the next flush
+                self.last_error = str(e)
+                for entry in batch:
+                    self.queue.put(entry)
+                return written
+            finally:
+                for done in synced:
+                    done.set()
+            self.written += len(batch)
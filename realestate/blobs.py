@@ -0,0 +1,213 @@
+"""
+Content-addressed store for owner-uploaded property photos.
+
+Photo bytes live outside SQLite, in files named by their sha256 under
+property_images/, so the database only holds small PropertyImage rows and
+stays quick to back up. Identical uploads share one file: the Blob table
+counts the PropertyImage rows pointing at each digest (kept by triggers),
+and a file is removed when its count drops to zero.
+
+Files are written only while the writing transaction holds SQLite's write
+lock (after its first INSERT). Files are removed only after the DELETE of
+their Blob row has committed, again under the write lock and only if no
+upload has re-created the row since, so an upload and a cleanup of the
+same digest cannot interleave and a rolled-back delete never loses a file.
+A crash between writing a file and committing, or between committing a
+delete and removing the file, leaves an unreferenced file behind;
+sweep_orphans() removes those.
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+
+from .lazy import LazyModule
+
+Image = LazyModule("PIL.Image")
+
+BLOB_DIR = "property_images"
+MAX_PHOTO_BYTES = 10 * 1024 * 1024
+PHOTO_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+ORPHAN_GRACE_SECONDS = 3600
+
+DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+def ensure_blob_schema(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS Blob (
+            digest CHAR(64) PRIMARY KEY,
+            byte_size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PropertyImage (
+            image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            property_id INTEGER NOT NULL,
+            digest CHAR(64) NOT NULL,
+            content_type VARCHAR(20) NOT NULL,
+            byte_size INTEGER NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            uploaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (property_id, digest),
+            FOREIGN KEY (property_id) REFERENCES Property(property_id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_property_image ON PropertyImage (property_id, position)")
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_property_image_insert AFTER INSERT ON PropertyImage
+        BEGIN
+            INSERT OR IGNORE INTO Blob (digest, byte_size) VALUES (NEW.digest, NEW.byte_size);
+            UPDATE Blob SET refcount = refcount + 1 WHERE digest = NEW.digest;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_property_image_delete AFTER DELETE ON PropertyImage
+        BEGIN
+            UPDATE Blob SET refcount = refcount - 1 WHERE digest = OLD.digest;
+        END
+    """)
+    # Foreign keys are not enforced, so removing a property drops its photos here
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_property_image_property_delete AFTER DELETE ON Property
+        BEGIN
+            DELETE FROM PropertyImage WHERE property_id = OLD.property_id;
+        END
+    """)
+    conn.commit()
+
+def photo_content_type(data):
+    """MIME type of an uploaded photo; raises ValueError if it is not an accepted image."""
+    if len(data) > MAX_PHOTO_BYTES:
+        raise ValueError(f"photos must be under {MAX_PHOTO_BYTES // (1024 * 1024)} MB")
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.verify()
+    except Exception:
+        raise ValueError("not a readable image")
+    if image.format not in PHOTO_TYPES:
+        raise ValueError("photos must be JPEG, PNG or WebP")
+    return PHOTO_TYPES[image.format]
+
+class BlobStore:
+    """Files named by the sha256 of their content, sharded by the first two hex pairs."""
+
+    def __init__(self, directory=BLOB_DIR):
+        self.directory = directory
+
+    def path(self, digest):
+        if not DIGEST_PATTERN.fullmatch(digest):
+            raise ValueError("invalid digest")
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest)
+
+    def write(self, digest, data):
+        """Store data under its digest unless it is already there."""
+        path = self.path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def read(self, digest):
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def remove(self, digest):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    def digests(self):
+        """(digest, mtime) of every stored file."""
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if DIGEST_PATTERN.fullmatch(name):
+                    yield name, os.path.getmtime(os.path.join(root, name))
+
+def attach_photos(cur, store, property_id, photos):
+    """
+    Add (data, content_type) photos to a property on an open cursor (no
+    commit); call it inside the writing transaction. Returns the number of
+    new photos (re-uploading one the property already has is a no-op).
+    """
+    cur.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM PropertyImage WHERE property_id = ?", (property_id,))
+    position = cur.fetchone()[0]
+    added = 0
+    for data, content_type in photos:
+        digest = hashlib.sha256(data).hexdigest()
+        cur.execute("""
+            INSERT OR IGNORE INTO PropertyImage (property_id, digest, content_type, byte_size, position)
+            VALUES (?, ?, ?, ?, ?)
+        """, (property_id, digest, content_type, len(data), position))
+        if cur.rowcount:
+            # The INSERT took the write lock, so no cleanup can remove this file meanwhile
+            store.write(digest, data)
+            position += 1
+            added += 1
+    return added
+
+def release_unreferenced(cur):
+    """
+    Drop the Blob rows no photo points at any more on an open cursor (no
+    commit); call it in the transaction that deleted the photos. Returns
+    their digests: pass them to remove_released() once that transaction
+    has committed.
+    """
+    cur.execute("DELETE FROM Blob WHERE refcount <= 0 RETURNING digest")
+    return [row[0] for row in cur.fetchall()]
+
+def remove_released(conn, store, digests):
+    """
+    Remove the files of blobs released by a committed transaction, except
+    those uploaded again since. Returns the number removed.
+    """
+    if not digests:
+        return 0
+    cur = conn.cursor()
+    try:
+        # An empty UPDATE takes the write lock, keeping uploads out while files go
+        cur.execute("UPDATE Blob SET refcount = refcount WHERE 0")
+        removed = 0
+        for digest in digests:
+            cur.execute("SELECT 1 FROM Blob WHERE digest = ?", (digest,))
+            if cur.fetchone() is None:
+                store.remove(digest)
+                removed += 1
+        conn.commit()
+        return removed
+    except Exception:
+        conn.rollback()
+        raise
+
+def sweep_orphans(conn, store, grace_seconds=ORPHAN_GRACE_SECONDS):
+    """
+    Remove files with no Blob row that are older than the grace period
+    (uploads that never committed). Returns the number removed.
+    """
+    cur = conn.cursor()
+    try:
+        # An empty UPDATE takes the write lock, keeping uploads out while files go
+        cur.execute("UPDATE Blob SET refcount = refcount WHERE 0")
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for digest, mtime in list(store.digests()):
+            if mtime < cutoff:
+                cur.execute("SELECT 1 FROM Blob WHERE digest = ?", (digest,))
+                if cur.fetchone() is None:
+                    store.remove(digest)
+                    removed += 1
+        conn.commit()
+        return removed
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,247 @@
+"""
+Change data capture for the core tables.
+
+Triggers append one ChangeLog row per inserted, updated or deleted row of
+Property, SharedRoom, Receipt and HomeOwner, in the writing transaction, so
+the log is exactly as durable as the writes it describes. Sequence numbers
+come from AUTOINCREMENT and only ever grow, even after compaction.
+
+Downstream components (caches, summaries, indexes) read the log through a
+ChangeConsumer: poll what changed since their last acknowledged sequence
+number, re-read just those rows, then ack. compact_changes() drops entries
+every registered consumer has acknowledged.
+"""
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from .db import DB_FILE
+
+# Captured tables and the key written to ChangeLog.row_id
+CAPTURED_TABLES = {
+    "Property": "property_id",
+    "SharedRoom": "room_id",
+    "Receipt": "receipt_id",
+    "HomeOwner": "owner_id",
+    "RoommateMatchQueue": "customer_id",   # for its TableVersion row (see matching.match_pending)
+}
+
+INSERTED, UPDATED, DELETED = "I", "U", "D"
+
+CHANGE_POLL_BATCH = 1000
+CHANGE_COMPACT_INTERVAL = 300   # seconds between compactions
+
+Change = namedtuple("Change", "seq table_name row_id op")
+
+def ensure_change_schema(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ChangeLog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name VARCHAR(30) NOT NULL,
+            row_id INTEGER NOT NULL,
+            op CHAR(1) NOT NULL,
+            changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ChangeConsumer (
+            name VARCHAR(50) PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # One row per captured table holding the seq of its latest change, so
+    # pollers can tell whether anything changed with a single key lookup
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS TableVersion (
+            table_name VARCHAR(30) PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    cur.executemany("INSERT OR IGNORE INTO TableVersion (table_name, version) VALUES (?, ?)",
+                    [(table, latest_seq(conn)) for table in CAPTURED_TABLES])
+    for table, key in CAPTURED_TABLES.items():
+        for event, op, row in (("INSERT", INSERTED, "NEW"), ("UPDATE", UPDATED, "NEW"), ("DELETE", DELETED, "OLD")):
+            # Recreated so databases set up before TableVersion existed pick up the new body
+            cur.execute(f"DROP TRIGGER IF EXISTS trg_cdc_{table.lower()}_{event.lower()}")
+            cur.execute(f"""
+                CREATE TRIGGER trg_cdc_{table.lower()}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO ChangeLog (table_name, row_id, op) VALUES ('{table}', {row}.{key}, '{op}');
+                    UPDATE TableVersion SET version = last_insert_rowid() WHERE table_name = '{table}';
+                END
+            """)
+    conn.commit()
+
+def latest_seq(conn):
+    """Sequence number of the newest change (0 if none was ever logged)."""
+    cur = conn.cursor()
+    # sqlite_sequence keeps the high-water mark even when the log is compacted empty
+    cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'")
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def table_version(conn, table):
+    """Seq of the latest change to a captured table; unchanged means nothing to re-read."""
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM TableVersion WHERE table_name = ?", (table,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def changed_row_ids(conn, table, since_seq, until_seq, limit=CHANGE_POLL_BATCH):
+    """
+    Ids of `table` rows changed in (since_seq, until_seq]. Returns None when
+    the caller should reload instead: the log was compacted past since_seq,
+    or more than `limit` rows changed.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT MIN(seq) FROM ChangeLog")
+    oldest = cur.fetchone()[0]
+    if (oldest if oldest is not None else latest_seq(conn) + 1) > since_seq + 1:
+        return None
+    cur.execute("""
+        SELECT DISTINCT row_id FROM ChangeLog
+        WHERE seq > ? AND seq <= ? AND table_name = ?
+        LIMIT ?
+    """, (since_seq, until_seq, table, limit + 1))
+    ids = [row[0] for row in cur.fetchall()]
+    return ids if len(ids) <= limit else None
+
+def retained_count(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM ChangeLog")
+    return cur.fetchone()[0]
+
+def poll_changes(conn, since_seq, batch_size=CHANGE_POLL_BATCH, tables=None):
+    """Up to `batch_size` changes with seq > since_seq, oldest first, optionally limited to some tables."""
+    cur = conn.cursor()
+    sql = "SELECT seq, table_name, row_id, op FROM ChangeLog WHERE seq > ?"
+    params = [since_seq]
+    if tables:
+        sql += f" AND table_name IN ({', '.join('?' * len(tables))})"
+        params.extend(tables)
+    cur.execute(sql + " ORDER BY seq LIMIT ?", (*params, batch_size))
+    return [Change(*row) for row in cur.fetchall()]
+
+def coalesce(changes):
+    """
+    Collapse a batch to one entry per row, {(table_name, row_id): op}, keeping
+    the last operation: consumers only need to know whether to re-read a row
+    or drop it.
+    """
+    latest = {}
+    for change in changes:
+        latest[(change.table_name, change.row_id)] = change.op
+    return latest
+
+def compact_changes(conn):
+    """
+    Delete changes every registered consumer has acknowledged (or the whole
+    log when nobody is registered). Returns the number of rows removed.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            DELETE FROM ChangeLog
+            WHERE seq <= COALESCE((SELECT MIN(last_seq) FROM ChangeConsumer),
+                                  (SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'))
+        """)
+        removed = cur.rowcount
+        conn.commit()
+        return removed
+    except Exception:
+        conn.rollback()
+        raise
+
+def drop_consumer(conn, name):
+    """Unregister a consumer so it no longer holds back compaction."""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM ChangeConsumer WHERE name = ?", (name,))
+    conn.commit()
+
+class ChangeConsumer:
+    """
+    A named, durable position in the change log. A new consumer starts at
+    the current end of the log (it is expected to load the tables once);
+    pass `start_seq` to replay from an earlier point that is still retained.
+    """
+
+    def __init__(self, conn, name, tables=None, start_seq=None):
+        self.conn = conn
+        self.name = name
+        self.tables = tuple(tables) if tables else None
+        cur = conn.cursor()
+        cur.execute("INSERT OR IGNORE INTO ChangeConsumer (name, last_seq) VALUES (?, ?)",
+                    (name, latest_seq(conn) if start_seq is None else start_seq))
+        conn.commit()
+        cur.execute("SELECT last_seq FROM ChangeConsumer WHERE name = ?", (name,))
+        self.position = cur.fetchone()[0]
+
+    def poll(self, batch_size=CHANGE_POLL_BATCH):
+        """The next batch after the acknowledged position; call ack() once it is applied."""
+        return poll_changes(self.conn, self.position, batch_size, self.tables)
+
+    def ack(self, seq):
+        """Record that everything up to `seq` has been applied."""
+        if seq <= self.position:
+            return
+        cur = self.conn.cursor()
+        cur.execute("UPDATE ChangeConsumer SET last_seq = ?, updated_at = CURRENT_TIMESTAMP WHERE name = ?",
+                    (seq, self.name))
+        self.conn.commit()
+        self.position = seq
+
+    def drain(self, apply, batch_size=CHANGE_POLL_BATCH):
+        """
+        Feed every pending batch to apply(changes), acknowledging after each
+        one. Returns the number of changes applied.
+        """
+        applied = 0
+        while True:
+            changes = self.poll(batch_size)
+            if not changes:
+                return applied
+            apply(changes)
+            self.ack(changes[-1].seq)
+            applied += len(changes)
+
+class ChangeLogCompactor:
+    """Background job that periodically runs compact_changes()."""
+
+    def __init__(self, db_file=DB_FILE, interval=CHANGE_COMPACT_INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_run_at = None
+        self.last_removed = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="changelog-compactor", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.interval)
+
+    def run_once(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            self.last_removed = compact_changes(conn)
+            self.last_error = None
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+        finally:
+            conn.close()
+        self.last_run_at = time.time()
+        return self.last_removed
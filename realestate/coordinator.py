@@ -0,0 +1,293 @@
+"""
+Coordinator for running several app processes against one database.
+
+    python -m realestate.coordinator --address 127.0.0.1:8503
+    REALESTATE_COORDINATOR=127.0.0.1:8503 streamlit run final.py --server.port 8501
+    REALESTATE_COORDINATOR=127.0.0.1:8503 streamlit run final.py --server.port 8511
+    ...
+
+Each Streamlit process has its own memory, so its caches are cold and
+private, and its sessions write to real_estate.db on their own. Several
+processes writing at once then fight over SQLite's file lock, and
+transactions that read before they write fail with "database is locked"
+instead of waiting. With a coordinator, two things move into the one
+process every app process talks to over a local socket:
+
+- the listing cache: one ListingCache serves all processes, so a search
+  cached for one is a hit for every other, and invalidation runs once;
+- writes (signups, new properties, holds, payments, shared-room
+  applications): these run on the coordinator's single writer connection
+  (writer.WriteQueue, which group-commits them), so app processes never
+  contend for the write lock. Admin writes (availability, deletions,
+  verification, audit entries) go the same way;
+- background jobs: receipt archival, roommate matching, the hold sweep,
+  notification delivery, change-log compaction, maintenance, neighbour
+  refreshes and price refits (BACKGROUND_JOBS) run once, here, instead of
+  once per app process.
+
+The socket is a multiprocessing.connection listener (TCP host:port, or a
+Unix socket path). Messages on it are pickles, so only processes knowing
+the key may connect: REALESTATE_COORDINATOR_KEY if set, otherwise a random
+key the coordinator writes to coordinator.key (REALESTATE_COORDINATOR_KEY_FILE)
+on first start, readable by its owner only, for app processes running as
+the same user to read. There is no built-in key.
+"""
+import argparse
+import os
+import secrets
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from . import archive, changes, holds, listing_cache, maintenance, matching, outbox, pricing, recommend, schema
+from .db import DB_FILE, create_connection
+from .writer import WRITE_OPERATIONS, WriteQueue
+
+COORDINATOR_ADDRESS = "127.0.0.1:8503"
+COORDINATOR_POOL_SIZE = 8         # sockets per app process, shared by all of its sessions
+COORDINATOR_IDLE_SECONDS = 60
+COORDINATOR_KEY_FILE = os.environ.get("REALESTATE_COORDINATOR_KEY_FILE", "coordinator.key")
+
+# Jobs app processes leave to the coordinator when one is configured
+BACKGROUND_JOBS = (
+    archive.ReceiptArchiver,
+    matching.RoommateMatcher,
+    holds.HoldSweeper,
+    outbox.NotificationDispatcher,
+    changes.ChangeLogCompactor,
+    maintenance.MaintenanceScheduler,
+    recommend.NeighbourRefresher,
+    pricing.PriceEstimator,
+)
+
+def load_key(key_file=COORDINATOR_KEY_FILE, create=False):
+    """
+    The authkey shared by the coordinator and the app processes:
+    REALESTATE_COORDINATOR_KEY if set, otherwise the contents of key_file.
+    With create (the coordinator), a missing key_file is created holding a
+    new random key. Raises RuntimeError when there is no key, or when
+    key_file can be read by anyone but its owner.
+    """
+    key = os.environ.get("REALESTATE_COORDINATOR_KEY")
+    if key:
+        return key.encode()
+    if create and not os.path.exists(key_file):
+        tmp_path = f"{key_file}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, key_file)   # never replaces a key another process just wrote
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    try:
+        f = open(key_file)
+    except FileNotFoundError:
+        raise RuntimeError(f"no coordinator key: set REALESTATE_COORDINATOR_KEY, or start the "
+                           f"coordinator first so that it writes {key_file}")
+    with f:
+        if os.fstat(f.fileno()).st_mode & 0o077:
+            raise RuntimeError(f"{key_file} must be readable by its owner only (chmod 600 {key_file})")
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"{key_file} is empty")
+    return key.encode()
+
+def parse_address(address):
+    """("host", port) for "host:port", otherwise a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+class Coordinator:
+    """Serves the shared listing cache, runs writes on a single connection and runs the background jobs."""
+
+    def __init__(self, address=COORDINATOR_ADDRESS, authkey=None, db_file=DB_FILE,
+                 cache_bytes=listing_cache.LISTING_CACHE_BYTES):
+        self.address = parse_address(address)
+        self.authkey = authkey or load_key(create=True)
+        self.db_file = db_file
+        self.cache = listing_cache.ListingCache(cache_bytes)
+        self.writer = WriteQueue(db_file)
+        self.jobs = [job(db_file) for job in BACKGROUND_JOBS]
+        self.listener = None
+        self.closed = threading.Event()
+        self.clients = 0
+        self.last_error = None
+
+    def write(self, name, *args):
+        """Run a named write on the coordinator's writer and wait for it to commit."""
+        if name not in WRITE_OPERATIONS:
+            raise ValueError(f"unknown write operation: {name}")
+        return self.writer.call(WRITE_OPERATIONS[name], *args)
+
+    def stats(self):
+        stats = self.cache.stats()
+        writes = self.writer.stats()
+        stats.update(writes=writes["committed_jobs"], failed_writes=writes["failed_jobs"],
+                     jobs_per_commit=writes["jobs_per_commit"], queued_writes=writes["queued"],
+                     clients=self.clients)
+        return stats
+
+    def _serve_client(self, client):
+        conn = create_connection(self.db_file)
+        self.clients += 1
+        try:
+            while True:
+                try:
+                    request = client.recv()
+                except (EOFError, OSError):
+                    break
+                command, args = request[0], request[1:]
+                try:
+                    if command == "search":
+                        reply = ("ok", self.cache.search(conn, *args))
+                    elif command == "write":
+                        reply = ("ok", self.write(*args))
+                    elif command == "stats":
+                        reply = ("ok", self.stats())
+                    elif command == "clear":
+                        reply = ("ok", self.cache.clear())
+                    else:
+                        reply = ("error", ValueError(f"unknown command: {command}"))
+                except Exception as e:
+                    reply = ("error", e)
+                try:
+                    client.send(reply)
+                except (EOFError, OSError):
+                    break
+                except Exception as e:
+                    # The exception itself would not pickle; pass on its message
+                    client.send(("error", RuntimeError(f"{type(e).__name__}: {e}")))
+        finally:
+            self.clients -= 1
+            conn.close()
+            client.close()
+
+    def serve_forever(self):
+        schema.init_database(self.db_file)
+        conn = create_connection(self.db_file)
+        # Readers in the app processes keep reading while the writer commits
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+        self.writer.start()
+        for job in self.jobs:
+            job.start()
+        self.listener = Listener(self.address, authkey=self.authkey)
+        while True:
+            try:
+                client = self.listener.accept()
+            except Exception as e:
+                if self.closed.is_set():
+                    break
+                self.last_error = str(e)   # e.g. a client with the wrong key
+                continue
+            threading.Thread(target=self._serve_client, args=(client,), name="coordinator-client",
+                             daemon=True).start()
+
+    def close(self):
+        self.closed.set()
+        if self.listener is not None:
+            self.listener.close()
+        for job in self.jobs:
+            job.stop()
+
+class CoordinatorClient:
+    """
+    An app process's handle on the coordinator. search()/stats()/clear()
+    match ListingCache, so it stands in for the local cache. Calls share a
+    small pool of sockets: at most pool_size are open, a call waits for a
+    free one, and sockets unused for idle_seconds are closed.
+    """
+
+    def __init__(self, address=COORDINATOR_ADDRESS, authkey=None, pool_size=COORDINATOR_POOL_SIZE,
+                 idle_seconds=COORDINATOR_IDLE_SECONDS):
+        self.address = parse_address(address)
+        self.authkey = authkey or load_key()
+        self.idle_seconds = idle_seconds
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self.lock = threading.Lock()
+        self.idle = []   # (socket, time.monotonic() it was last used), most recently used last
+
+    def _take(self):
+        """An idle socket, or a new one; closes sockets idle for too long."""
+        cutoff = time.monotonic() - self.idle_seconds
+        with self.lock:
+            stale = [client for client, used in self.idle if used < cutoff]
+            self.idle = [(client, used) for client, used in self.idle if used >= cutoff]
+            client = self.idle.pop()[0] if self.idle else None
+        for old in stale:
+            old.close()
+        return client or Client(self.address, authkey=self.authkey)
+
+    def _give_back(self, client):
+        with self.lock:
+            self.idle.append((client, time.monotonic()))
+
+    def close(self):
+        """Close the idle sockets (ones in use close when their call finishes)."""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for client, _ in idle:
+            client.close()
+
+    def _call(self, *request):
+        with self.slots:
+            for attempt in range(2):
+                client = self._take()
+                try:
+                    client.send(request)
+                    status, value = client.recv()
+                    break
+                except (EOFError, OSError):
+                    # The coordinator restarted, so every pooled socket is dead; reconnect
+                    # once, but never resend a write that may have run
+                    client.close()
+                    self.close()
+                    if attempt or request[0] == "write":
+                        raise
+                except BaseException:
+                    client.close()   # a half-read reply would desynchronize the socket
+                    raise
+            self._give_back(client)
+        if status == "error":
+            raise value
+        return value
+
+    def search(self, conn, sale_renting, property_type="All", min_price=0, max_price=0, limit=None, offset=0):
+        return self._call("search", sale_renting, property_type, min_price, max_price, limit, offset)
+
+    def write(self, name, *args):
+        return self._call("write", name, *args)
+
+    def stats(self):
+        return self._call("stats")
+
+    def clear(self):
+        return self._call("clear")
+
+def main():
+    parser = argparse.ArgumentParser(description="RealEstateHub coordinator for multi-process deployments")
+    parser.add_argument("--address", default=COORDINATOR_ADDRESS, help="host:port or a Unix socket path")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--cache-mb", type=int, default=listing_cache.LISTING_CACHE_BYTES // (1024 * 1024))
+    parser.add_argument("--key-file", default=COORDINATOR_KEY_FILE,
+                        help="where the shared key is read from, or written on first start")
+    args = parser.parse_args()
+    try:
+        authkey = load_key(args.key_file, create=True)
+    except RuntimeError as e:
+        parser.error(str(e))
+    coordinator = Coordinator(args.address, authkey=authkey, db_file=args.db,
+                              cache_bytes=args.cache_mb * 1024 * 1024)
+    print(f"Coordinating {args.db} on {args.address}")
+    try:
+        coordinator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
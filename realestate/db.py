@@ -0,0 +1,38 @@
+import sqlite3
+
+DB_FILE = "real_estate.db"
+
+def create_connection(db_file=DB_FILE):
+    """Create and return a database connection."""
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # Allows accessing columns by name
+    return conn
+
+def query_all(conn, query, params=()):
+    """Run a query and return the rows as a list of dicts (column order preserved)."""
+    cur = conn.cursor()
+    cur.execute(query, params)
+    columns = [col[0] for col in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+def query_one(conn, query, params=()):
+    """Run a query and return the first row as a dict, or None."""
+    rows = query_all(conn, query, params)
+    return rows[0] if rows else None
+
+def query_scalar(conn, query, params=(), default=None):
+    """Run a query and return the first column of the first row."""
+    cur = conn.cursor()
+    cur.execute(query, params)
+    row = cur.fetchone()
+    if row is None or row[0] is None:
+        return default
+    return row[0]
+
+def next_id_sql(table, column):
+    """
+    Subquery giving the next id for a table whose INT PRIMARY KEY is not a
+    rowid alias (SQLite would otherwise store NULL ids for new rows). Used
+    inline in the INSERT so id allocation is atomic with the write.
+    """
+    return f"(SELECT COALESCE(MAX({column}), 0) + 1 FROM {table})"
@@ -0,0 +1,106 @@
+"""
+Time-limited booking holds.
+
+Rent Now / Buy Now (and bed reservations) write a pending receipt and a
+BookingHold row instead of completing immediately; the property or bed is
+reserved while the customer pays and the hold is confirmed or cancelled in
+a short transaction of its own (see repository.bookings). HoldSweeper
+releases holds that expire unconfirmed, in batches, walking the expiry
+index.
+"""
+import sqlite3
+import threading
+import time
+
+from .db import DB_FILE
+from .repository.bookings import release_holds
+
+HOLD_SWEEP_INTERVAL = 30   # seconds between sweeps
+HOLD_SWEEP_BATCH = 500     # holds released per transaction
+
+def ensure_hold_schema(conn):
+    cur = conn.cursor()
+    # receipt_id is the pending receipt; room_id is set for bed holds
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS BookingHold (
+            receipt_id INTEGER PRIMARY KEY,
+            customer_id INTEGER NOT NULL,
+            property_id INTEGER NOT NULL,
+            room_id INTEGER,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_hold_expiry ON BookingHold (expires_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_hold_customer ON BookingHold (customer_id)")
+    conn.commit()
+
+def release_expired_holds(conn, batch_size=HOLD_SWEEP_BATCH):
+    """
+    Release every expired hold, one batch per transaction so writers are
+    never blocked for long. Each batch is claimed with DELETE ... RETURNING,
+    which makes the sweep safe against a concurrent confirm of the same
+    hold. Returns the number of holds released.
+    """
+    released = 0
+    cur = conn.cursor()
+    while True:
+        try:
+            cur.execute("""
+                DELETE FROM BookingHold
+                WHERE receipt_id IN (
+                    SELECT receipt_id FROM BookingHold
+                    WHERE expires_at <= CURRENT_TIMESTAMP
+                    ORDER BY expires_at
+                    LIMIT ?
+                )
+                RETURNING receipt_id, property_id, room_id
+            """, (batch_size,))
+            rows = [tuple(row) for row in cur.fetchall()]
+            if not rows:
+                conn.rollback()
+                return released
+            release_holds(cur, rows)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        released += len(rows)
+
+class HoldSweeper:
+    """Background job that periodically runs release_expired_holds()."""
+
+    def __init__(self, db_file=DB_FILE, interval=HOLD_SWEEP_INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_run_at = None
+        self.last_released = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="hold-sweeper", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.interval)
+
+    def run_once(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            self.last_released = release_expired_holds(conn)
+            self.last_error = None
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+        finally:
+            conn.close()
+        self.last_run_at = time.time()
+        return self.last_released
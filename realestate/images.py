@@ -0,0 +1,348 @@
+"""
+Thumbnail proxy for listing photos.
+
+Property cards show photos at 200px high, so the browser should never
+download the multi-megabyte originals. ImageProxy serves
+
+    GET /thumb?src=<source>&w=<width>&h=<height>&fmt=webp|jpeg
+
+by cropping the source to the requested size once (Pillow), storing the
+result in a content-addressed on-disk cache and answering every later
+request for it from disk with long-lived, immutable cache headers. The
+cache key is a hash of (source, size, format), so a URL always names the
+same bytes; the cache is bounded in bytes and evicts least recently used
+files first.
+
+    python -m realestate.images --port 8502
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from . import blobs
+from .lazy import LazyModule
+
+Image = LazyModule("PIL.Image")
+ImageOps = LazyModule("PIL.ImageOps")
+
+IMAGE_CACHE_DIR = "image_cache"
+IMAGE_CACHE_BYTES = 256 * 1024 * 1024
+IMAGE_PROXY_HOST = "127.0.0.1"
+IMAGE_PROXY_PORT = 8502
+
+# Only these sizes are generated, so a client cannot fill the cache with variants
+CARD_SIZE = (720, 320)
+THUMB_SIZES = {CARD_SIZE, (360, 160)}
+THUMB_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+THUMB_QUALITY = 80
+
+ALLOWED_SOURCE_HOSTS = {"images.unsplash.com"}
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+FETCH_TIMEOUT = 10
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    502: "Bad Gateway",
+}
+
+class SourceError(Exception):
+    """The source image is not allowed or could not be loaded."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def thumbnail_key(source, width, height, fmt):
+    return hashlib.sha256(f"{source}\n{width}x{height}\n{fmt}".encode()).hexdigest()
+
+def thumbnail_path(source, width=CARD_SIZE[0], height=CARD_SIZE[1], fmt="webp"):
+    """Proxy path (without host) of a thumbnail."""
+    return "/thumb?" + urlencode({"src": source, "w": width, "h": height, "fmt": fmt})
+
+def check_source_url(source):
+    """Raise SourceError unless source is an https URL on an allowed host."""
+    url = urlsplit(source)
+    if url.scheme != "https" or url.hostname not in ALLOWED_SOURCE_HOSTS:
+        raise SourceError(403, "image source not allowed")
+
+class SourceRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follows a redirect only if its target is itself an allowed source."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_source_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+# An allowed host must not be able to bounce the fetch to an internal address
+source_opener = urllib.request.build_opener(SourceRedirectHandler)
+
+def check_source(source):
+    """Raise SourceError unless source names an uploaded photo or an allowed URL (nothing is fetched)."""
+    if source.startswith("blob:"):
+        if not blobs.DIGEST_PATTERN.fullmatch(source[len("blob:"):]):
+            raise SourceError(404, "photo not found")
+    else:
+        check_source_url(source)
+
+def parse_etags(if_none_match):
+    """The entity tags listed in an If-None-Match header, compared weakly (W/ dropped)."""
+    tags = set()
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.add(tag)
+    return tags
+
+def load_source(source):
+    """Original image bytes for an uploaded photo (blob:<digest>) or a URL on an allowed host."""
+    if source.startswith("blob:"):
+        try:
+            return blobs.BlobStore().read(source[len("blob:"):])
+        except (OSError, ValueError):
+            raise SourceError(404, "photo not found")
+    check_source_url(source)
+    try:
+        with source_opener.open(source, timeout=FETCH_TIMEOUT) as response:
+            data = response.read(MAX_SOURCE_BYTES + 1)
+    except OSError as e:
+        raise SourceError(502, f"could not fetch image: {e}")
+    if len(data) > MAX_SOURCE_BYTES:
+        raise SourceError(502, "image too large")
+    return data
+
+def make_thumbnail(data, width, height, fmt):
+    """Crop and scale image bytes to exactly width x height (like CSS object-fit: cover)."""
+    image = Image.open(io.BytesIO(data))
+    # JPEGs decode straight at a reduced scale; the square bound still covers a rotated photo
+    image.draft("RGB", (max(width, height),) * 2)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    thumb = ImageOps.fit(image, (width, height), method=Image.LANCZOS)
+    out = io.BytesIO()
+    thumb.save(out, THUMB_FORMATS[fmt][0], quality=THUMB_QUALITY)
+    return out.getvalue()
+
+def card_thumbnail(source, cache):
+    """Card-sized thumbnail bytes of a source, generated on first use and read from the cache after."""
+    key = thumbnail_key(source, *CARD_SIZE, "webp")
+    data = cache.get(key)
+    if data is None:
+        data = make_thumbnail(load_source(source), *CARD_SIZE, "webp")
+        cache.put(key, data)
+    return data
+
+class ImageCache:
+    """A directory of files named by their cache key, bounded in total bytes (LRU by mtime)."""
+
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        yield entry.path, stat.st_size, stat.st_mtime
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        with self.lock:
+            # A key written again (e.g. by two racing requests) replaces the old file
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            self.total_bytes += len(data) - replaced
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until the cache is back under 90% of its budget."""
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self.total_bytes = total
+
+class ImageProxy:
+    """Serves thumbnails over HTTP, generating each one at most once."""
+
+    def __init__(self, cache=None, host=IMAGE_PROXY_HOST, port=IMAGE_PROXY_PORT):
+        self.cache = cache or ImageCache()
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-proxy")
+        self.pending = {}   # cache key -> future of a thumbnail being generated
+        self.thread = None
+        self.hits = 0
+        self.generated = 0
+        self.last_error = None
+
+    def start(self):
+        """Serve from a background thread (used when embedded in the Streamlit app)."""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="image-proxy", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        try:
+            asyncio.run(self.serve())
+        except OSError as e:
+            self.last_error = str(e)   # e.g. the port is taken by another process
+
+    def _generate(self, key, source, width, height, fmt):
+        data = self.cache.get(key)
+        if data is None:
+            data = make_thumbnail(load_source(source), width, height, fmt)
+            self.cache.put(key, data)
+            self.generated += 1
+        else:
+            self.hits += 1
+        return data
+
+    async def thumbnail(self, source, width, height, fmt):
+        """Thumbnail bytes; concurrent requests for the same one share a single generation."""
+        key = thumbnail_key(source, width, height, fmt)
+        future = self.pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._generate, key, source, width, height, fmt)
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+        return key, await future
+
+    async def respond(self, target, if_none_match=""):
+        """(status, body, headers) for a GET target."""
+        url = urlsplit(target)
+        if url.path != "/thumb":
+            return 404, b"", {}
+        params = parse_qs(url.query)
+        try:
+            source = params["src"][0]
+            size = (int(params["w"][0]), int(params["h"][0]))
+        except (KeyError, ValueError):
+            return 400, b"", {}
+        fmt = params.get("fmt", ["webp"])[0]
+        if size not in THUMB_SIZES or fmt not in THUMB_FORMATS:
+            return 400, b"", {}
+        try:
+            check_source(source)
+        except SourceError as e:
+            return e.status, b"", {}
+        etag = '"' + thumbnail_key(source, *size, fmt) + '"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+        tags = parse_etags(if_none_match)
+        if etag in tags or "*" in tags:
+            return 304, b"", headers
+        try:
+            _, body = await self.thumbnail(source, *size, fmt)
+        except SourceError as e:
+            return e.status, b"", {}
+        except Exception as e:
+            self.last_error = str(e)   # not a decodable image
+            return 502, b"", {}
+        headers["Content-Type"] = THUMB_FORMATS[fmt][1]
+        return 200, body, headers
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+                if method not in ("GET", "HEAD"):
+                    status, body, response_headers = 405, b"", {}
+                else:
+                    status, body, response_headers = await self.respond(target, headers.get("if-none-match", ""))
+                lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+                lines += [f"{name}: {value}" for name, value in response_headers.items()]
+                if status != 304:
+                    lines.append(f"Content-Length: {len(body)}")
+                lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (b"" if method == "HEAD" else body))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="RealEstateHub thumbnail proxy")
+    parser.add_argument("--cache-dir", default=IMAGE_CACHE_DIR)
+    parser.add_argument("--cache-mb", type=int, default=IMAGE_CACHE_BYTES // (1024 * 1024))
+    parser.add_argument("--host", default=IMAGE_PROXY_HOST)
+    parser.add_argument("--port", type=int, default=IMAGE_PROXY_PORT)
+    args = parser.parse_args()
+    proxy = ImageProxy(ImageCache(args.cache_dir, args.cache_mb * 1024 * 1024), args.host, args.port)
+    print(f"Serving thumbnails on http://{args.host}:{args.port} (cache in {args.cache_dir})")
+    asyncio.run(proxy.serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import importlib
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported the first time one of its
+    attributes is used. Keeps pandas, plotly and numpy off the login page's startup path.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pd = LazyModule("pandas")
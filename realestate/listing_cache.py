@@ -0,0 +1,142 @@
+"""
+Shared read-through cache for listing searches.
+
+Results of properties.search_listings() are cached per normalized filter
+combination in one process-wide LRU bounded by an estimate of their size in
+bytes, so popular filters are served without SQL across all sessions.
+
+Invalidation is driven by the change log: before serving, the cache checks
+the Property/HomeOwner table versions and, when they moved, re-reads just
+the properties changed since. A cached result is dropped only if one of
+those properties was in it or now matches its filter; anything else is
+still exactly what the query would return. A HomeOwner change (owner names
+appear in results) or a gap in the log clears everything.
+"""
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+from . import changes
+from .db import query_all
+from .repository import properties
+
+LISTING_CACHE_BYTES = 64 * 1024 * 1024
+
+Entry = namedtuple("Entry", "rows ids size")
+
+def normalize_filters(sale_renting, property_type="All", min_price=0, max_price=0):
+    """Filters as search_listings() applies them, so equivalent searches share an entry."""
+    min_price = min_price if min_price > 0 else 0
+    max_price = max_price if max_price > min_price else 0
+    return (sale_renting, property_type or "All", min_price, max_price)
+
+def matches(filters, row):
+    """Whether a Property row satisfies normalized filters."""
+    sale_renting, property_type, min_price, max_price = filters
+    if not row["is_available"] or row["sale_renting"] != sale_renting:
+        return False
+    if property_type != "All" and row["property_type"] != property_type:
+        return False
+    price = row["rent"] if sale_renting == "rent" else row["cost"]
+    if min_price and (price is None or price < min_price):
+        return False
+    if max_price and (price is None or price > max_price):
+        return False
+    return True
+
+def narrows(filters, base):
+    """Whether every listing matching `filters` also matches `base`, so base's rows can be filtered instead."""
+    sale_renting, property_type, min_price, max_price = filters
+    base_sale_renting, base_type, base_min, base_max = base
+    return (sale_renting == base_sale_renting and base_type in ("All", property_type)
+            and min_price >= base_min and (not base_max or 0 < max_price <= base_max))
+
+class ListingCache:
+    def __init__(self, max_bytes=LISTING_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # (filters, limit, offset) -> Entry
+        self.bytes = 0
+        self.versions = None           # (Property, HomeOwner) versions the entries reflect
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.evicted = 0
+
+    def search(self, conn, sale_renting, property_type="All", min_price=0, max_price=0, limit=None, offset=0):
+        """search_listings() through the cache."""
+        versions = self.refresh(conn)
+        filters = normalize_filters(sale_renting, property_type, min_price, max_price)
+        key = (filters, limit, offset)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry.rows
+            self.misses += 1
+        rows = properties.search_listings(conn, *filters, limit=limit, offset=offset)
+        entry = Entry(rows, frozenset(row["property_id"] for row in rows), len(json.dumps(rows, default=str)))
+        with self.lock:
+            # A refresh that ran meanwhile may already have judged this key; only store if none did
+            if self.versions == versions and key not in self.entries:
+                self.entries[key] = entry
+                self.bytes += entry.size
+                while self.bytes > self.max_bytes and self.entries:
+                    _, old = self.entries.popitem(last=False)
+                    self.bytes -= old.size
+                    self.evicted += 1
+        return rows
+
+    def refresh(self, conn):
+        """Bring the entries up to date with the change log; returns the versions they now reflect."""
+        versions = (changes.table_version(conn, "Property"), changes.table_version(conn, "HomeOwner"))
+        with self.lock:
+            if versions == self.versions:
+                return versions
+            previous = self.versions
+            if previous is None or versions[1] != previous[1]:
+                self._drop(list(self.entries))
+                self.versions = versions
+                return versions
+        changed = changes.changed_row_ids(conn, "Property", previous[0], versions[0])
+        current = [] if not changed else query_all(conn, f"""
+            SELECT property_id, sale_renting, property_type, is_available, rent, cost
+            FROM Property WHERE property_id IN ({', '.join('?' * len(changed))})
+        """, changed)
+        with self.lock:
+            if self.versions != previous:
+                return self.versions  # another session already applied these changes
+            if changed is None:
+                self._drop(list(self.entries))
+            else:
+                changed_ids = set(changed)
+                # Pages of one filter shift together, so judge whole filters, not entries
+                stale = {key[0] for key, entry in self.entries.items() if entry.ids & changed_ids}
+                stale.update(filters for filters, _, _ in self.entries
+                             if any(matches(filters, row) for row in current))
+                self._drop([key for key in self.entries if key[0] in stale])
+            self.versions = versions
+        return versions
+
+    def _drop(self, keys):
+        for key in keys:
+            self.bytes -= self.entries.pop(key).size
+        self.invalidated += len(keys)
+
+    def clear(self):
+        with self.lock:
+            self._drop(list(self.entries))
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "invalidated": self.invalidated,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,184 @@
+"""
+Scheduled database maintenance.
+
+MaintenanceScheduler wakes up every `tick` seconds and runs whichever jobs
+are due: PRAGMA optimize (refreshes planner statistics where they drifted),
+a full ANALYZE, WAL checkpoints, VACUUM when enough of the file is free
+pages, and cleanup of stale rows (delivered notifications, old run
+history, orphaned photo files).
+
+Each job has a row in MaintenanceJob. A scheduler claims a job with one
+UPDATE that only succeeds if the job is due and nobody holds its lease, so
+with several app processes (or threads) each job still runs once per
+interval. A lease expires after LEASE_SECONDS, so a process that died
+mid-job does not block it forever. Every run is recorded in MaintenanceRun
+with its duration and outcome.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from . import blobs
+from .db import DB_FILE
+
+MAINTENANCE_TICK = 60               # seconds between checks for due jobs
+LEASE_SECONDS = 3600                # a claimed job is considered abandoned after this
+VACUUM_FREE_RATIO = 0.2             # vacuum once this share of pages is free
+OUTBOX_RETENTION_DAYS = 30          # delivered notifications kept this long
+RUN_HISTORY_DAYS = 90
+
+Job = namedtuple("Job", "name interval fn description")
+
+def optimize(conn):
+    conn.execute("PRAGMA optimize")
+    return "ok"
+
+def analyze(conn):
+    conn.execute("ANALYZE")
+    return "ok"
+
+def checkpoint(conn):
+    busy, log_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    if log_pages < 0:
+        return "not in WAL mode"
+    return f"{checkpointed}/{log_pages} pages" + (" (busy)" if busy else "")
+
+def vacuum(conn, free_ratio=VACUUM_FREE_RATIO):
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if not pages or free / pages < free_ratio:
+        return f"skipped, {free}/{pages} pages free"
+    conn.execute("VACUUM")
+    return f"reclaimed {free} pages"
+
+def purge_stale(conn, outbox_days=OUTBOX_RETENTION_DAYS, history_days=RUN_HISTORY_DAYS):
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM Outbox WHERE dispatched_at < DATETIME('now', ?)", (f"-{int(outbox_days)} days",))
+        notifications = cur.rowcount
+        cur.execute("DELETE FROM MaintenanceRun WHERE started_at < ?", (time.time() - history_days * 86400,))
+        runs = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    photos = blobs.sweep_orphans(conn, blobs.BlobStore())
+    return f"{notifications} notifications, {runs} runs, {photos} orphaned photos"
+
+JOBS = [
+    Job("optimize", 3600, optimize, "PRAGMA optimize"),
+    Job("wal_checkpoint", 300, checkpoint, "Checkpoint and truncate the WAL"),
+    Job("analyze", 24 * 3600, analyze, "Full ANALYZE"),
+    Job("purge_stale", 24 * 3600, purge_stale, "Delete delivered notifications, old run history and orphaned photos"),
+    Job("vacuum", 7 * 24 * 3600, vacuum, "VACUUM when enough pages are free"),
+]
+
+def ensure_maintenance_schema(conn):
+    cur = conn.cursor()
+    # Times are unix seconds; next_run_at <= now means due
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS MaintenanceJob (
+            name VARCHAR(40) PRIMARY KEY,
+            next_run_at REAL NOT NULL DEFAULT 0,
+            lease_owner VARCHAR(80),
+            lease_expires_at REAL NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS MaintenanceRun (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job VARCHAR(40) NOT NULL,
+            worker VARCHAR(80) NOT NULL,
+            started_at REAL NOT NULL,
+            duration_ms REAL NOT NULL,
+            status VARCHAR(10) NOT NULL,
+            detail TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_run_job ON MaintenanceRun (job, started_at)")
+    cur.executemany("INSERT OR IGNORE INTO MaintenanceJob (name) VALUES (?)", [(job.name,) for job in JOBS])
+    conn.commit()
+
+def claim_job(conn, name, worker, now=None, force=False):
+    """Take the job's lease if it is due (or `force`) and not held. Returns True if claimed."""
+    now = time.time() if now is None else now
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE MaintenanceJob SET lease_owner = ?, lease_expires_at = ?
+        WHERE name = ? AND lease_expires_at <= ? AND (next_run_at <= ? OR ?)
+    """, (worker, now + LEASE_SECONDS, name, now, now, force))
+    conn.commit()
+    return cur.rowcount == 1
+
+def finish_job(conn, job, worker, started_at, status, detail):
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO MaintenanceRun (job, worker, started_at, duration_ms, status, detail)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (job.name, worker, started_at, (time.time() - started_at) * 1000, status, detail))
+    cur.execute("""
+        UPDATE MaintenanceJob SET next_run_at = ?, lease_owner = NULL, lease_expires_at = 0
+        WHERE name = ? AND lease_owner = ?
+    """, (started_at + job.interval, job.name, worker))
+    conn.commit()
+
+class MaintenanceScheduler:
+    """Background job that runs due maintenance jobs, each in at most one worker at a time."""
+
+    def __init__(self, db_file=DB_FILE, jobs=JOBS, tick=MAINTENANCE_TICK):
+        self.db_file = db_file
+        self.jobs = {job.name: job for job in jobs}
+        self.tick = tick
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_run_at = None
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.tick)
+
+    def run_once(self):
+        """Run every job that is due. Returns the names of the jobs this worker ran."""
+        ran = []
+        for name in self.jobs:
+            try:
+                if self.run_job(name):
+                    ran.append(name)
+            except sqlite3.Error as e:
+                self.last_error = str(e)
+        self.last_run_at = time.time()
+        return ran
+
+    def run_job(self, name, force=False):
+        """Claim and run one job. Returns False if it was not due or another worker holds it."""
+        job = self.jobs[name]
+        conn = sqlite3.connect(self.db_file)
+        try:
+            if not claim_job(conn, name, self.worker, force=force):
+                return False
+            started_at = time.time()
+            try:
+                status, detail = "ok", job.fn(conn)
+            except Exception as e:
+                conn.rollback()
+                status, detail = "failed", str(e)
+                self.last_error = f"{name}: {e}"
+            finish_job(conn, job, self.worker, started_at, status, detail)
+            return True
+        finally:
+            conn.close()
@@ -0,0 +1,356 @@
+"""
+Roommate matching for shared rooms.
+
+Customers who shortlist rooms (Interested_In_Sharing) or save roommate
+preferences are queued in RoommateMatchQueue by triggers. match_pending()
+assigns everyone still waiting to rooms with free beds in one batch using
+an auction algorithm, so the total compatibility of the placements is
+(near) maximal instead of first come, first served. Existing placements in
+Participates are never moved; each run only distributes the free beds
+among the waiting customers.
+"""
+import bisect
+import heapq
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from . import changes
+from .db import DB_FILE
+from .repository.shared_rooms import take_bed
+
+MATCH_INTERVAL = 15          # seconds between checks for new queue entries
+MAX_CANDIDATE_ROOMS = 24     # rooms considered per customer, spread over their budget
+AUCTION_EPSILON = 0.01       # minimum bid increment; the result is within n * epsilon of optimal
+
+# Everything that can give a waiting customer a new chance lands in one of
+# these: new interest and preferences (re)queue the customer, new rooms and
+# freed beds change SharedRoom
+MATCH_INPUT_TABLES = ("RoommateMatchQueue", "SharedRoom")
+
+# Compatibility score of a (customer, room) pair; only pairs that satisfy
+# the customer's city, budget and bed-count preferences are scored at all
+MATCH_WEIGHTS = {
+    "base": 1.0,
+    "interest": 2.0,   # the customer shortlisted this room
+    "budget": 1.0,     # scaled by how far below the budget the rent is
+}
+
+def ensure_matching_schema(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS RoommatePreference (
+            customer_id INTEGER PRIMARY KEY,
+            city VARCHAR(50),
+            max_rent DECIMAL(10,2),
+            min_beds INTEGER,
+            max_beds INTEGER,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # attempted = 1 once a run has failed to place the customer; new interest
+    # or freed beds reset it so the matcher knows there is work to do.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS RoommateMatchQueue (
+            customer_id INTEGER PRIMARY KEY,
+            queued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            attempted INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    enqueue = """
+        INSERT INTO RoommateMatchQueue (customer_id) VALUES (NEW.customer_id)
+        ON CONFLICT(customer_id) DO UPDATE SET attempted = 0;
+    """
+    for name, event in (
+        ("trg_match_interest_insert", "AFTER INSERT ON Interested_In_Sharing"),
+        ("trg_match_preference_insert", "AFTER INSERT ON RoommatePreference"),
+        ("trg_match_preference_update", "AFTER UPDATE ON RoommatePreference"),
+    ):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} {event}
+            WHEN NOT EXISTS (SELECT 1 FROM Participates WHERE customer_id = NEW.customer_id)
+            BEGIN
+                {enqueue}
+            END
+        """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_match_room_insert AFTER INSERT ON SharedRoom
+        BEGIN
+            UPDATE RoommateMatchQueue SET attempted = 0 WHERE attempted = 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_match_beds_freed AFTER UPDATE OF available_beds ON SharedRoom
+        WHEN NEW.available_beds > OLD.available_beds
+        BEGIN
+            UPDATE RoommateMatchQueue SET attempted = 0 WHERE attempted = 1;
+        END
+    """)
+    conn.commit()
+
+def compatibility(preference, room, interested):
+    """
+    Score for placing a customer in a room, or None if the room violates
+    their preferences. Customers without saved preferences are only matched
+    to rooms they shortlisted.
+    """
+    if preference is None:
+        return MATCH_WEIGHTS["base"] + MATCH_WEIGHTS["interest"] if interested else None
+    city, max_rent, min_beds, max_beds = preference
+    if city and room["city"] != city:
+        return None
+    if max_rent and room["monthly_rent"] > max_rent:
+        return None
+    if (min_beds and room["total_beds"] < min_beds) or (max_beds and room["total_beds"] > max_beds):
+        return None
+    score = MATCH_WEIGHTS["base"]
+    if interested:
+        score += MATCH_WEIGHTS["interest"]
+    if max_rent:
+        score += MATCH_WEIGHTS["budget"] * (1.0 - room["monthly_rent"] / max_rent)
+    return score
+
+class RoomCatalog:
+    """Rooms with free beds, grouped by city and sorted by rent for candidate lookup."""
+
+    def __init__(self, rooms):
+        self.rooms = {room["room_id"]: room for room in rooms}
+        self.by_city = {}
+        for room in sorted(rooms, key=lambda r: r["monthly_rent"]):
+            self.by_city.setdefault(room["city"], []).append(room)
+            self.by_city.setdefault(None, []).append(room)
+        self.rents = {city: [room["monthly_rent"] for room in group] for city, group in self.by_city.items()}
+
+    def candidates(self, preference, shortlist=()):
+        """
+        Return {room_id: score} for a customer. Affordable rooms are sampled
+        evenly across the rent range (cheapest through closest to budget) so
+        that customers with similar preferences don't all compete for the
+        same few rooms; shortlisted rooms are always included.
+        """
+        scores = {}
+        for room_id in shortlist:
+            room = self.rooms.get(room_id)
+            if room is not None:
+                score = compatibility(preference, room, True)
+                if score is not None:
+                    scores[room_id] = score
+        if preference is None:
+            return scores
+
+        city, max_rent, min_beds, max_beds = preference
+        group = self.by_city.get(city or None, [])
+        end = bisect.bisect_right(self.rents.get(city or None, []), max_rent) if max_rent else len(group)
+        step = max(1, end // MAX_CANDIDATE_ROOMS)
+        picked = 0
+        # A second, offset pass fills the list when bed-count filters skip rooms
+        for start in (0, step // 2):
+            for i in range(start, end, step):
+                room = group[i]
+                if room["room_id"] in scores:
+                    continue
+                score = compatibility(preference, room, False)
+                if score is not None:
+                    scores[room["room_id"]] = score
+                    picked += 1
+                    if picked >= MAX_CANDIDATE_ROOMS:
+                        return scores
+            if step == 1:
+                break
+        return scores
+
+def auction_assign(candidates, capacity, epsilon=AUCTION_EPSILON):
+    """
+    Assign bidders to capacitated objects maximising the total score
+    (auction algorithm for the assignment problem with similar objects).
+
+    `candidates` maps bidder -> {object: score}, `capacity` maps object ->
+    number of slots. Staying unassigned is worth 0, so a bidder drops out
+    once every candidate costs more than it is worth. Returns {bidder: object}.
+    """
+    price = dict.fromkeys(capacity, 0.0)
+    holders = {obj: [] for obj in capacity}  # min-heap of (bid, seq, bidder) per object
+    assigned = {}
+    queue = deque(bidder for bidder, options in candidates.items() if options)
+    seq = 0
+    while queue:
+        bidder = queue.popleft()
+        best = second = None
+        best_value = second_value = 0.0
+        for obj, score in candidates[bidder].items():
+            value = score - price[obj]
+            if best is None or value > best_value:
+                second, second_value = best, best_value
+                best, best_value = obj, value
+            elif second is None or value > second_value:
+                second, second_value = obj, value
+        if best is None or best_value <= 0:
+            continue
+        # Bid up to the point where the runner-up (or staying out) becomes as good
+        runner_up = max(second_value, 0.0) if second is not None else 0.0
+        bid = price[best] + best_value - runner_up + epsilon
+        seq += 1
+        heap = holders[best]
+        heapq.heappush(heap, (bid, seq, bidder))
+        assigned[bidder] = best
+        if len(heap) > capacity[best]:
+            _, _, evicted = heapq.heappop(heap)
+            del assigned[evicted]
+            queue.append(evicted)
+        if len(heap) >= capacity[best]:
+            price[best] = heap[0][0]
+    return assigned
+
+def load_match_problem(conn):
+    """Waiting customers (with preferences and shortlists) and rooms with free beds."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT q.customer_id, rp.customer_id IS NOT NULL, LOWER(TRIM(rp.city)), rp.max_rent, rp.min_beds, rp.max_beds
+        FROM RoommateMatchQueue q
+        JOIN Customer c ON c.customer_id = q.customer_id
+        LEFT JOIN RoommatePreference rp ON rp.customer_id = q.customer_id
+        WHERE NOT EXISTS (SELECT 1 FROM Participates pa WHERE pa.customer_id = q.customer_id)
+    """)
+    preferences = {
+        customer_id: ((city or None, max_rent, min_beds, max_beds) if has_preference else None)
+        for customer_id, has_preference, city, max_rent, min_beds, max_beds in cur.fetchall()
+    }
+    cur.execute("""
+        SELECT i.customer_id, i.room_id
+        FROM Interested_In_Sharing i
+        JOIN RoommateMatchQueue q ON q.customer_id = i.customer_id
+    """)
+    shortlists = {}
+    for customer_id, room_id in cur.fetchall():
+        shortlists.setdefault(customer_id, []).append(room_id)
+    cur.execute("""
+        SELECT sr.room_id, sr.monthly_rent, sr.total_beds, sr.available_beds, LOWER(TRIM(p.city))
+        FROM SharedRoom sr
+        JOIN Property p ON sr.property_id = p.property_id
+        WHERE sr.available_beds > 0
+    """)
+    rooms = [
+        {"room_id": room_id, "monthly_rent": float(rent), "total_beds": total, "available_beds": free, "city": city}
+        for room_id, rent, total, free, city in cur.fetchall()
+    ]
+    return preferences, shortlists, rooms
+
+def solve_match_problem(preferences, shortlists, rooms):
+    """Return {customer_id: room_id} for the waiting customers."""
+    catalog = RoomCatalog(rooms)
+    candidates = {
+        customer_id: catalog.candidates(preference, shortlists.get(customer_id, ()))
+        for customer_id, preference in preferences.items()
+    }
+    capacity = {room["room_id"]: room["available_beds"] for room in rooms}
+    return auction_assign(candidates, capacity)
+
+def match_input_versions(conn):
+    """TableVersion of each MATCH_INPUT_TABLES table; commits to anything else leave it alone."""
+    return tuple(changes.table_version(conn, table) for table in MATCH_INPUT_TABLES)
+
+def match_pending(conn):
+    """
+    Place waiting customers in shared rooms. Each placement goes through
+    take_bed(), exactly like a direct application. Customers who cannot be
+    placed stay queued. Returns run statistics.
+
+    The problem is loaded from one read snapshot and solved with no lock
+    held; only the placements run in a (short) write transaction. take_bed()
+    rechecks every bed, and customers who left the queue meanwhile (placed
+    by a direct application, or deleted) are skipped, so a stale placement
+    is dropped rather than applied.
+    """
+    started = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        preferences, shortlists, rooms = load_match_problem(conn)
+        snapshot = match_input_versions(conn)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    assignment = solve_match_problem(preferences, shortlists, rooms)
+
+    placed = 0
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        unchanged = match_input_versions(conn) == snapshot
+        # Customers who were placed (or deleted) since they were queued
+        cur.execute("""
+            DELETE FROM RoommateMatchQueue
+            WHERE customer_id IN (SELECT customer_id FROM Participates)
+               OR customer_id NOT IN (SELECT customer_id FROM Customer)
+        """)
+        for customer_id, room_id in assignment.items():
+            cur.execute("SELECT 1 FROM RoommateMatchQueue WHERE customer_id = ?", (customer_id,))
+            # Guarded in case the customer or the bed went in the meantime
+            if cur.fetchone() is None or not take_bed(cur, customer_id, room_id):
+                continue
+            cur.execute("DELETE FROM RoommateMatchQueue WHERE customer_id = ?", (customer_id,))
+            placed += 1
+        # New interest or freed beds committed since the snapshot reset attempted;
+        # keeping those resets means the next pass looks at them again
+        if unchanged:
+            cur.execute("UPDATE RoommateMatchQueue SET attempted = 1 WHERE attempted = 0")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return {
+        "waiting": len(preferences),
+        "rooms": len(rooms),
+        "free_beds": sum(room["available_beds"] for room in rooms),
+        "placed": placed,
+        "still_waiting": len(preferences) - placed,
+        "seconds": time.perf_counter() - started,
+    }
+
+def has_pending_matches(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT EXISTS (SELECT 1 FROM RoommateMatchQueue WHERE attempted = 0)")
+    return bool(cur.fetchone()[0])
+
+class RoommateMatcher:
+    """Background job that runs match_pending() whenever new work is queued."""
+
+    def __init__(self, db_file=DB_FILE, interval=MATCH_INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_run_at = None
+        self.last_result = None
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="roommate-matcher", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.interval)
+
+    def run_once(self, force=False):
+        """Run a matching pass if anything changed since the last one (or if forced)."""
+        with self.lock:
+            conn = sqlite3.connect(self.db_file)
+            try:
+                if force or has_pending_matches(conn):
+                    self.last_result = match_pending(conn)
+                    self.last_run_at = time.time()
+                self.last_error = None
+            except sqlite3.Error as e:
+                self.last_error = str(e)
+            finally:
+                conn.close()
+            return self.last_result
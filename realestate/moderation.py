@@ -0,0 +1,80 @@
+"""
+Homeowner verification queue for admins.
+
+moderation_page() lists owners with a given verification status a page at
+a time, with keyset pagination on (verification_status, owner_id): each
+page continues after the last owner_id of the previous one, so it is an
+index range read however deep the admin pages. set_verification_statuses()
+approves or rejects a whole selection in one transaction, with one
+executemany for the updates and one for the owners' notifications.
+"""
+import json
+
+from .db import query_all
+from .outbox import record_events
+from .repository.users import VERIFICATION_STATUSES
+
+MODERATION_PAGE_SIZE = 100
+
+def ensure_moderation_schema(conn):
+    cur = conn.cursor()
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_homeowner_verification ON HomeOwner (verification_status, owner_id)")
+    conn.commit()
+
+def status_counts(conn):
+    """{status: number of owners}, every status included."""
+    counts = dict.fromkeys(VERIFICATION_STATUSES, 0)
+    for row in query_all(conn, "SELECT verification_status, COUNT(*) AS count FROM HomeOwner GROUP BY verification_status"):
+        counts[row["verification_status"]] = row["count"]
+    return counts
+
+def moderation_page(conn, status="pending", search=None, after=None, limit=MODERATION_PAGE_SIZE):
+    """
+    One page of owners with `status` (None for all), ordered by owner_id.
+    `search` matches name, username or email; `after` is the cursor returned
+    with the previous page. Returns (rows, cursor for the next page or None).
+    """
+    where, params = [], []
+    if status is not None:
+        where.append("verification_status = ?")
+        params.append(status)
+    if search:
+        where.append("(first_name || ' ' || last_name LIKE ? OR username LIKE ? OR email LIKE ?)")
+        params.extend([f"%{search}%"] * 3)
+    if after is not None:
+        where.append("owner_id > ?")
+        params.append(after)
+    rows = query_all(conn, f"""
+        SELECT owner_id, username, first_name, last_name, email, phone_number, verification_status
+        FROM HomeOwner
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY owner_id
+        LIMIT ?
+    """, (*params, limit + 1))
+    next_cursor = rows[limit - 1]["owner_id"] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def set_verification_statuses(conn, owner_ids, status):
+    """
+    Set `status` on every owner in `owner_ids` and notify them, in one
+    transaction. Owners that already have it are left alone. Returns the ids
+    that changed.
+    """
+    if status not in VERIFICATION_STATUSES:
+        raise ValueError(f"Unknown verification status: {status}")
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT owner_id FROM HomeOwner
+            WHERE owner_id IN (SELECT value FROM json_each(?)) AND verification_status != ?
+            ORDER BY owner_id
+        """, (json.dumps([int(owner_id) for owner_id in owner_ids]), status))
+        changed = [row[0] for row in cur.fetchall()]
+        cur.executemany("UPDATE HomeOwner SET verification_status = ? WHERE owner_id = ?",
+                        [(status, owner_id) for owner_id in changed])
+        record_events(cur, "owner.verification", "owner", changed, status=status)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return changed
@@ -0,0 +1,252 @@
+"""
+Transactional outbox for notifications.
+
+Writes that other people should hear about (bookings, sharing applications,
+owner verification changes) call record_event() on the cursor of their own
+transaction, so an event exists exactly when the write it describes was
+committed. NotificationDispatcher drains the Outbox table on an asyncio
+loop in a background thread and hands batches to a pluggable sink, which
+keeps delivery (and its failures) off the user-facing request path.
+"""
+import asyncio
+import json
+import smtplib
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+from .db import DB_FILE
+
+NOTIFICATION_LOG = "notifications.log"
+DISPATCH_INTERVAL = 2.0     # seconds to wait when the outbox is empty
+DISPATCH_BATCH = 100        # events handed to the sink at once
+MAX_ATTEMPTS = 5            # failed deliveries before an event is left for inspection
+
+# Who receives an event, resolved inside the writing transaction by id
+RECIPIENTS = {
+    "owner": "SELECT email FROM HomeOwner WHERE owner_id = ?",
+    "customer": "SELECT email FROM Customer WHERE customer_id = ?",
+    "property_owner": """
+        SELECT ho.email FROM Property p JOIN HomeOwner ho ON p.owner_id = ho.owner_id
+        WHERE p.property_id = ?
+    """,
+    "room_owner": """
+        SELECT ho.email FROM SharedRoom sr
+        JOIN Property p ON sr.property_id = p.property_id
+        JOIN HomeOwner ho ON p.owner_id = ho.owner_id
+        WHERE sr.room_id = ?
+    """,
+}
+
+SUBJECTS = {
+    "booking.completed": "Your property has been booked",
+    "sharing.applied": "A customer took a bed in your shared room",
+    "sharing.interest": "A customer is interested in your shared room",
+    "sharing.waitlisted": "A customer joined the waitlist for your shared room",
+    "sharing.promoted": "A bed is yours: you moved up from the waitlist",
+    "owner.verification": "Your verification status changed",
+}
+
+def ensure_outbox_schema(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS Outbox (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type VARCHAR(50) NOT NULL,
+            recipient VARCHAR(100),
+            payload TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            dispatched_at TIMESTAMP,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    """)
+    # Only undelivered events are indexed, so the dispatcher's scan stays
+    # proportional to the backlog rather than to the table's history
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_pending
+        ON Outbox (event_id) WHERE dispatched_at IS NULL
+    """)
+    conn.commit()
+
+def record_event(cur, event_type, recipient, recipient_id, **payload):
+    """
+    Queue a notification on an open cursor (no commit). `recipient` is a
+    key of RECIPIENTS; its email is looked up by `recipient_id` in the same
+    statement.
+    """
+    cur.execute(f"""
+        INSERT INTO Outbox (event_type, recipient, payload)
+        VALUES (?, ({RECIPIENTS[recipient]}), ?)
+    """, (event_type, recipient_id, json.dumps(payload, default=str)))
+
+def record_events(cur, event_type, recipient, recipient_ids, **payload):
+    """record_event() for many recipients with the same payload, in one executemany."""
+    payload = json.dumps(payload, default=str)
+    cur.executemany(f"""
+        INSERT INTO Outbox (event_type, recipient, payload)
+        VALUES (?, ({RECIPIENTS[recipient]}), ?)
+    """, [(event_type, recipient_id, payload) for recipient_id in recipient_ids])
+
+def format_notification(event):
+    """Turn an Outbox row into (recipient, subject, body)."""
+    payload = json.loads(event["payload"])
+    details = "\n".join(f"{key.replace('_', ' ')}: {value}" for key, value in payload.items())
+    return event["recipient"], SUBJECTS.get(event["event_type"], event["event_type"]), details
+
+class FileSink:
+    """Appends notifications as JSON lines to a local file (the default stand-in for email)."""
+
+    def __init__(self, path=NOTIFICATION_LOG):
+        self.path = path
+
+    def _write(self, events):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for event in events:
+                recipient, subject, body = format_notification(event)
+                f.write(json.dumps({"event_id": event["event_id"], "type": event["event_type"], "to": recipient,
+                                    "subject": subject, "body": body, "created_at": event["created_at"]}) + "\n")
+
+    async def send(self, events):
+        await asyncio.to_thread(self._write, events)
+
+class SmtpSink:
+    """Sends each notification as an email over one SMTP session per batch."""
+
+    def __init__(self, host="localhost", port=25, sender="noreply@localhost"):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def _send(self, events):
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            for event in events:
+                recipient, subject, body = format_notification(event)
+                if not recipient:
+                    continue
+                message = EmailMessage()
+                message["From"] = self.sender
+                message["To"] = recipient
+                message["Subject"] = subject
+                message.set_content(body)
+                smtp.send_message(message)
+
+    async def send(self, events):
+        await asyncio.to_thread(self._send, events)
+
+class NotificationDispatcher:
+    """
+    Drains the outbox on its own asyncio loop. Database work runs on a
+    single worker thread; a failed batch is retried with backoff and
+    events that keep failing stop being picked up after MAX_ATTEMPTS.
+    """
+
+    def __init__(self, db_file=DB_FILE, sink=None, interval=DISPATCH_INTERVAL, batch_size=DISPATCH_BATCH):
+        self.db_file = db_file
+        self.sink = sink or FileSink()
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.conn = None
+        self.executor = None
+        self.dispatched = 0
+        self.last_run_at = None
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        asyncio.run(self.run())
+
+    async def run(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox-db")
+        loop = asyncio.get_running_loop()
+        backoff = self.interval
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    sent = await self.dispatch_once()
+                except sqlite3.Error as e:
+                    self.last_error, sent = str(e), 0
+                if sent:
+                    backoff = self.interval
+                    continue  # more may be waiting
+                backoff = min(backoff * 2, 60.0) if self.last_error else self.interval
+                await loop.run_in_executor(self.executor, self.stop_event.wait, backoff)
+        except RuntimeError:
+            pass  # executors refuse new work once the interpreter is shutting down
+        finally:
+            self.executor.shutdown()
+            self._close()
+
+    async def dispatch_once(self):
+        """Deliver one batch; returns the number of events delivered."""
+        loop = asyncio.get_running_loop()
+        events = await loop.run_in_executor(self.executor, self._fetch)
+        self.last_run_at = time.time()
+        if not events:
+            self.last_error = None
+            return 0
+        ids = [event["event_id"] for event in events]
+        try:
+            await self.sink.send(events)
+        except Exception as e:
+            self.last_error = str(e)
+            await loop.run_in_executor(self.executor, self._mark_failed, ids, str(e))
+            return 0
+        await loop.run_in_executor(self.executor, self._mark_dispatched, ids)
+        self.dispatched += len(ids)
+        self.last_error = None
+        return len(ids)
+
+    # ---- database access (runs on the executor thread) ----
+
+    def _connection(self):
+        if self.conn is None:
+            # Used only from the executor's single worker, then closed by the loop thread after shutdown
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+        return self.conn
+
+    def _close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _fetch(self):
+        cur = self._connection().cursor()
+        cur.execute("""
+            SELECT event_id, event_type, recipient, payload, created_at
+            FROM Outbox
+            WHERE dispatched_at IS NULL AND attempts < ?
+            ORDER BY event_id
+            LIMIT ?
+        """, (MAX_ATTEMPTS, self.batch_size))
+        return [dict(row) for row in cur.fetchall()]
+
+    def _mark_dispatched(self, ids):
+        conn = self._connection()
+        conn.executemany("UPDATE Outbox SET dispatched_at = CURRENT_TIMESTAMP WHERE event_id = ?",
+                         [(event_id,) for event_id in ids])
+        conn.commit()
+
+    def _mark_failed(self, ids, error):
+        conn = self._connection()
+        conn.executemany("UPDATE Outbox SET attempts = attempts + 1, last_error = ? WHERE event_id = ?",
+                         [(error, event_id) for event_id in ids])
+        conn.commit()
+
+def pending_count(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM Outbox WHERE dispatched_at IS NULL AND attempts < ?", (MAX_ATTEMPTS,))
+    return cur.fetchone()[0]
@@ -0,0 +1,317 @@
+"""
+City and street autocomplete.
+
+PlaceTrie is an in-memory prefix trie over normalized place names (lower
+case, punctuation and repeated spaces dropped), counting how many
+properties use each name and which spelling they use most. complete()
+returns the most common names under a prefix; when no name starts with
+what was typed, a Levenshtein walk over the trie finds names whose prefix
+is within a small edit distance, so "Seatle" still finds "Seattle".
+resolve() maps free text to the spelling already in use, or to near misses
+the caller can offer instead.
+
+PlaceIndex keeps a city trie and a street trie in step with Property
+through the change log, the way the listing cache does: when the Property
+version moved it re-reads just the changed properties and moves their
+counts; a gap in the log rebuilds from scratch.
+"""
+import re
+import threading
+
+from . import changes
+from .db import query_all
+
+PLACE_FIELDS = ("city", "street")
+SUGGESTION_LIMIT = 8
+CACHED_COMPLETIONS = 20    # most common names remembered per looked-up prefix
+
+_SEPARATORS = re.compile(r"[^\w]+")
+
+def place_key(text):
+    """Normalized form of a place name; spellings with the same key are the same place."""
+    return " ".join(_SEPARATORS.sub(" ", text or "").lower().split())
+
+def max_distance(key):
+    """Edit distance tolerated for a query this long (none for very short ones)."""
+    return 0 if len(key) < 4 else 1 if len(key) < 8 else 2
+
+class _Node:
+    __slots__ = ("label", "children", "key", "best")
+
+    def __init__(self, label, children=None, key=None):
+        self.label = label          # the characters on the edge into this node
+        self.children = children    # first character of a child's label -> child, or None
+        self.key = key              # the full key when a name ends here
+        self.best = None            # cached most common keys in this subtree, cleared on writes below
+
+def _common_length(a, b):
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+class PlaceTrie:
+    """
+    Radix trie (chains of single-child nodes merged into one edge), which
+    keeps 100k street names to about a fifth of the nodes of a
+    character-per-node trie.
+    """
+
+    def __init__(self):
+        self.root = _Node("")
+        self.counts = {}       # key -> number of properties using it
+        self.spellings = {}    # key -> {spelling: number of properties using it}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def spelling(self, key):
+        """The spelling most properties use for `key`."""
+        spellings = self.spellings[key]
+        return max(spellings, key=spellings.get)
+
+    def add(self, name, n=1):
+        key = place_key(name)
+        if not key:
+            return
+        node, rest = self.root, key
+        node.best = None
+        while rest:
+            if node.children is None:
+                node.children = {}
+            child = node.children.get(rest[0])
+            if child is None:
+                child = node.children[rest[0]] = _Node(rest)
+                node = child
+                break
+            common = _common_length(child.label, rest)
+            if common < len(child.label):
+                middle = _Node(child.label[:common], {child.label[common]: child})
+                child.label = child.label[common:]
+                child = node.children[rest[0]] = middle
+            child.best = None
+            node, rest = child, rest[common:]
+        node.key = key
+        self.counts[key] = self.counts.get(key, 0) + n
+        spellings = self.spellings.setdefault(key, {})
+        spelling = " ".join(name.split())
+        spellings[spelling] = spellings.get(spelling, 0) + n
+
+    def remove(self, name, n=1):
+        key = place_key(name)
+        spellings = self.spellings.get(key)
+        if not spellings:
+            return
+        spelling = " ".join(name.split())
+        if spelling in spellings:
+            spellings[spelling] -= n
+            if spellings[spelling] <= 0:
+                del spellings[spelling]
+            self.counts[key] -= n
+        path, rest = [self.root], key
+        while rest:
+            child = path[-1].children[rest[0]]
+            path.append(child)
+            rest = rest[len(child.label):]
+        for node in path:
+            node.best = None
+        if spellings:
+            return
+        del self.spellings[key]
+        del self.counts[key]
+        node = path[-1]
+        node.key = None
+        if not node.children:
+            parent = path[-2]
+            del parent.children[node.label[0]]
+            node = parent
+        # Merge a node left with a single child and no name of its own into that child
+        if node is not self.root and node.key is None and node.children and len(node.children) == 1:
+            (child,) = node.children.values()
+            node.label += child.label
+            node.children, node.key, node.best = child.children, child.key, child.best
+
+    def _node(self, prefix):
+        """The node whose subtree holds exactly the keys starting with `prefix`."""
+        node, rest = self.root, prefix
+        while rest:
+            child = node.children.get(rest[0]) if node.children else None
+            if child is None:
+                return None
+            if len(rest) <= len(child.label):
+                return child if child.label.startswith(rest) else None
+            if not rest.startswith(child.label):
+                return None
+            node, rest = child, rest[len(child.label):]
+        return node
+
+    def _best(self, node):
+        if node.best is None:
+            keys, stack = [], [node]
+            while stack:
+                current = stack.pop()
+                if current.key is not None:
+                    keys.append(current.key)
+                if current.children:
+                    stack.extend(current.children.values())
+            keys.sort(key=lambda key: (-self.counts[key], key))
+            node.best = keys[:CACHED_COMPLETIONS]
+        return node.best
+
+    def fuzzy(self, query, distance, whole=False):
+        """
+        (edit distance, node) for the nodes within `distance` edits of
+        `query`: names that start with something that close, or with
+        `whole` only names that are that close. Walks the trie with one
+        edit-distance row per character (Levenshtein, plus swapped adjacent
+        letters as one edit), computing just the cells within
+        `distance` of the diagonal, and abandons a branch once every cell
+        is over the limit.
+        """
+        n, over = len(query), distance + 1
+        found = []
+        first = [min(i, over) for i in range(n + 1)]
+        stack = [(child, 0, first, None, None) for child in (self.root.children or {}).values()]
+        while stack:
+            node, depth, row, previous, last = stack.pop()
+            closest = over
+            for char in node.label:
+                depth += 1
+                before, previous, row = previous, row, [over] * (n + 1)
+                lowest = row[0] = depth if depth < over else over
+                for i in range(max(1, depth - distance), min(n, depth + distance) + 1):
+                    cost = previous[i - 1] if query[i - 1] == char else previous[i - 1] + 1
+                    if previous[i] + 1 < cost:
+                        cost = previous[i] + 1
+                    if row[i - 1] + 1 < cost:
+                        cost = row[i - 1] + 1
+                    # Two swapped letters count as one edit
+                    if i > 1 and before is not None and query[i - 1] == last and query[i - 2] == char \
+                            and before[i - 2] + 1 < cost:
+                        cost = before[i - 2] + 1
+                    if cost < over:
+                        row[i] = cost
+                        if cost < lowest:
+                            lowest = cost
+                if row[n] < closest:
+                    closest = row[n]
+                last = char
+                if lowest > distance:
+                    break
+            else:
+                if whole:
+                    if node.key is not None and row[n] <= distance:
+                        found.append((row[n], node))
+                elif closest <= distance:
+                    found.append((closest, node))
+                if node.children:
+                    stack.extend((child, depth, row, previous, last) for child in node.children.values())
+                continue
+            if not whole and closest <= distance:
+                found.append((closest, node))
+        return found
+
+    def nearest(self, key, whole=False):
+        """fuzzy() at the smallest distance (up to max_distance) that finds anything."""
+        for distance in range(1, max_distance(key) + 1):
+            found = self.fuzzy(key, distance, whole)
+            if found:
+                return found
+        return []
+
+    def complete(self, text, limit=SUGGESTION_LIMIT):
+        """Most common names starting with `text`; near misses of it when none do."""
+        key = place_key(text)
+        if not key:
+            return []
+        node = self._node(key)
+        if node is not None:
+            keys = self._best(node)[:limit]
+        else:
+            keys, seen = [], set()
+            for _, match in sorted(self.nearest(key),
+                                   key=lambda found: (found[0], -self.counts[self._best(found[1])[0]])):
+                for other in self._best(match):
+                    if other not in seen:
+                        seen.add(other)
+                        keys.append(other)
+                if len(keys) >= limit:
+                    break
+        return [self.spelling(key) for key in keys[:limit]]
+
+    def resolve(self, text, limit=SUGGESTION_LIMIT):
+        """
+        (spelling in use, None) when `text` names a known place, otherwise
+        (None, the closest known names, most common first).
+        """
+        key = place_key(text)
+        if key in self.counts:
+            return self.spelling(key), None
+        matches = sorted((distance, -self.counts[node.key], node.key)
+                         for distance, node in self.nearest(key, whole=True))
+        return None, [self.spelling(match) for _, _, match in matches[:limit]]
+
+class PlaceIndex:
+    """City and street tries over Property, refreshed from the change log."""
+
+    def __init__(self):
+        self.tries = {field: PlaceTrie() for field in PLACE_FIELDS}
+        self.places = {}       # property_id -> (city, street) counted in the tries
+        self.version = None
+        self.lock = threading.Lock()
+
+    def refresh(self, conn):
+        """Apply Property changes since the last refresh; returns the number of properties re-read."""
+        version = changes.table_version(conn, "Property")
+        with self.lock:
+            previous = self.version
+        if version == previous:
+            return 0
+        changed = None if previous is None else changes.changed_row_ids(conn, "Property", previous, version)
+        if changed is None:
+            rows = query_all(conn, "SELECT property_id, city, street FROM Property")
+        elif changed:
+            rows = query_all(conn, f"""
+                SELECT property_id, city, street FROM Property
+                WHERE property_id IN ({', '.join('?' * len(changed))})
+            """, changed)
+        else:
+            rows = []
+        with self.lock:
+            if self.version != previous:
+                return 0  # another session already applied these changes
+            if changed is None:
+                self.tries = {field: PlaceTrie() for field in PLACE_FIELDS}
+                self.places = {}
+                changed = []
+            for property_id in changed:
+                self._move(property_id, None)
+            for row in rows:
+                self._move(row["property_id"], (row["city"], row["street"]))
+            self.version = version
+        return len(rows)
+
+    def _move(self, property_id, place):
+        old = self.places.pop(property_id, None)
+        for i, field in enumerate(PLACE_FIELDS):
+            if old is not None and old[i]:
+                self.tries[field].remove(old[i])
+            if place is not None and place[i]:
+                self.tries[field].add(place[i])
+        if place is not None:
+            self.places[property_id] = place
+
+    def complete(self, conn, field, text, limit=SUGGESTION_LIMIT):
+        self.refresh(conn)
+        with self.lock:
+            return self.tries[field].complete(text, limit)
+
+    def resolve(self, conn, field, text, limit=SUGGESTION_LIMIT):
+        self.refresh(conn)
+        with self.lock:
+            return self.tries[field].resolve(text, limit)
+
+    def stats(self):
+        with self.lock:
+            return {field: len(trie) for field, trie in self.tries.items()}
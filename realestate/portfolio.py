@@ -0,0 +1,135 @@
+"""
+Per-owner portfolio summary for the homeowner dashboard.
+
+OwnerPortfolio holds one row per (owner, property type) with the owner's
+property counts, value, monthly rental income, shared-room beds and
+completed revenue. Triggers on Property, SharedRoom and Receipt apply each
+write as a delta (subtract the old row's contribution, add the new one),
+so the dashboard reads a handful of rows by primary key instead of
+aggregating the owner's properties on every rerun.
+
+Like the revenue rollup, revenue is history: it stays with the owner and
+type the property had when the payment completed, and archiving receipts
+does not subtract it.
+"""
+from .db import query_all
+
+COUNTERS = ["properties", "available", "for_rent", "total_value", "monthly_income",
+            "total_beds", "available_beds", "revenue", "completed_receipts"]
+
+PORTFOLIO_UPSERT = """
+    INSERT INTO OwnerPortfolio (owner_id, property_type, {columns})
+    SELECT {owner}, {property_type}, {values}
+    {source}
+    ON CONFLICT(owner_id, property_type) DO UPDATE SET {updates};
+"""
+
+def portfolio_delta_sql(owner, property_type, deltas, source="WHERE 1"):
+    """Upsert adding `deltas` ({counter: expression}) to the row for (owner, property_type)."""
+    return PORTFOLIO_UPSERT.format(
+        columns=", ".join(deltas), owner=owner, property_type=property_type,
+        values=", ".join(deltas.values()), source=source,
+        updates=", ".join(f"{column} = {column} + excluded.{column}" for column in deltas))
+
+def property_delta_sql(row, sign):
+    """Add (sign "+") or remove (sign "-") a Property row's contribution, beds of its rooms included."""
+    beds = "(SELECT COALESCE(SUM({}), 0) FROM SharedRoom WHERE property_id = " + row + ".property_id)"
+    return portfolio_delta_sql(f"{row}.owner_id", f"{row}.property_type", {
+        "properties": f"{sign}1",
+        "available": f"{sign}({row}.is_available = 1)",
+        "for_rent": f"{sign}({row}.sale_renting = 'rent')",
+        "total_value": f"{sign}COALESCE({row}.cost, 0)",
+        "monthly_income": f"{sign}(CASE WHEN {row}.sale_renting = 'rent' AND {row}.is_available = 1 "
+                          f"THEN COALESCE({row}.rent, 0) ELSE 0 END)",
+        "total_beds": sign + beds.format("total_beds"),
+        "available_beds": sign + beds.format("available_beds"),
+    })
+
+def room_delta_sql(row, sign):
+    """Add or remove a SharedRoom row's beds; a no-op once its property is gone."""
+    return portfolio_delta_sql("p.owner_id", "p.property_type", {
+        "total_beds": f"{sign}{row}.total_beds",
+        "available_beds": f"{sign}{row}.available_beds",
+    }, source=f"FROM Property p WHERE p.property_id = {row}.property_id")
+
+REVENUE_DELTA = portfolio_delta_sql("p.owner_id", "p.property_type", {
+    "revenue": "NEW.amount",
+    "completed_receipts": "1",
+}, source="FROM Property p WHERE p.property_id = NEW.property_id")
+
+def ensure_portfolio_schema(conn):
+    cur = conn.cursor()
+    counters = ",\n".join(f"            {column} {'REAL' if column in ('total_value', 'monthly_income', 'revenue') else 'INTEGER'}"
+                          f" NOT NULL DEFAULT 0" for column in COUNTERS)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS OwnerPortfolio (
+            owner_id INTEGER NOT NULL,
+            property_type VARCHAR(20) NOT NULL,
+{counters},
+            PRIMARY KEY (owner_id, property_type)
+        )
+    """)
+    triggers = {
+        "trg_portfolio_property_insert": ("AFTER INSERT ON Property", property_delta_sql("NEW", "+")),
+        "trg_portfolio_property_update": (
+            "AFTER UPDATE OF owner_id, property_type, is_available, sale_renting, cost, rent ON Property",
+            property_delta_sql("OLD", "-") + property_delta_sql("NEW", "+")),
+        "trg_portfolio_property_delete": ("AFTER DELETE ON Property", property_delta_sql("OLD", "-")),
+        "trg_portfolio_room_insert": ("AFTER INSERT ON SharedRoom", room_delta_sql("NEW", "+")),
+        "trg_portfolio_room_update": (
+            "AFTER UPDATE OF property_id, total_beds, available_beds ON SharedRoom",
+            room_delta_sql("OLD", "-") + room_delta_sql("NEW", "+")),
+        "trg_portfolio_room_delete": ("AFTER DELETE ON SharedRoom", room_delta_sql("OLD", "-")),
+        "trg_portfolio_receipt_insert": (
+            "AFTER INSERT ON Receipt WHEN NEW.payment_status = 'completed'", REVENUE_DELTA),
+        "trg_portfolio_receipt_complete": (
+            "AFTER UPDATE OF payment_status ON Receipt "
+            "WHEN NEW.payment_status = 'completed' AND OLD.payment_status != 'completed'", REVENUE_DELTA),
+    }
+    for name, (event, body) in triggers.items():
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    cur.execute("SELECT 1 FROM OwnerPortfolio LIMIT 1")
+    if cur.fetchone() is None:
+        rebuild_portfolios(cur)
+    conn.commit()
+
+def rebuild_portfolios(cur):
+    """Recompute every portfolio row from scratch on an open cursor (no commit)."""
+    cur.execute("DELETE FROM OwnerPortfolio")
+    cur.execute("""
+        INSERT INTO OwnerPortfolio (owner_id, property_type, properties, available, for_rent,
+                                    total_value, monthly_income, total_beds, available_beds)
+        SELECT p.owner_id, p.property_type, COUNT(*), SUM(p.is_available = 1), SUM(p.sale_renting = 'rent'),
+            SUM(COALESCE(p.cost, 0)),
+            SUM(CASE WHEN p.sale_renting = 'rent' AND p.is_available = 1 THEN COALESCE(p.rent, 0) ELSE 0 END),
+            COALESCE(SUM(b.total_beds), 0), COALESCE(SUM(b.available_beds), 0)
+        FROM Property p
+        LEFT JOIN (
+            SELECT property_id, SUM(total_beds) AS total_beds, SUM(available_beds) AS available_beds
+            FROM SharedRoom GROUP BY property_id
+        ) b ON b.property_id = p.property_id
+        GROUP BY p.owner_id, p.property_type
+    """)
+    cur.execute("""
+        INSERT INTO OwnerPortfolio (owner_id, property_type, revenue, completed_receipts)
+        SELECT p.owner_id, p.property_type, SUM(r.amount), COUNT(*)
+        FROM Receipt_All r
+        JOIN Property p ON r.property_id = p.property_id
+        WHERE r.payment_status = 'completed'
+        GROUP BY p.owner_id, p.property_type
+        ON CONFLICT(owner_id, property_type) DO UPDATE SET
+            revenue = excluded.revenue, completed_receipts = excluded.completed_receipts
+    """)
+
+def get_portfolio(conn, owner_id):
+    """The owner's summary rows, one per property type (a primary-key range read)."""
+    return query_all(conn, f"""
+        SELECT property_type, {', '.join(COUNTERS)}
+        FROM OwnerPortfolio
+        WHERE owner_id = ?
+        ORDER BY property_type
+    """, (owner_id,))
+
+def portfolio_totals(rows):
+    """Sum the per-type rows into owner-wide totals."""
+    return {column: sum(row[column] for row in rows) for column in COUNTERS}
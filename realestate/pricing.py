@@ -0,0 +1,351 @@
+"""
+Rent and sale price estimation.
+
+A log-linear model, log(price) ~ 1 + log(area) + amenity count, is fitted by
+least squares separately for every (listing kind, city, property type)
+stratum. Coarser strata (city only, type only, everything) back up strata
+with too few listings. Fitting works from per-stratum sufficient statistics
+(X'X, X'y, y'y) kept in PriceModelStats, so a refit only rescans the strata
+whose listings changed; coefficients are cached in PriceModel and in memory,
+which makes an estimate a dictionary lookup and a dot product.
+"""
+import sqlite3
+import threading
+import time
+
+from .db import DB_FILE
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+
+ANY = "*"                    # wildcard city / property type of the fallback strata
+MIN_STRATUM_ROWS = 8         # fewer listings than this and the next coarser model is used
+RIDGE = 1e-3                 # keeps the normal equations solvable for degenerate strata
+PRICE_REFIT_INTERVAL = 3600  # seconds between incremental refits
+PRICE_RELOAD_INTERVAL = 30   # seconds between checks for models fitted by another process
+KINDS = ("rent", "sale")
+
+FEATURES = ("intercept", "log_area", "amenities")
+# Sufficient statistics columns: sums of x_i * x_j (upper triangle), x_i * y and y * y
+PAIRS = [(i, j) for i in range(len(FEATURES)) for j in range(i, len(FEATURES))]
+STAT_COLUMNS = ([f"xx_{i}{j}" for i, j in PAIRS] + [f"xy_{i}" for i in range(len(FEATURES))] + ["yy"])
+
+# Columns whose change can move a listing between strata or change its row
+PRICING_COLUMNS = ("city", "property_type", "sale_renting", "cost", "rent", "area", "amenities")
+
+def ensure_pricing_schema(conn):
+    cur = conn.cursor()
+    stat_defs = ",\n".join(f"            {col} REAL NOT NULL" for col in STAT_COLUMNS)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS PriceModelStats (
+            kind VARCHAR(10) NOT NULL,
+            city VARCHAR(50) NOT NULL,
+            property_type VARCHAR(50) NOT NULL,
+            n INTEGER NOT NULL,
+{stat_defs},
+            PRIMARY KEY (kind, city, property_type)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PriceModel (
+            kind VARCHAR(10) NOT NULL,
+            city VARCHAR(50) NOT NULL,
+            property_type VARCHAR(50) NOT NULL,
+            n INTEGER NOT NULL,
+            intercept REAL NOT NULL,
+            log_area REAL NOT NULL,
+            amenities REAL NOT NULL,
+            residual_std REAL NOT NULL,
+            fitted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (kind, city, property_type)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PriceModelDirty (
+            city VARCHAR(50) NOT NULL,
+            property_type VARCHAR(50) NOT NULL,
+            PRIMARY KEY (city, property_type)
+        )
+    """)
+    # Bumped by every fit, so processes holding models in memory can tell
+    # when another process has refitted them
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PriceModelGeneration (
+            generation_id INTEGER PRIMARY KEY CHECK (generation_id = 1),
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO PriceModelGeneration (generation_id) VALUES (1)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_property_city_type ON Property (LOWER(TRIM(city)), property_type)")
+    columns = ", ".join(PRICING_COLUMNS)
+    for name, event, refs in (
+        ("trg_pricing_property_insert", "AFTER INSERT ON Property", ["NEW"]),
+        ("trg_pricing_property_update", f"AFTER UPDATE OF {columns} ON Property", ["OLD", "NEW"]),
+        ("trg_pricing_property_delete", "AFTER DELETE ON Property", ["OLD"]),
+    ):
+        body = "".join(f"""
+                INSERT OR IGNORE INTO PriceModelDirty (city, property_type)
+                VALUES (LOWER(TRIM({ref}.city)), {ref}.property_type);""" for ref in refs)
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    conn.commit()
+
+def amenity_count(amenities):
+    return sum(1 for token in (amenities or "").split(",") if token.strip())
+
+def design_matrix(area, amenities):
+    """Feature matrix for arrays of areas and amenity counts."""
+    area = np.asarray(area, dtype=np.float64)
+    return np.column_stack([np.ones_like(area), np.log(area), np.asarray(amenities, dtype=np.float64)])
+
+def grouped_stats(groups, X, y):
+    """
+    Sufficient statistics per group. `groups` holds an integer group index
+    per row; returns (counts, stats) with one row of STAT_COLUMNS per group.
+    """
+    size = int(groups.max()) + 1 if len(groups) else 0
+    counts = np.bincount(groups, minlength=size)
+    stats = np.empty((size, len(STAT_COLUMNS)))
+    col = 0
+    for i, j in PAIRS:
+        stats[:, col] = np.bincount(groups, weights=X[:, i] * X[:, j], minlength=size)
+        col += 1
+    for i in range(X.shape[1]):
+        stats[:, col] = np.bincount(groups, weights=X[:, i] * y, minlength=size)
+        col += 1
+    stats[:, col] = np.bincount(groups, weights=y * y, minlength=size)
+    return counts, stats
+
+def solve_models(counts, stats):
+    """
+    Least-squares coefficients and residual standard deviation for every
+    row of sufficient statistics, solved as one batch of normal equations.
+    """
+    p = len(FEATURES)
+    xtx = np.empty((len(stats), p, p))
+    for col, (i, j) in enumerate(PAIRS):
+        xtx[:, i, j] = xtx[:, j, i] = stats[:, col]
+    xty = stats[:, len(PAIRS):len(PAIRS) + p]
+    yty = stats[:, -1]
+    ridge = RIDGE * np.eye(p)
+    ridge[0, 0] = 0.0  # the intercept is not shrunk
+    beta = np.linalg.solve(xtx + ridge, xty[:, :, None])[:, :, 0]
+    # Residual sum of squares from the statistics: y'y - 2 b'X'y + b'X'X b
+    sse = yty - 2 * np.einsum("gi,gi->g", beta, xty) + np.einsum("gi,gij,gj->g", beta, xtx, beta)
+    dof = np.maximum(counts - p, 1)
+    return beta, np.sqrt(np.maximum(sse, 0.0) / dof)
+
+def load_listing_arrays(conn, strata=None):
+    """
+    (kind, city, property_type) keys, design matrix and log prices of the
+    listings with a usable price and area, optionally limited to a list of
+    (city, property_type) strata.
+    """
+    where = ""
+    params = ()
+    if strata:
+        where = "AND (" + " OR ".join(["(LOWER(TRIM(city)) = ? AND property_type = ?)"] * len(strata)) + ")"
+        params = tuple(value for stratum in strata for value in stratum)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT sale_renting, LOWER(TRIM(city)), property_type,
+               CASE WHEN sale_renting = 'rent' THEN rent ELSE cost END, area, amenities
+        FROM Property
+        WHERE area > 0 AND (CASE WHEN sale_renting = 'rent' THEN rent ELSE cost END) > 0 {where}
+    """, params)
+    rows = cur.fetchall()
+    keys = [(kind, city, property_type) for kind, city, property_type, _, _, _ in rows]
+    X = design_matrix([row[4] for row in rows], [amenity_count(row[5]) for row in rows])
+    y = np.log(np.array([float(row[3]) for row in rows], dtype=np.float64))
+    return keys, X, y
+
+class PriceEstimator:
+    """
+    Cached price models with a background job that refits the strata whose
+    listings changed (PriceModelDirty) every PRICE_REFIT_INTERVAL seconds.
+    Every PRICE_RELOAD_INTERVAL seconds in between it reloads the models
+    from PriceModel if another process has refitted them (that process
+    consumed the dirty strata, so this one would never see them). With
+    refit=False it only reloads, for processes that leave fitting to another.
+    """
+
+    def __init__(self, db_file=DB_FILE, interval=PRICE_REFIT_INTERVAL, refit=True,
+                 reload_interval=PRICE_RELOAD_INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self.refit = refit
+        self.reload_interval = reload_interval
+        self.models = {}  # (kind, city, property_type) -> (n, coefficients, residual_std)
+        self.generation = None  # PriceModelGeneration the models were fitted or loaded at
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_run_at = None
+        self.last_refit_strata = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="price-refit", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        last_refit = None
+        while not self.stop_event.is_set():
+            due = self.refit and (last_refit is None or time.monotonic() - last_refit >= self.interval)
+            self.run_once(refit=due)
+            if due:
+                last_refit = time.monotonic()
+            self.stop_event.wait(self.reload_interval)
+
+    def run_once(self, refit=None):
+        """Refit the changed strata (or with refit=False only pick up another process's fit)."""
+        conn = sqlite3.connect(self.db_file)
+        try:
+            if self.refit if refit is None else refit:
+                self.last_refit_strata = self.refresh(conn)
+            else:
+                self.reload(conn)
+            self.last_error = None
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+        finally:
+            conn.close()
+        self.last_run_at = time.time()
+        return self.last_refit_strata
+
+    def rebuild(self, conn):
+        """Recompute the statistics of every stratum and refit all models."""
+        with self.lock:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM PriceModelDirty")
+            cur.execute("DELETE FROM PriceModelStats")
+            self._write_stats(cur, *load_listing_arrays(conn))
+            self._fit(cur)
+            conn.commit()
+
+    def refresh(self, conn):
+        """
+        Refit after listing changes. Only the changed strata are rescanned;
+        the coarser models are re-derived by summing stored statistics.
+        Returns the number of leaf strata rescanned.
+        """
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM PriceModelStats")
+        if cur.fetchone()[0] == 0:
+            self.rebuild(conn)
+            cur.execute("SELECT COUNT(*) FROM PriceModelStats")
+            return cur.fetchone()[0]
+        with self.lock:
+            cur.execute("SELECT city, property_type FROM PriceModelDirty")
+            strata = [tuple(row) for row in cur.fetchall()]
+            if strata:
+                # Only the strata read above are cleared; changes queued meanwhile wait for the next run
+                cur.executemany("DELETE FROM PriceModelDirty WHERE city = ? AND property_type = ?", strata)
+                cur.executemany("DELETE FROM PriceModelStats WHERE city = ? AND property_type = ?", strata)
+                # Chunked to stay under SQLite's bound-parameter limit
+                for start in range(0, len(strata), 400):
+                    self._write_stats(cur, *load_listing_arrays(conn, strata[start:start + 400]))
+            if strata:
+                self._fit(cur)
+            else:
+                self._load(cur)
+            conn.commit()
+            return len(strata)
+
+    def reload(self, conn):
+        """Load the models from PriceModel if they were refitted since this process last saw them."""
+        with self.lock:
+            return self._load(conn.cursor())
+
+    def _load(self, cur):
+        cur.execute("SELECT generation FROM PriceModelGeneration")
+        generation = cur.fetchone()[0]
+        if generation == self.generation:
+            return False
+        cur.execute("""
+            SELECT kind, city, property_type, n, intercept, log_area, amenities, residual_std FROM PriceModel
+        """)
+        self.models = {(kind, city, property_type): (n, np.array(coef, dtype=np.float64), std)
+                       for kind, city, property_type, n, *coef, std in cur.fetchall()}
+        self.generation = generation
+        return True
+
+    def _write_stats(self, cur, keys, X, y):
+        if not keys:
+            return
+        index = {}
+        groups = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.int64, count=len(keys))
+        counts, stats = grouped_stats(groups, X, y)
+        placeholders = ", ".join(["?"] * (4 + len(STAT_COLUMNS)))
+        cur.executemany(
+            f"INSERT INTO PriceModelStats (kind, city, property_type, n, {', '.join(STAT_COLUMNS)}) VALUES ({placeholders})",
+            [key + (int(counts[g]),) + tuple(stats[g].tolist()) for key, g in index.items()])
+
+    def _fit(self, cur):
+        """Fit every leaf and fallback stratum from PriceModelStats and cache the coefficients."""
+        cur.execute(f"SELECT kind, city, property_type, n, {', '.join(STAT_COLUMNS)} FROM PriceModelStats")
+        rows = cur.fetchall()
+        totals = {}
+        for kind, city, property_type, n, *stats in rows:
+            for key in ((kind, city, property_type), (kind, city, ANY), (kind, ANY, property_type), (kind, ANY, ANY)):
+                entry = totals.get(key)
+                if entry is None:
+                    totals[key] = [n, np.array(stats, dtype=np.float64)]
+                else:
+                    entry[0] += n
+                    entry[1] += stats
+        keys = [key for key, (n, _) in totals.items() if n >= MIN_STRATUM_ROWS or key[1:] == (ANY, ANY)]
+        models = {}
+        if keys:
+            counts = np.array([totals[key][0] for key in keys])
+            beta, residual_std = solve_models(counts, np.vstack([totals[key][1] for key in keys]))
+            models = {key: (int(counts[g]), beta[g], float(residual_std[g])) for g, key in enumerate(keys)}
+        cur.execute("DELETE FROM PriceModel")
+        cur.executemany("""
+            INSERT INTO PriceModel (kind, city, property_type, n, intercept, log_area, amenities, residual_std)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [key + (n,) + tuple(coef.tolist()) + (std,) for key, (n, coef, std) in models.items()])
+        cur.execute("UPDATE PriceModelGeneration SET generation = generation + 1")
+        cur.execute("SELECT generation FROM PriceModelGeneration")
+        self.models = models
+        self.generation = cur.fetchone()[0]
+
+    def model_for(self, kind, city, property_type):
+        """The most specific fitted model for a listing, with the stratum it came from."""
+        city = (city or "").strip().lower()
+        for key in ((kind, city, property_type), (kind, city, ANY), (kind, ANY, property_type), (kind, ANY, ANY)):
+            if key in self.models:
+                return key, self.models[key]
+        return None, None
+
+    def estimate(self, kind, city, property_type, area, amenities=""):
+        """
+        Suggested price (monthly rent for "rent", asking price for "sale")
+        with a one-standard-deviation range, or None if nothing is fitted.
+        """
+        if kind not in KINDS or not area or area <= 0:
+            return None
+        key, model = self.model_for(kind, city, property_type)
+        if model is None:
+            return None
+        n, coef, residual_std = model
+        log_price = float(design_matrix([area], [amenity_count(amenities)])[0] @ coef)
+        return {
+            "estimate": float(np.exp(log_price)),
+            "low": float(np.exp(log_price - residual_std)),
+            "high": float(np.exp(log_price + residual_std)),
+            "comparables": n,
+            "city": key[1],
+            "property_type": key[2],
+        }
+
+    def estimate_many(self, kind, city, property_type, areas, amenity_counts):
+        """Vectorised estimates for many listings of one stratum."""
+        _, model = self.model_for(kind, city, property_type)
+        if model is None:
+            return None
+        return np.exp(design_matrix(areas, amenity_counts) @ model[1])
@@ -0,0 +1,131 @@
+"""
+In-memory token buckets for login attempts.
+
+Every login attempt takes a token from the bucket of the username and from
+the bucket of the client it came from; an attempt that finds either bucket
+empty is turned away before check_credentials() touches SQLite. Buckets
+refill continuously, so a locked-out key unlocks on its own, and a
+successful login refills the username's bucket.
+
+Buckets live in an OrderedDict kept in LRU order and capped at `max_keys`,
+so a storm of random usernames cannot grow memory without bound (an
+evicted key simply starts again with a full bucket). With `state_file` set,
+buckets that are still draining are saved on save() and loaded on start-up,
+so a restart does not hand attackers a fresh allowance.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+LOGIN_STATE_FILE = "login_limits.json"
+
+# Per username: a few tries, then one more every 30 seconds
+USERNAME_BURST = 5
+USERNAME_REFILL = 1 / 30
+# Per client: room for a household behind one address, not for a stuffing run
+CLIENT_BURST = 20
+CLIENT_REFILL = 1 / 3
+
+MAX_TRACKED_KEYS = 100_000
+
+class TokenBuckets:
+    """A bounded set of token buckets sharing one capacity and refill rate."""
+
+    def __init__(self, capacity, refill_per_second, max_keys=MAX_TRACKED_KEYS):
+        self.capacity = capacity
+        self.rate = refill_per_second
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()   # key -> [tokens, updated_at]
+
+    def _level(self, key, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        return min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+
+    def retry_after(self, key, now):
+        """Seconds until `key` has a whole token again (0 if it has one now)."""
+        return max(0.0, (1 - self._level(key, now)) / self.rate)
+
+    def take(self, key, now):
+        """Take one token; returns False (and takes nothing) if the bucket is empty."""
+        tokens = self._level(key, now)
+        if tokens < 1:
+            return False
+        self.buckets[key] = [tokens - 1, now]
+        self.buckets.move_to_end(key)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return True
+
+    def refill(self, key):
+        self.buckets.pop(key, None)
+
+    def draining(self, now):
+        """Buckets that are not yet full again, as {key: [tokens, updated_at]}."""
+        return {key: [self._level(key, now), now] for key in self.buckets if self._level(key, now) < self.capacity}
+
+class LoginRateLimiter:
+    """Per-username and per-client login throttling. Thread-safe."""
+
+    def __init__(self, state_file=None, max_keys=MAX_TRACKED_KEYS,
+                 username_burst=USERNAME_BURST, username_refill=USERNAME_REFILL,
+                 client_burst=CLIENT_BURST, client_refill=CLIENT_REFILL, clock=time.time):
+        self.usernames = TokenBuckets(username_burst, username_refill, max_keys)
+        self.clients = TokenBuckets(client_burst, client_refill, max_keys)
+        self.state_file = state_file
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        if state_file:
+            self.load()
+
+    def attempt(self, username, client=None):
+        """
+        Account for one login attempt. Returns (True, 0) if it may go ahead, or
+        (False, seconds to wait) if the username or client is locked out.
+        """
+        now = self.clock()
+        with self.lock:
+            if client is not None and self.clients.retry_after(client, now) > 0:
+                self.rejected += 1
+                return False, self.clients.retry_after(client, now)
+            if not self.usernames.take(username, now):
+                self.rejected += 1
+                return False, self.usernames.retry_after(username, now)
+            if client is not None:
+                self.clients.take(client, now)
+            self.allowed += 1
+            return True, 0.0
+
+    def succeeded(self, username):
+        """Forget earlier failures once the user got in."""
+        with self.lock:
+            self.usernames.refill(username)
+
+    def save(self):
+        """Write buckets that are still draining to state_file (atomically)."""
+        if not self.state_file:
+            return
+        now = self.clock()
+        with self.lock:
+            state = {"usernames": self.usernames.draining(now), "clients": self.clients.draining(now)}
+        tmp_file = self.state_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def load(self):
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for buckets, saved in ((self.usernames, state.get("usernames", {})), (self.clients, state.get("clients", {}))):
+                # Oldest first so the LRU order survives the round trip
+                for key, bucket in sorted(saved.items(), key=lambda item: item[1][1])[-buckets.max_keys:]:
+                    buckets.buckets[key] = bucket
@@ -0,0 +1,421 @@
+"""
+Similar-listings recommendations.
+
+Available properties are turned into a normalised feature matrix (listing
+kind, type, price, area, city, coordinates, amenities) and neighbours are
+found by brute-force Euclidean distance in NumPy. The top neighbours of
+every listing are stored in PropertyNeighbour so the UI reads them with a
+single indexed lookup; triggers on Property queue changed listings in
+PropertyNeighbourDirty and refresh() recomputes only the rows a change can
+affect.
+
+NeighbourRefresher does that work in the background, so page renders only
+read PropertyNeighbour. The dirty queue is shared by every process using
+the database, but each process has its own in-memory index, which would
+miss the changes another process consumed. So only the process holding
+the lease in PropertyNeighbourLease consumes the queue; a process that
+takes the lease over rebuilds its index first.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+
+from .db import DB_FILE, create_connection, query_all
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+
+NEIGHBOURS_PER_PROPERTY = 10
+AMENITY_VOCAB_SIZE = 64
+CITY_BUCKETS = 128      # cities are hashed into a fixed number of one-hot slots
+QUERY_CHUNK_ROWS = 1024  # rows per block when computing many neighbour lists
+NEIGHBOUR_REFRESH_INTERVAL = 5   # seconds between checks of the dirty queue
+NEIGHBOUR_LEASE_SECONDS = 60     # a refresher that stops renewing loses the queue after this
+
+PROPERTY_TYPES = ["apartment", "house", "condo", "villa", "room"]
+
+# Relative importance of each feature block in the distance
+FEATURE_WEIGHTS = {
+    "listing": 3.0,    # rent vs sale listings should rarely be neighbours
+    "type": 1.0,
+    "price": 1.5,
+    "area": 1.0,
+    "city": 1.5,
+    "coords": 1.0,
+    "amenities": 0.5,
+}
+
+FEATURE_COLUMNS = ("property_type", "sale_renting", "cost", "rent", "area", "city",
+                   "coord_X", "coord_Y", "amenities", "is_available")
+
+def _amenity_tokens(amenities):
+    return {token.strip().lower() for token in (amenities or "").split(",") if token.strip()}
+
+def _city_bucket(city):
+    return zlib.crc32((city or "").strip().lower().encode()) % CITY_BUCKETS
+
+def _price(row):
+    value = row["rent"] if row["sale_renting"] == "rent" else row["cost"]
+    return float(value or 0)
+
+class FeatureSpace:
+    """
+    Normalisation fitted on a set of listings. Numeric features are log-scaled
+    (prices and areas) and standardised; categorical ones are one-hot.
+    """
+
+    def __init__(self, rows):
+        numeric = self._numeric(rows)
+        self.mean = numeric.mean(axis=0) if len(rows) else np.zeros(4)
+        std = numeric.std(axis=0) if len(rows) else np.ones(4)
+        self.std = np.where(std > 0, std, 1.0)
+
+        counts = {}
+        for row in rows:
+            for token in _amenity_tokens(row["amenities"]):
+                counts[token] = counts.get(token, 0) + 1
+        vocab = sorted(counts, key=lambda t: (-counts[t], t))[:AMENITY_VOCAB_SIZE]
+        self.amenity_index = {token: i for i, token in enumerate(vocab)}
+
+        # Column layout of the feature matrix
+        self.offsets = {}
+        width = 0
+        for block, size in (("listing", 2), ("type", len(PROPERTY_TYPES)), ("price", 1), ("area", 1),
+                            ("city", CITY_BUCKETS), ("coords", 2), ("amenities", AMENITY_VOCAB_SIZE)):
+            self.offsets[block] = width
+            width += size
+        self.dim = width
+
+    @staticmethod
+    def _numeric(rows):
+        numeric = np.empty((len(rows), 4), dtype=np.float64)
+        for i, row in enumerate(rows):
+            numeric[i] = (np.log1p(_price(row)), np.log1p(float(row["area"] or 0)),
+                          float(row["coord_X"] or 0), float(row["coord_Y"] or 0))
+        return numeric
+
+    def transform(self, rows):
+        """Feature matrix (float32, one row per listing) for the given rows."""
+        n = len(rows)
+        X = np.zeros((n, self.dim), dtype=np.float32)
+        if n == 0:
+            return X
+        w = FEATURE_WEIGHTS
+        o = self.offsets
+        z = (self._numeric(rows) - self.mean) / self.std
+        X[:, o["price"]] = z[:, 0] * w["price"]
+        X[:, o["area"]] = z[:, 1] * w["area"]
+        X[:, o["coords"]:o["coords"] + 2] = z[:, 2:4] * w["coords"]
+
+        # Amenity vectors are scaled to unit length so listings with long
+        # amenity lists don't dominate the distance
+        for i, row in enumerate(rows):
+            X[i, o["listing"] + (0 if row["sale_renting"] == "rent" else 1)] = w["listing"]
+            if row["property_type"] in PROPERTY_TYPES:
+                X[i, o["type"] + PROPERTY_TYPES.index(row["property_type"])] = w["type"]
+            X[i, o["city"] + _city_bucket(row["city"])] = w["city"]
+            slots = [self.amenity_index[t] for t in _amenity_tokens(row["amenities"]) if t in self.amenity_index]
+            if slots:
+                X[i, [o["amenities"] + s for s in slots]] = w["amenities"] / np.sqrt(len(slots))
+        return X
+
+class SimilarityIndex:
+    """In-memory feature matrix with vectorised k-nearest-neighbour queries."""
+
+    def __init__(self, k=NEIGHBOURS_PER_PROPERTY):
+        self.k = k
+        self.space = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.X = np.empty((0, 0), dtype=np.float32)
+        self.sq_norms = np.empty(0, dtype=np.float32)
+        self.radius = np.empty(0, dtype=np.float32)  # distance to each row's k-th neighbour
+        self.position = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, rows):
+        self.space = FeatureSpace(rows)
+        self.ids = np.array([row["property_id"] for row in rows], dtype=np.int64)
+        self.X = self.space.transform(rows)
+        self.sq_norms = np.einsum("ij,ij->i", self.X, self.X)
+        self.radius = np.full(len(rows), np.inf, dtype=np.float32)
+        self._reindex()
+
+    def _reindex(self):
+        self.position = {int(pid): i for i, pid in enumerate(self.ids)}
+
+    def distances(self, vectors):
+        """Squared distances from each query vector (rows of `vectors`) to every indexed listing."""
+        vectors = np.atleast_2d(vectors)
+        q_norms = np.einsum("ij,ij->i", vectors, vectors)
+        # ||x||^2 - 2 x.q + ||q||^2, done in place to avoid n x m temporaries
+        d = vectors @ self.X.T
+        d *= -2.0
+        d += self.sq_norms[None, :]
+        d += q_norms[:, None]
+        return np.maximum(d, 0.0, out=d)
+
+    def query(self, vector, k=None, exclude_id=None):
+        """Return [(property_id, distance)] for the k listings closest to `vector`."""
+        k = self.k if k is None else k
+        if len(self) == 0:
+            return []
+        d = self.distances(vector)[0]
+        if exclude_id is not None and int(exclude_id) in self.position:
+            d[self.position[int(exclude_id)]] = np.inf
+        k = min(k, len(d))
+        top = np.argpartition(d, k - 1)[:k]
+        top = top[np.argsort(d[top])]
+        return [(int(self.ids[i]), float(np.sqrt(d[i]))) for i in top if np.isfinite(d[i])]
+
+    def neighbours_for_positions(self, positions):
+        """
+        Top-k neighbour lists for the rows at `positions`, computed in blocks.
+        Yields (property_id, [(neighbour_id, distance), ...]) and updates each
+        row's neighbour radius.
+        """
+        k = min(self.k, len(self) - 1)
+        positions = np.asarray(positions, dtype=np.int64)
+        for start in range(0, len(positions), QUERY_CHUNK_ROWS):
+            block = positions[start:start + QUERY_CHUNK_ROWS]
+            d = self.distances(self.X[block])
+            d[np.arange(len(block)), block] = np.inf  # a listing is not its own neighbour
+            if k <= 0:
+                for pos in block:
+                    yield int(self.ids[pos]), []
+                continue
+            top = np.argpartition(d, k - 1, axis=1)[:, :k]
+            top_d = np.take_along_axis(d, top, axis=1)
+            order = np.argsort(top_d, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_d = np.sqrt(np.take_along_axis(top_d, order, axis=1))
+            self.radius[block] = top_d[:, -1]
+            for row, pos in enumerate(block):
+                yield int(self.ids[pos]), [(int(self.ids[j]), float(top_d[row, c])) for c, j in enumerate(top[row])]
+
+    def upsert(self, rows):
+        """Add or replace listings using the existing normalisation (no refit)."""
+        if not rows:
+            return
+        vectors = self.space.transform(rows)
+        new_ids, new_vectors = [], []
+        for row, vector in zip(rows, vectors):
+            pos = self.position.get(int(row["property_id"]))
+            if pos is None:
+                new_ids.append(row["property_id"])
+                new_vectors.append(vector)
+            else:
+                self.X[pos] = vector
+                self.sq_norms[pos] = vector @ vector
+        if new_ids:
+            new_vectors = np.vstack(new_vectors)
+            self.ids = np.concatenate([self.ids, np.array(new_ids, dtype=np.int64)])
+            self.X = np.vstack([self.X, new_vectors])
+            self.sq_norms = np.concatenate([self.sq_norms, np.einsum("ij,ij->i", new_vectors, new_vectors)])
+            self.radius = np.concatenate([self.radius, np.full(len(new_ids), np.inf, dtype=np.float32)])
+            self._reindex()
+
+    def remove(self, property_ids):
+        keep = np.ones(len(self.ids), dtype=bool)
+        for pid in property_ids:
+            pos = self.position.get(int(pid))
+            if pos is not None:
+                keep[pos] = False
+        if keep.all():
+            return
+        self.ids, self.X = self.ids[keep], self.X[keep]
+        self.sq_norms, self.radius = self.sq_norms[keep], self.radius[keep]
+        self._reindex()
+
+def ensure_recommendation_schema(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PropertyNeighbour (
+            property_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            neighbour_id INTEGER NOT NULL,
+            distance REAL NOT NULL,
+            PRIMARY KEY (property_id, rank)
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_neighbour_reverse ON PropertyNeighbour (neighbour_id)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PropertyNeighbourDirty (
+            property_id INTEGER PRIMARY KEY
+        )
+    """)
+    # One row: which worker consumes PropertyNeighbourDirty, and until when
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PropertyNeighbourLease (
+            lease_id INTEGER PRIMARY KEY CHECK (lease_id = 1),
+            lease_owner VARCHAR(80),
+            lease_expires_at REAL NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO PropertyNeighbourLease (lease_id) VALUES (1)")
+    columns = ", ".join(FEATURE_COLUMNS)
+    for name, event, ref in (
+        ("trg_neighbour_property_insert", "AFTER INSERT ON Property", "NEW"),
+        ("trg_neighbour_property_update", f"AFTER UPDATE OF {columns} ON Property", "NEW"),
+        ("trg_neighbour_property_delete", "AFTER DELETE ON Property", "OLD"),
+    ):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} {event}
+            WHEN {ref}.property_id IS NOT NULL
+            BEGIN
+                INSERT OR IGNORE INTO PropertyNeighbourDirty (property_id) VALUES ({ref}.property_id);
+            END
+        """)
+    conn.commit()
+
+def load_listing_rows(conn, property_ids=None):
+    """Feature columns for available listings (optionally only the given ids)."""
+    query = f"SELECT property_id, {', '.join(FEATURE_COLUMNS)} FROM Property WHERE is_available = 1 AND property_id IS NOT NULL"
+    params = []
+    if property_ids is not None:
+        query += f" AND property_id IN ({', '.join('?' * len(property_ids))})"
+        params = list(property_ids)
+    return query_all(conn, query, params)
+
+class SimilarListings:
+    """Keeps the in-memory index and the PropertyNeighbour table in step."""
+
+    def __init__(self, k=NEIGHBOURS_PER_PROPERTY):
+        self.index = SimilarityIndex(k)
+        self.lock = threading.Lock()
+        self.built = False
+
+    def rebuild(self, conn):
+        """Refit the feature space and recompute every neighbour list."""
+        with self.lock:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM PropertyNeighbourDirty")
+            self.index.build(load_listing_rows(conn))
+            cur.execute("DELETE FROM PropertyNeighbour")
+            self._write(cur, self.index.neighbours_for_positions(range(len(self.index))))
+            conn.commit()
+            self.built = True
+
+    def refresh(self, conn):
+        """
+        Apply queued Property changes. Recomputes neighbour lists for changed
+        listings, for listings that had a changed one as a neighbour, and for
+        listings the changed ones now fall inside the k-th neighbour radius of.
+        Returns the number of neighbour lists rewritten.
+        """
+        if not self.built:
+            self.rebuild(conn)
+            return len(self.index)
+        with self.lock:
+            cur = conn.cursor()
+            cur.execute("SELECT property_id FROM PropertyNeighbourDirty")
+            dirty = [row[0] for row in cur.fetchall()]
+            if not dirty:
+                return 0
+            rows = load_listing_rows(conn, dirty)
+            present = {row["property_id"] for row in rows}
+            removed = [pid for pid in dirty if pid not in present]
+
+            self.index.remove(removed)
+            self.index.upsert(rows)
+
+            affected = set(present)
+            placeholders = ", ".join("?" * len(dirty))
+            cur.execute(f"SELECT DISTINCT property_id FROM PropertyNeighbour WHERE neighbour_id IN ({placeholders})", dirty)
+            affected.update(row[0] for row in cur.fetchall())
+            if rows:
+                vectors = self.index.X[[self.index.position[pid] for pid in present]]
+                within = (np.sqrt(self.index.distances(vectors)) < self.index.radius[None, :]).any(axis=0)
+                affected.update(int(pid) for pid in self.index.ids[within])
+            affected.difference_update(removed)
+
+            stale = list(affected) + removed
+            cur.executemany("DELETE FROM PropertyNeighbour WHERE property_id = ?", [(pid,) for pid in stale])
+            positions = [self.index.position[pid] for pid in affected if pid in self.index.position]
+            self._write(cur, self.index.neighbours_for_positions(positions))
+            cur.execute(f"DELETE FROM PropertyNeighbourDirty WHERE property_id IN ({placeholders})", dirty)
+            conn.commit()
+            return len(positions)
+
+    @staticmethod
+    def _write(cur, neighbour_lists):
+        cur.executemany(
+            "INSERT INTO PropertyNeighbour (property_id, rank, neighbour_id, distance) VALUES (?, ?, ?, ?)",
+            ((pid, rank, nid, dist)
+             for pid, neighbours in neighbour_lists
+             for rank, (nid, dist) in enumerate(neighbours)),
+        )
+
+def claim_refresh_lease(conn, worker, now=None, lease_seconds=NEIGHBOUR_LEASE_SECONDS):
+    """Take or renew the lease on the dirty queue. Returns True while `worker` holds it."""
+    now = time.time() if now is None else now
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE PropertyNeighbourLease SET lease_owner = ?, lease_expires_at = ?
+        WHERE lease_id = 1 AND (lease_owner = ? OR lease_expires_at <= ?)
+    """, (worker, now + lease_seconds, worker, now))
+    conn.commit()
+    return cur.rowcount == 1
+
+class NeighbourRefresher:
+    """Background job that applies queued Property changes to PropertyNeighbour."""
+
+    def __init__(self, db_file=DB_FILE, interval=NEIGHBOUR_REFRESH_INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self.similar = SimilarListings()
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_run_at = None
+        self.last_rewritten = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="neighbour-refresher", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.interval)
+
+    def run_once(self):
+        """Refresh if this worker holds the lease. Returns the number of neighbour lists rewritten."""
+        conn = create_connection(self.db_file)
+        try:
+            if not claim_refresh_lease(conn, self.worker):
+                # Another process keeps the lists; rebuild if the lease comes back here
+                self.similar.built = False
+                return 0
+            self.last_rewritten = self.similar.refresh(conn)
+            self.last_run_at = time.time()
+            self.last_error = None
+            return self.last_rewritten
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.last_error = str(e)
+            return 0
+        finally:
+            conn.close()
+
+def get_similar_properties(conn, property_id, limit=3):
+    """Available listings most similar to property_id, closest first."""
+    return query_all(conn, """
+        SELECT p.*, h.first_name || ' ' || h.last_name AS owner_name, n.distance
+        FROM PropertyNeighbour n
+        JOIN Property p ON p.property_id = n.neighbour_id
+        JOIN HomeOwner h ON p.owner_id = h.owner_id
+        WHERE n.property_id = ? AND p.is_available = 1
+        ORDER BY n.rank
+        LIMIT ?
+    """, (property_id, limit))
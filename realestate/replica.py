@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+import time
+
+from .db import DB_FILE
+
+REPLICA_DB_FILE = "real_estate_replica.db"
+REPLICA_SYNC_INTERVAL = 60      # seconds between snapshots
+REPLICA_PAGES_PER_STEP = 256    # pages copied per backup step
+REPLICA_STEP_SLEEP = 0.005      # pause between steps so writers can get the lock
+
+class ReplicaSync:
+    """
+    Background job that copies the live database into a read-only replica
+    using the SQLite online backup API. Each snapshot is written to a temp
+    file in small page steps and then atomically swapped in, so readers of
+    the replica never see a half-copied file.
+    """
+
+    def __init__(self, source_file=DB_FILE, replica_file=REPLICA_DB_FILE,
+                 interval=REPLICA_SYNC_INTERVAL, pages=REPLICA_PAGES_PER_STEP,
+                 step_sleep=REPLICA_STEP_SLEEP):
+        self.source_file = source_file
+        self.replica_file = replica_file
+        self.interval = interval
+        self.pages = pages
+        self.step_sleep = step_sleep
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_snapshot_at = None   # when the last successful copy started
+        self.last_duration = None
+        self.last_pages = 0
+        self.sync_count = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.sync_now()
+            self.stop_event.wait(self.interval)
+
+    def _progress(self, status, remaining, total):
+        self.last_pages = total
+        time.sleep(self.step_sleep)
+
+    def sync_now(self):
+        """Take one snapshot of the live database. Returns True on success."""
+        with self.lock:
+            tmp_file = self.replica_file + ".tmp"
+            started = time.time()
+            try:
+                src = sqlite3.connect(self.source_file)
+                dst = sqlite3.connect(tmp_file)
+                try:
+                    src.backup(dst, pages=self.pages, progress=self._progress)
+                finally:
+                    dst.close()
+                    src.close()
+                os.replace(tmp_file, self.replica_file)
+            except sqlite3.Error as e:
+                self.last_error = str(e)
+                return False
+            self.last_snapshot_at = started
+            self.last_duration = time.time() - started
+            self.sync_count += 1
+            self.last_error = None
+            return True
+
+    def lag_seconds(self):
+        """Age of the replica data, or None if no snapshot exists yet."""
+        if self.last_snapshot_at is None:
+            return None
+        return time.time() - self.last_snapshot_at
+
+    def metrics(self):
+        return {
+            "lag_seconds": self.lag_seconds(),
+            "last_duration": self.last_duration,
+            "last_pages": self.last_pages,
+            "sync_count": self.sync_count,
+            "last_error": self.last_error,
+        }
+
+def create_replica_connection(replica_file=REPLICA_DB_FILE):
+    """
+    Open a read-only connection to the replica. Returns None if no snapshot
+    has been taken yet so callers can fall back to the primary.
+    """
+    if not os.path.exists(replica_file):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{replica_file}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+    except sqlite3.Error:
+        return None
@@ -0,0 +1,6 @@
+"""
+Repository layer: every SQL statement the app runs lives in one of these
+modules. Functions take an open connection as their first argument, return
+plain dicts/lists, and let sqlite3 errors propagate to the caller.
+"""
+from . import bookings, properties, reports, shared_rooms, users
@@ -0,0 +1,226 @@
+from ..archive import NEXT_RECEIPT_ID_SQL
+from ..db import query_all
+from ..outbox import record_event
+from .shared_rooms import promote_waitlist
+
+HOLD_MINUTES = 15  # how long a pending checkout reserves a property or bed
+
+# Outcomes of confirm_hold()
+CONFIRMED = "confirmed"
+HOLD_EXPIRED = "expired"
+
+def book_property(conn, customer_id, property_id, amount):
+    """
+    Rent or buy a property: links the customer to it, writes a completed
+    receipt and takes the property off the market, all in one transaction.
+    """
+    cur = conn.cursor()
+    try:
+        # Add to Buy_Rent table
+        cur.execute("""
+            INSERT INTO Buy_Rent (customer_id, property_id)
+            VALUES (?, ?)
+        """, (customer_id, property_id))
+
+        # Add to Receipt table
+        cur.execute(f"""
+            INSERT INTO Receipt (receipt_id, property_id, customer_id, amount, payment_status, payment_date)
+            VALUES ({NEXT_RECEIPT_ID_SQL}, ?, ?, ?, 'completed', DATE('now'))
+        """, (property_id, customer_id, amount))
+
+        # Update property availability
+        cur.execute("""
+            UPDATE Property 
+            SET is_available = 0 
+            WHERE property_id = ?
+        """, (property_id,))
+
+        # The owner hears about it through the outbox, after this commits
+        record_event(cur, "booking.completed", "property_owner", property_id,
+                     property_id=property_id, customer_id=customer_id, amount=amount)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _insert_hold(cur, customer_id, property_id, room_id, amount, minutes):
+    cur.execute(f"""
+        INSERT INTO Receipt (receipt_id, property_id, customer_id, amount, payment_status, payment_date)
+        VALUES ({NEXT_RECEIPT_ID_SQL}, ?, ?, ?, 'pending', DATE('now'))
+    """, (property_id, customer_id, amount))
+    cur.execute("SELECT receipt_id FROM Receipt WHERE rowid = ?", (cur.lastrowid,))
+    receipt_id = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO BookingHold (receipt_id, customer_id, property_id, room_id, expires_at)
+        VALUES (?, ?, ?, ?, DATETIME('now', ?))
+    """, (receipt_id, customer_id, property_id, room_id, f"+{int(minutes)} minutes"))
+    return receipt_id
+
+def hold_property(conn, customer_id, property_id, amount, minutes=HOLD_MINUTES):
+    """
+    Reserve a property for checkout: takes it off the market and writes a
+    pending receipt that expires after `minutes`. Returns the receipt id,
+    or None if the property is no longer available.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("UPDATE Property SET is_available = 0 WHERE property_id = ? AND is_available = 1",
+                    (property_id,))
+        if cur.rowcount == 0:
+            conn.rollback()
+            return None
+        receipt_id = _insert_hold(cur, customer_id, property_id, None, amount, minutes)
+        conn.commit()
+        return receipt_id
+    except Exception:
+        conn.rollback()
+        raise
+
+def hold_bed(conn, customer_id, room_id, minutes=HOLD_MINUTES):
+    """
+    Reserve a bed in a shared room for checkout at its monthly rent.
+    Returns the receipt id, or None if the room has no free bed.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            UPDATE SharedRoom SET available_beds = available_beds - 1
+            WHERE room_id = ? AND available_beds > 0
+        """, (room_id,))
+        if cur.rowcount == 0:
+            conn.rollback()
+            return None
+        cur.execute("SELECT property_id, monthly_rent FROM SharedRoom WHERE room_id = ?", (room_id,))
+        property_id, monthly_rent = cur.fetchone()
+        receipt_id = _insert_hold(cur, customer_id, property_id, room_id, monthly_rent, minutes)
+        conn.commit()
+        return receipt_id
+    except Exception:
+        conn.rollback()
+        raise
+
+def confirm_hold(conn, customer_id, receipt_id):
+    """
+    Complete a checkout once payment went through: the receipt becomes
+    completed and the customer is linked to the property (or bed).
+    Returns CONFIRMED, or HOLD_EXPIRED if the hold was already released.
+    """
+    cur = conn.cursor()
+    try:
+        # Claiming the hold row is what makes this safe against the sweeper
+        cur.execute("""
+            DELETE FROM BookingHold
+            WHERE receipt_id = ? AND customer_id = ? AND expires_at > CURRENT_TIMESTAMP
+            RETURNING property_id, room_id
+        """, (receipt_id, customer_id))
+        row = cur.fetchone()
+        if row is None:
+            conn.rollback()
+            return HOLD_EXPIRED
+        property_id, room_id = row
+        if room_id is None:
+            cur.execute("INSERT OR IGNORE INTO Buy_Rent (customer_id, property_id) VALUES (?, ?)",
+                        (customer_id, property_id))
+            record_event(cur, "booking.completed", "property_owner", property_id,
+                         property_id=property_id, customer_id=customer_id, receipt_id=receipt_id)
+        else:
+            cur.execute("INSERT OR IGNORE INTO Participates (customer_id, room_id) VALUES (?, ?)",
+                        (customer_id, room_id))
+            cur.execute("INSERT OR IGNORE INTO Interested_In_Sharing (customer_id, room_id) VALUES (?, ?)",
+                        (customer_id, room_id))
+            record_event(cur, "sharing.applied", "room_owner", room_id,
+                         room_id=room_id, customer_id=customer_id, receipt_id=receipt_id)
+        cur.execute("UPDATE Receipt SET payment_status = 'completed' WHERE receipt_id = ?", (receipt_id,))
+        conn.commit()
+        return CONFIRMED
+    except Exception:
+        conn.rollback()
+        raise
+
+def cancel_hold(conn, customer_id, receipt_id):
+    """Give up a checkout before it expires. Returns False if there was no such hold."""
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            DELETE FROM BookingHold WHERE receipt_id = ? AND customer_id = ?
+            RETURNING receipt_id, property_id, room_id
+        """, (receipt_id, customer_id))
+        rows = [tuple(row) for row in cur.fetchall()]
+        release_holds(cur, rows)
+        conn.commit()
+        return bool(rows)
+    except Exception:
+        conn.rollback()
+        raise
+
+def release_holds(cur, rows):
+    """
+    Undo claimed (already deleted) holds on an open cursor (no commit):
+    fails their receipts and puts the properties and beds back, handing
+    freed beds to the room's waitlist. `rows` are (receipt_id, property_id,
+    room_id) tuples.
+    """
+    if not rows:
+        return
+    cur.executemany("UPDATE Receipt SET payment_status = 'failed' WHERE receipt_id = ?",
+                    [(receipt_id,) for receipt_id, _, _ in rows])
+    cur.executemany("UPDATE Property SET is_available = 1 WHERE property_id = ?",
+                    [(property_id,) for _, property_id, room_id in rows if room_id is None])
+    freed = {}
+    for _, _, room_id in rows:
+        if room_id is not None:
+            freed[room_id] = freed.get(room_id, 0) + 1
+    for room_id, beds in freed.items():
+        cur.execute("""
+            UPDATE SharedRoom SET available_beds = MIN(total_beds, available_beds + ?)
+            WHERE room_id = ?
+        """, (beds, room_id))
+        promote_waitlist(cur, room_id)
+
+def get_customer_holds(conn, customer_id):
+    """Active checkouts for a customer with the seconds left on each."""
+    return query_all(conn, """
+        SELECT 
+            h.receipt_id,
+            h.property_id,
+            h.room_id,
+            p.property_type,
+            p.street,
+            p.city,
+            r.amount,
+            CAST(strftime('%s', h.expires_at) - strftime('%s', 'now') AS INTEGER) AS seconds_left
+        FROM BookingHold h
+        JOIN Property p ON h.property_id = p.property_id
+        JOIN Receipt r ON h.receipt_id = r.receipt_id
+        WHERE h.customer_id = ? AND h.expires_at > CURRENT_TIMESTAMP
+        ORDER BY h.expires_at
+    """, (customer_id,))
+
+def get_customer_purchases(conn, customer_id, include_archived=False):
+    """
+    Rentals and purchases for a customer, newest first. Older completed
+    receipts live in the archive partitions and are only read through the
+    Receipt_All view when include_archived is set.
+    """
+    receipt_source = "Receipt_All" if include_archived else "Receipt"
+    return query_all(conn, f"""
+        SELECT DISTINCT
+            p.property_id,
+            p.property_type,
+            p.street,
+            p.city,
+            p.sale_renting,
+            CASE 
+                WHEN p.sale_renting = 'rent' THEN p.rent
+                ELSE p.cost
+            END as amount,
+            r.payment_date,
+            r.payment_status
+        FROM Buy_Rent br
+        JOIN Property p ON br.property_id = p.property_id
+        JOIN {receipt_source} r ON br.property_id = r.property_id 
+            AND br.customer_id = r.customer_id
+        WHERE br.customer_id = ?
+        ORDER BY r.payment_date DESC
+    """, (customer_id,))
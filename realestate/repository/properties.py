@@ -0,0 +1,170 @@
+from .. import blobs
+from ..db import next_id_sql, query_all, query_one, query_scalar
+from .shared_rooms import insert_shared_room
+
+PROPERTY_TYPES = ["apartment", "house", "condo", "villa", "room"]
+
+LISTING_QUERY = """
+    SELECT p.*, h.first_name || ' ' || h.last_name AS owner_name,
+        (SELECT pi.digest FROM PropertyImage pi WHERE pi.property_id = p.property_id
+         ORDER BY pi.position LIMIT 1) AS photo
+    FROM Property p
+    JOIN HomeOwner h ON p.owner_id = h.owner_id
+"""
+
+def search_listings(conn, sale_renting, property_type="All", min_price=0, max_price=0,
+                    limit=None, offset=0, property_ids=None):
+    """
+    Available listings for rent or sale. Prices filter on rent for rentals and
+    on cost for sales; max_price is only applied when it is above min_price.
+    property_ids narrows the search to those properties (used to re-check
+    just the listings that changed).
+    """
+    price_column = "p.rent" if sale_renting == "rent" else "p.cost"
+    query = LISTING_QUERY + " WHERE p.is_available = 1 AND p.sale_renting = ?"
+    params = [sale_renting]
+
+    if property_ids is not None:
+        query += f" AND p.property_id IN ({', '.join('?' * len(property_ids))})"
+        params.extend(property_ids)
+
+    # Only add property type filter if a specific type is selected
+    if property_type and property_type != "All":
+        query += " AND p.property_type = ?"
+        params.append(property_type)
+
+    if min_price > 0:
+        query += f" AND {price_column} >= ?"
+        params.append(min_price)
+
+    if max_price > min_price:
+        query += f" AND {price_column} <= ?"
+        params.append(max_price)
+
+    if limit is not None:
+        query += " ORDER BY p.property_id LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+    return query_all(conn, query, params)
+
+def get_property(conn, property_id):
+    return query_one(conn, LISTING_QUERY + " WHERE p.property_id = ?", (property_id,))
+
+def list_properties_with_owner(conn):
+    return query_all(conn, LISTING_QUERY)
+
+def list_property_choices(conn, available_only=False):
+    """property_id, street and city for selection widgets."""
+    query = "SELECT property_id, street, city FROM Property"
+    if available_only:
+        query += " WHERE is_available = 1"
+    return query_all(conn, query)
+
+def get_owner_properties(conn, owner_id):
+    return query_all(conn, """
+        SELECT p.*,
+            (SELECT pi.digest FROM PropertyImage pi WHERE pi.property_id = p.property_id
+             ORDER BY pi.position LIMIT 1) AS photo
+        FROM Property p
+        WHERE p.owner_id = ?
+    """, (owner_id,))
+
+def get_owner_sharing_properties(conn, owner_id):
+    return query_all(conn, """
+        SELECT property_id, street, city, sharing_allowed
+        FROM Property
+        WHERE owner_id = ? AND sharing_allowed = 1
+    """, (owner_id,))
+
+def count_properties(conn, available_only=False):
+    query = "SELECT COUNT(*) FROM Property"
+    if available_only:
+        query += " WHERE is_available = 1"
+    return query_scalar(conn, query, default=0)
+
+def property_type_counts(conn):
+    return query_all(conn, "SELECT property_type, COUNT(*) as count FROM Property GROUP BY property_type")
+
+def average_rent(conn):
+    return query_scalar(conn, "SELECT AVG(rent) FROM Property WHERE sale_renting = 'rent'", default=0)
+
+def add_property(conn, owner_id, property_type, sale_renting, cost, building, street, city, pin,
+                 area, rent, description, amenities, sharing_allowed, coord_X, coord_Y,
+                 photos=(), store=None):
+    """
+    Insert a new available property. Rentals with sharing allowed also get a
+    two-bed SharedRoom at half the rent. `photos` are (bytes, content_type)
+    pairs saved to the blob store in the same transaction.
+    Returns (property_id, shared_room_added).
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            INSERT INTO Property (
+                property_id, owner_id, property_type, sale_renting, cost,
+                building, street, city, pin, area, rent,
+                description, amenities, is_available, sharing_allowed,
+                coord_X, coord_Y
+            ) VALUES (
+                {next_id_sql("Property", "property_id")},
+                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?
+            )
+        """, (
+            owner_id, property_type, sale_renting, cost,
+            building, street, city, pin, area, rent,
+            description, amenities, sharing_allowed,
+            coord_X, coord_Y
+        ))
+        cur.execute("SELECT property_id FROM Property WHERE rowid = ?", (cur.lastrowid,))
+        property_id = cur.fetchone()[0]
+
+        shared_room_added = False
+        if sharing_allowed and sale_renting == 'rent':
+            insert_shared_room(cur, property_id, rent / 2)
+            shared_room_added = True
+        if photos:
+            blobs.attach_photos(cur, store or blobs.BlobStore(), property_id, photos)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return property_id, shared_room_added
+
+def set_availability(conn, property_id, available):
+    cur = conn.cursor()
+    cur.execute("UPDATE Property SET is_available = ? WHERE property_id = ?",
+                (1 if available else 0, property_id))
+    conn.commit()
+
+def delete_property(conn, property_id, store=None):
+    """Delete a property; photo files no other listing uses are removed with it."""
+    released = delete_property_row(conn, property_id)
+    remove_released_photos(conn, released, store)
+
+def delete_property_row(conn, property_id):
+    """
+    Delete a property and release the blobs only it used, without touching
+    any files. Returns their digests for remove_released_photos() once this
+    has committed.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM Property WHERE property_id = ?", (property_id,))
+        released = blobs.release_unreferenced(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return released
+
+def remove_released_photos(conn, digests, store=None):
+    """Remove the photo files released by a committed delete_property_row()."""
+    return blobs.remove_released(conn, store or blobs.BlobStore(), digests)
+
+def get_property_photos(conn, property_id):
+    return query_all(conn, """
+        SELECT image_id, digest, content_type, byte_size, uploaded_at
+        FROM PropertyImage
+        WHERE property_id = ?
+        ORDER BY position
+    """, (property_id,))
@@ -0,0 +1,245 @@
+"""Admin report queries (numbered as in the Reports tab)."""
+from ..db import query_all
+
+def available_rentals(conn):
+    """1. All available properties for rent."""
+    return query_all(conn, """
+        SELECT 
+            p.property_id,
+            p.property_type,
+            p.city,
+            p.street,
+            p.cost,
+            p.rent,
+            p.is_available,
+            h.first_name || ' ' || h.last_name AS owner_name
+        FROM Property p
+        JOIN HomeOwner h ON p.owner_id = h.owner_id
+        WHERE p.sale_renting = 'rent' AND p.is_available = 1;
+    """)
+
+def verified_homeowners(conn):
+    """2. Verified homeowners."""
+    return query_all(conn, """
+        SELECT 
+            owner_id,
+            first_name,
+            last_name,
+            email,
+            phone_number
+        FROM HomeOwner
+        WHERE verification_status = 'verified';
+    """)
+
+def shared_rooms_with_beds(conn):
+    """3. Shared rooms with available beds."""
+    return query_all(conn, """
+        SELECT 
+            sr.room_id,
+            sr.property_id,
+            sr.total_beds,
+            sr.available_beds,
+            sr.monthly_rent,
+            p.city,
+            p.street
+        FROM SharedRoom sr
+        JOIN Property p ON sr.property_id = p.property_id
+        WHERE sr.available_beds > 0;
+    """)
+
+def customers_interested_in_room(conn, room_id):
+    """4. Customers interested in sharing a particular room."""
+    return query_all(conn, """
+        SELECT 
+            c.customer_id,
+            c.first_name,
+            c.last_name,
+            c.email
+        FROM Interested_In_Sharing iis
+        JOIN Customer c ON iis.customer_id = c.customer_id
+        WHERE iis.room_id = ?
+    """, (room_id,))
+
+def fully_occupied_shared_rooms(conn):
+    """12. Properties with fully occupied shared rooms."""
+    return query_all(conn, """
+        SELECT 
+            p.property_id,
+            p.property_type,
+            p.city
+        FROM Property p
+        JOIN SharedRoom sr ON p.property_id = sr.property_id
+        WHERE sr.available_beds = 0;
+    """)
+
+def properties_per_city(conn):
+    """13. Count of properties per city."""
+    return query_all(conn, """
+        SELECT 
+            city,
+            COUNT(property_id) AS total_properties
+        FROM Property
+        GROUP BY city;
+    """)
+
+def sharing_participants(conn):
+    """14. Customers participating in room sharing."""
+    return query_all(conn, """
+        SELECT 
+            c.customer_id,
+            c.first_name,
+            c.last_name,
+            sr.room_id,
+            p.city,
+            p.street
+        FROM Participates pr
+        JOIN Customer c ON pr.customer_id = c.customer_id
+        JOIN SharedRoom sr ON pr.room_id = sr.room_id
+        JOIN Property p ON sr.property_id = p.property_id;
+    """)
+
+def top_rental_cities(conn, limit=5):
+    """15. Cities with the most properties available for rent."""
+    return query_all(conn, """
+        SELECT 
+            city,
+            COUNT(property_id) AS available_properties
+        FROM Property
+        WHERE sale_renting = 'rent' AND is_available = 1
+        GROUP BY city
+        ORDER BY available_properties DESC
+        LIMIT ?;
+    """, (limit,))
+
+def total_revenue(conn):
+    """
+    16. Revenue from completed payments. Archived partitions are read from
+    their precomputed totals, so only the hot Receipt table is scanned.
+    """
+    return query_all(conn, """
+        SELECT 
+            (SELECT COALESCE(SUM(amount), 0) FROM Receipt WHERE payment_status = 'completed')
+            + (SELECT COALESCE(SUM(completed_revenue), 0) FROM ReceiptArchiveSummary) AS total_revenue;
+    """)
+
+def owners_with_nothing_available(conn):
+    """17. Homeowners whose properties are all unavailable."""
+    return query_all(conn, """
+        SELECT 
+            h.owner_id,
+            h.first_name,
+            h.last_name
+        FROM HomeOwner h
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM Property p
+            WHERE p.owner_id = h.owner_id AND p.is_available = 1
+        );
+    """)
+
+def receipt_archive_partitions(conn):
+    """18. Receipt archive partitions."""
+    return query_all(conn, """
+        SELECT 
+            partition_year,
+            receipt_count,
+            completed_revenue
+        FROM ReceiptArchiveSummary
+        ORDER BY partition_year DESC;
+    """)
+
+def roommate_match_queue(conn):
+    """19. Customers waiting for a roommate match."""
+    return query_all(conn, """
+        SELECT 
+            q.customer_id,
+            c.first_name,
+            c.last_name,
+            rp.city,
+            rp.max_rent,
+            q.queued_at,
+            (SELECT COUNT(*) FROM Interested_In_Sharing i WHERE i.customer_id = q.customer_id) AS shortlisted_rooms
+        FROM RoommateMatchQueue q
+        JOIN Customer c ON q.customer_id = c.customer_id
+        LEFT JOIN RoommatePreference rp ON q.customer_id = rp.customer_id
+        ORDER BY q.queued_at;
+    """)
+
+def pending_checkouts(conn):
+    """20. Booking holds awaiting payment."""
+    return query_all(conn, """
+        SELECT 
+            h.receipt_id,
+            c.first_name,
+            c.last_name,
+            h.property_id,
+            h.room_id,
+            r.amount,
+            h.created_at,
+            h.expires_at
+        FROM BookingHold h
+        JOIN Customer c ON h.customer_id = c.customer_id
+        JOIN Receipt r ON h.receipt_id = r.receipt_id
+        ORDER BY h.expires_at;
+    """)
+
+def notification_outbox(conn):
+    """21. Undelivered notifications, oldest first."""
+    return query_all(conn, """
+        SELECT 
+            event_id,
+            event_type,
+            recipient,
+            created_at,
+            attempts,
+            last_error
+        FROM Outbox
+        WHERE dispatched_at IS NULL
+        ORDER BY event_id
+        LIMIT 200;
+    """)
+
+def change_feed_consumers(conn):
+    """22. Change feed consumers and how far each is behind the log."""
+    return query_all(conn, """
+        SELECT 
+            c.name,
+            c.last_seq,
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'), 0) - c.last_seq AS behind,
+            c.updated_at
+        FROM ChangeConsumer c
+        ORDER BY behind DESC;
+    """)
+
+def maintenance_jobs(conn):
+    """25. Maintenance jobs with their latest run and when they are next due."""
+    return query_all(conn, """
+        SELECT 
+            j.name AS job,
+            r.status AS last_status,
+            DATETIME(r.started_at, 'unixepoch') AS last_run,
+            ROUND(r.duration_ms, 1) AS last_duration_ms,
+            r.detail,
+            DATETIME(j.next_run_at, 'unixepoch') AS next_run,
+            j.lease_owner AS running_on
+        FROM MaintenanceJob j
+        LEFT JOIN MaintenanceRun r ON r.run_id = (
+            SELECT MAX(run_id) FROM MaintenanceRun WHERE job = j.name
+        )
+        ORDER BY j.next_run_at;
+    """)
+
+def maintenance_runs(conn, limit=50):
+    """25. Most recent maintenance runs."""
+    return query_all(conn, """
+        SELECT 
+            job,
+            DATETIME(started_at, 'unixepoch') AS started,
+            ROUND(duration_ms, 1) AS duration_ms,
+            status,
+            detail,
+            worker
+        FROM MaintenanceRun
+        ORDER BY run_id DESC
+        LIMIT ?;
+    """, (limit,))
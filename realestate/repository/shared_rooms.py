@@ -0,0 +1,321 @@
+from .. import waitlist
+from ..outbox import record_event
+from ..archive import NEXT_RECEIPT_ID_SQL
+from ..db import next_id_sql, query_all, query_one, query_scalar
+
+# Outcomes of apply_for_sharing()
+APPLIED = "applied"
+ALREADY_APPLIED = "already_applied"
+WAITLISTED = "waitlisted"
+ALREADY_WAITLISTED = "already_waitlisted"
+
+def insert_shared_room(cur, property_id, monthly_rent, total_beds=2):
+    """Insert a SharedRoom row on an open cursor (no commit). Returns room_id."""
+    cur.execute(f"""
+        INSERT INTO SharedRoom (room_id, property_id, total_beds, available_beds, monthly_rent)
+        VALUES ({next_id_sql("SharedRoom", "room_id")}, ?, ?, ?, ?)
+    """, (property_id, total_beds, total_beds, monthly_rent))
+    cur.execute("SELECT room_id FROM SharedRoom WHERE rowid = ?", (cur.lastrowid,))
+    return cur.fetchone()[0]
+
+def create_shared_room(conn, property_id, rent):
+    """
+    Offer a rental property as a two-bed shared room at half the rent.
+    Returns False if the property is already shared.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM SharedRoom WHERE property_id = ?", (property_id,))
+    if cur.fetchone():
+        return False
+    insert_shared_room(cur, property_id, rent / 2)
+    conn.commit()
+    return True
+
+def remove_shared_room(conn, room_id):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM SharedRoom WHERE room_id = ?", (room_id,))
+    conn.commit()
+
+def list_owner_shared_rooms(conn, owner_id):
+    return query_all(conn, """
+        SELECT DISTINCT
+            sr.room_id,
+            sr.property_id,
+            sr.total_beds,
+            sr.available_beds,
+            sr.monthly_rent,
+            p.street,
+            p.city,
+            p.rent,
+            p.property_type,
+            p.description,
+            p.building
+        FROM SharedRoom sr
+        JOIN Property p ON sr.property_id = p.property_id
+        WHERE p.owner_id = ?
+        ORDER BY sr.room_id DESC
+    """, (owner_id,))
+
+def list_available_shared_rooms(conn):
+    return query_all(conn, """
+        SELECT 
+            sr.*,
+            p.street,
+            p.city,
+            p.rent,
+            p.property_type,
+            p.description,
+            p.building
+        FROM SharedRoom sr
+        JOIN Property p ON sr.property_id = p.property_id
+        WHERE sr.available_beds > 0
+    """)
+
+def get_interested_customers(conn, room_id):
+    return query_all(conn, """
+        SELECT 
+            c.first_name,
+            c.last_name,
+            c.email,
+            c.phone
+        FROM Interested_In_Sharing iis
+        JOIN Customer c ON iis.customer_id = c.customer_id
+        WHERE iis.room_id = ?
+    """, (room_id,))
+
+def decrease_available_beds(conn, room_id):
+    cur = conn.cursor()
+    cur.execute("UPDATE SharedRoom SET available_beds = available_beds - 1 WHERE room_id = ? AND available_beds > 0",
+                (room_id,))
+    conn.commit()
+
+def available_beds(conn, room_id):
+    return query_scalar(conn, "SELECT available_beds FROM SharedRoom WHERE room_id = ?", (room_id,))
+
+def take_bed(cur, customer_id, room_id):
+    """
+    Give a customer a bed on an open cursor (no commit): takes the bed,
+    records the participation and interest, and writes a completed receipt
+    for the monthly rent. Returns False if the room has no free bed.
+    """
+    # The guard makes this safe against concurrent applicants
+    cur.execute("""
+        UPDATE SharedRoom 
+        SET available_beds = available_beds - 1 
+        WHERE room_id = ? AND available_beds > 0
+    """, (room_id,))
+    if cur.rowcount == 0:
+        return False
+
+    # Participates goes first so the matching triggers don't queue a placed customer
+    cur.execute("""
+        INSERT INTO Participates (customer_id, room_id)
+        VALUES (?, ?)
+    """, (customer_id, room_id))
+    cur.execute("""
+        INSERT OR IGNORE INTO Interested_In_Sharing (customer_id, room_id)
+        VALUES (?, ?)
+    """, (customer_id, room_id))
+
+    cur.execute(f"""
+        INSERT INTO Receipt (receipt_id, property_id, customer_id, amount, payment_status, payment_date)
+        SELECT {NEXT_RECEIPT_ID_SQL}, sr.property_id, ?, sr.monthly_rent, 'completed', DATE('now')
+        FROM SharedRoom sr
+        WHERE sr.room_id = ?
+    """, (customer_id, room_id))
+    record_event(cur, "sharing.applied", "room_owner", room_id, room_id=room_id, customer_id=customer_id)
+    return True
+
+def promote_waitlist(cur, room_id):
+    """
+    Hand the room's free beds to the head of its waitlist on an open cursor
+    (no commit); call it in the transaction that freed the beds. Returns the
+    promoted customer ids.
+    """
+    promoted = []
+    free = available_beds(cur.connection, room_id) or 0
+    while free > 0:
+        head = waitlist.waitlist_head(cur, room_id, free)
+        if not head:
+            break
+        for entry_id, customer_id in head:
+            cur.execute("DELETE FROM SharedRoomWaitlist WHERE entry_id = ?", (entry_id,))
+            cur.execute("SELECT 1 FROM Participates WHERE customer_id = ? AND room_id = ?", (customer_id, room_id))
+            if cur.fetchone():
+                continue  # placed some other way while waiting
+            if not take_bed(cur, customer_id, room_id):
+                return promoted
+            record_event(cur, "sharing.promoted", "customer", customer_id, room_id=room_id)
+            promoted.append(customer_id)
+            free -= 1
+    return promoted
+
+def apply_for_sharing(conn, customer_id, room_id):
+    """
+    Register a customer for a bed in a shared room (see take_bed()). If the
+    room is full the customer joins its waitlist instead and is placed
+    automatically when a bed frees up.
+    Returns APPLIED, ALREADY_APPLIED, WAITLISTED or ALREADY_WAITLISTED.
+    """
+    cur = conn.cursor()
+    try:
+        # First check if customer has already applied for this room
+        cur.execute("""
+            SELECT 1 FROM Participates 
+            WHERE customer_id = ? AND room_id = ?
+        """, (customer_id, room_id))
+        if cur.fetchone():
+            return ALREADY_APPLIED
+
+        if take_bed(cur, customer_id, room_id):
+            conn.commit()
+            return APPLIED
+
+        joined = waitlist.join_waitlist(cur, room_id, customer_id)
+        if joined:
+            record_event(cur, "sharing.waitlisted", "room_owner", room_id, room_id=room_id, customer_id=customer_id)
+        # A bed freed between the failed take and the insert would otherwise
+        # sit idle, so promote now that this transaction holds the write lock
+        if customer_id in promote_waitlist(cur, room_id):
+            conn.commit()
+            return APPLIED
+        conn.commit()
+        return WAITLISTED if joined else ALREADY_WAITLISTED
+    except Exception:
+        conn.rollback()
+        raise
+
+def leave_shared_room(conn, customer_id, room_id):
+    """
+    Give up a bed; the freed bed goes to the waitlist in the same
+    transaction. Returns the promoted customer ids, or None if the customer
+    had no bed in the room.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM Participates WHERE customer_id = ? AND room_id = ?", (customer_id, room_id))
+        if cur.rowcount == 0:
+            conn.rollback()
+            return None
+        cur.execute("""
+            UPDATE SharedRoom SET available_beds = available_beds + 1
+            WHERE room_id = ? AND available_beds < total_beds
+        """, (room_id,))
+        promoted = promote_waitlist(cur, room_id)
+        conn.commit()
+        return promoted
+    except Exception:
+        conn.rollback()
+        raise
+
+def set_total_beds(conn, room_id, total_beds):
+    """
+    Change a room's bed count, keeping occupied beds; new beds go to the
+    waitlist in the same transaction. Returns the promoted customer ids, or
+    None if the new count is below the number of occupied beds.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            UPDATE SharedRoom
+            SET available_beds = ? - (total_beds - available_beds), total_beds = ?
+            WHERE room_id = ? AND ? >= total_beds - available_beds
+        """, (total_beds, total_beds, room_id, total_beds))
+        if cur.rowcount == 0:
+            conn.rollback()
+            return None
+        promoted = promote_waitlist(cur, room_id)
+        conn.commit()
+        return promoted
+    except Exception:
+        conn.rollback()
+        raise
+
+def cancel_waitlist(conn, customer_id, room_id):
+    cur = conn.cursor()
+    removed = waitlist.leave_waitlist(cur, room_id, customer_id)
+    conn.commit()
+    return removed
+
+def get_customer_waitlists(conn, customer_id):
+    """Rooms the customer is waiting for, with their queue position."""
+    rooms = query_all(conn, """
+        SELECT w.room_id, p.street, p.city, sr.monthly_rent, w.joined_at
+        FROM SharedRoomWaitlist w
+        JOIN SharedRoom sr ON w.room_id = sr.room_id
+        JOIN Property p ON sr.property_id = p.property_id
+        WHERE w.customer_id = ?
+        ORDER BY w.joined_at
+    """, (customer_id,))
+    cur = conn.cursor()
+    for room in rooms:
+        room['position'] = waitlist.waitlist_position(cur, room['room_id'], customer_id)
+    return rooms
+
+def get_room_waitlist(conn, room_id):
+    return query_all(conn, """
+        SELECT 
+            c.first_name,
+            c.last_name,
+            c.email,
+            w.priority,
+            w.joined_at
+        FROM SharedRoomWaitlist w
+        JOIN Customer c ON w.customer_id = c.customer_id
+        WHERE w.room_id = ?
+        ORDER BY w.priority DESC, w.entry_id
+    """, (room_id,))
+
+def shortlist_room(conn, customer_id, room_id):
+    """
+    Record interest in a room without taking a bed; the roommate matcher
+    places shortlisted customers. Returns False if already shortlisted.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("INSERT OR IGNORE INTO Interested_In_Sharing (customer_id, room_id) VALUES (?, ?)",
+                    (customer_id, room_id))
+        added = cur.rowcount > 0
+        if added:
+            record_event(cur, "sharing.interest", "room_owner", room_id, room_id=room_id, customer_id=customer_id)
+        conn.commit()
+        return added
+    except Exception:
+        conn.rollback()
+        raise
+
+def get_roommate_preferences(conn, customer_id):
+    return query_one(conn, """
+        SELECT city, max_rent, min_beds, max_beds, updated_at
+        FROM RoommatePreference
+        WHERE customer_id = ?
+    """, (customer_id,))
+
+def save_roommate_preferences(conn, customer_id, city=None, max_rent=None, min_beds=None, max_beds=None):
+    """Create or replace a customer's roommate preferences (queues them for matching)."""
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO RoommatePreference (customer_id, city, max_rent, min_beds, max_beds)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(customer_id) DO UPDATE SET
+            city = excluded.city,
+            max_rent = excluded.max_rent,
+            min_beds = excluded.min_beds,
+            max_beds = excluded.max_beds,
+            updated_at = CURRENT_TIMESTAMP
+    """, (customer_id, city or None, max_rent or None, min_beds or None, max_beds or None))
+    conn.commit()
+
+def get_customer_placements(conn, customer_id):
+    """Shared rooms the customer has a bed in."""
+    return query_all(conn, """
+        SELECT sr.room_id, p.street, p.city, sr.monthly_rent, sr.total_beds
+        FROM Participates pa
+        JOIN SharedRoom sr ON pa.room_id = sr.room_id
+        JOIN Property p ON sr.property_id = p.property_id
+        WHERE pa.customer_id = ?
+    """, (customer_id,))
+
+def is_waiting_for_match(conn, customer_id):
+    return query_scalar(conn, "SELECT COUNT(*) FROM RoommateMatchQueue WHERE customer_id = ?",
+                        (customer_id,), default=0) > 0
@@ -0,0 +1,99 @@
+from ..db import query_all, query_one, query_scalar
+from ..outbox import record_event
+
+VERIFICATION_STATUSES = ["pending", "verified", "rejected"]
+
+def check_credentials(conn, username, password):
+    """
+    Check the given username and password against the Credentials table.
+    Returns a tuple (True, user_type) if valid or (False, None) if not.
+    """
+    if not username or not password:
+        return (False, None)
+    row = query_one(conn, """
+        SELECT user_type 
+        FROM Credentials 
+        WHERE username = ? AND password = ?
+    """, (username, password))
+    if row:
+        return (True, row["user_type"])
+    return (False, None)
+
+def username_exists(conn, username):
+    return query_one(conn, "SELECT username FROM Credentials WHERE username = ?", (username,)) is not None
+
+def create_customer(conn, username, password, first_name, last_name, email, phone):
+    """Create the credentials and customer profile in one transaction. Returns customer_id."""
+    cur = conn.cursor()
+    try:
+        cur.execute("INSERT INTO Credentials (username, password, user_type) VALUES (?, ?, 'customer')",
+                    (username, password))
+        # The customer_id is the rowid of the new credentials row
+        customer_id = cur.lastrowid
+        cur.execute("""
+            INSERT INTO Customer (customer_id, username, first_name, last_name, email, phone)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (customer_id, username, first_name, last_name, email, phone))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return customer_id
+
+def create_homeowner(conn, username, password, first_name, last_name, email, phone_number):
+    """Create the credentials and a pending homeowner profile. Returns owner_id."""
+    cur = conn.cursor()
+    try:
+        cur.execute("INSERT INTO Credentials (username, password, user_type) VALUES (?, ?, 'owner')",
+                    (username, password))
+        owner_id = cur.lastrowid
+        cur.execute("""
+            INSERT INTO HomeOwner (owner_id, username, first_name, last_name, email, phone_number, verification_status)
+            VALUES (?, ?, ?, ?, ?, ?, 'pending')
+        """, (owner_id, username, first_name, last_name, email, phone_number))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return owner_id
+
+def get_customer(conn, username):
+    return query_one(conn, "SELECT * FROM Customer WHERE username = ?", (username,))
+
+def get_homeowner(conn, username):
+    return query_one(conn, "SELECT * FROM HomeOwner WHERE username = ?", (username,))
+
+def count_users(conn):
+    return query_scalar(conn, "SELECT COUNT(*) FROM Credentials", default=0)
+
+def user_type_counts(conn):
+    return query_all(conn, "SELECT user_type, COUNT(*) as count FROM Credentials GROUP BY user_type")
+
+def list_credentials(conn):
+    return query_all(conn, "SELECT username, user_type FROM Credentials")
+
+def list_homeowners(conn):
+    return query_all(conn, """
+        SELECT owner_id, username, first_name, last_name, email, phone_number, verification_status
+        FROM HomeOwner
+    """)
+
+def set_verification_status(conn, owner_id, status):
+    """Change an owner's verification status and notify them in the same transaction."""
+    cur = conn.cursor()
+    try:
+        cur.execute("UPDATE HomeOwner SET verification_status = ? WHERE owner_id = ?", (status, owner_id))
+        if cur.rowcount:
+            record_event(cur, "owner.verification", "owner", owner_id, status=status)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def list_customers(conn):
+    return query_all(conn, "SELECT customer_id, username, first_name, last_name FROM Customer")
+
+def delete_customer(conn, customer_id):
+    cur = conn.cursor()
+    cur.execute("DELETE FROM Customer WHERE customer_id = ?", (customer_id,))
+    conn.commit()
@@ -0,0 +1,243 @@
+from .lazy import pd
+
+ALL_OWNERS = 0  # owner_id used for the system-wide rollup rows
+
+# Recomputes today's occupancy row for one owner. Runs inside triggers, so
+# it only ever touches that owner's properties (indexed on owner_id); the
+# system-wide row is maintained with deltas instead (see below).
+OCCUPANCY_UPSERT = """
+    INSERT INTO OccupancyDaily (day, owner_id, total_properties, occupied_properties, total_beds, available_beds)
+    SELECT
+        DATE('now'),
+        {owner},
+        (SELECT COUNT(*) FROM Property WHERE {filter}),
+        (SELECT COUNT(*) FROM Property WHERE {filter} AND is_available = 0),
+        (SELECT COALESCE(SUM(sr.total_beds), 0) FROM SharedRoom sr
+            JOIN Property p ON sr.property_id = p.property_id WHERE {p_filter}),
+        (SELECT COALESCE(SUM(sr.available_beds), 0) FROM SharedRoom sr
+            JOIN Property p ON sr.property_id = p.property_id WHERE {p_filter})
+    WHERE {owner} IS NOT NULL
+    ON CONFLICT(day, owner_id) DO UPDATE SET
+        total_properties = excluded.total_properties,
+        occupied_properties = excluded.occupied_properties,
+        total_beds = excluded.total_beds,
+        available_beds = excluded.available_beds;
+"""
+
+def occupancy_upsert_sql(owner_expr=None):
+    """
+    Build the occupancy upsert for one owner, or for all owners if owner_expr
+    is None; the latter scans everything and is only for rebuild_occupancy().
+    """
+    if owner_expr is None:
+        return OCCUPANCY_UPSERT.format(owner=ALL_OWNERS, filter="1", p_filter="1")
+    return OCCUPANCY_UPSERT.format(owner=owner_expr, filter=f"owner_id = {owner_expr}",
+                                   p_filter=f"p.owner_id = {owner_expr}")
+
+# Bed-count changes (e.g. a bed being taken) adjust today's row in place
+# instead of re-aggregating; the snapshot is only computed if the row is missing.
+OCCUPANCY_BEDS_DELTA = """
+    UPDATE OccupancyDaily
+    SET total_beds = total_beds + NEW.total_beds - OLD.total_beds,
+        available_beds = available_beds + NEW.available_beds - OLD.available_beds
+    WHERE owner_id = {owner} AND day = DATE('now');
+"""
+
+def occupancy_beds_delta_sql(owner_expr):
+    """Delta update for the owner's row today followed by a snapshot if that row doesn't exist yet."""
+    snapshot = occupancy_upsert_sql(owner_expr).replace(
+        f"WHERE {owner_expr} IS NOT NULL",
+        f"WHERE {owner_expr} IS NOT NULL AND NOT EXISTS "
+        f"(SELECT 1 FROM OccupancyDaily WHERE owner_id = {owner_expr} AND day = DATE('now'))")
+    return OCCUPANCY_BEDS_DELTA.format(owner=owner_expr) + snapshot
+
+# The system-wide row is never re-aggregated in a trigger (that would scan
+# every property and room on each write). Today's row starts as a copy of
+# the latest earlier one, and each write adds its delta to it.
+SYSTEM_OCCUPANCY_DELTA = f"""
+    INSERT INTO OccupancyDaily (day, owner_id, total_properties, occupied_properties, total_beds, available_beds)
+    SELECT DATE('now'), owner_id, total_properties, occupied_properties, total_beds, available_beds
+    FROM OccupancyDaily
+    WHERE owner_id = {ALL_OWNERS} AND day < DATE('now')
+      AND NOT EXISTS (SELECT 1 FROM OccupancyDaily WHERE owner_id = {ALL_OWNERS} AND day = DATE('now'))
+    ORDER BY day DESC LIMIT 1;
+    UPDATE OccupancyDaily
+    SET {{updates}}
+    WHERE owner_id = {ALL_OWNERS} AND day = DATE('now') AND {{condition}};
+"""
+
+def system_occupancy_delta_sql(deltas, condition="1"):
+    """Add `deltas` ({column: expression}) to today's system-wide row when `condition` holds."""
+    return SYSTEM_OCCUPANCY_DELTA.format(
+        updates=", ".join(f"{column} = {column} + {delta}" for column, delta in deltas.items()),
+        condition=condition)
+
+def property_occupancy_delta_sql(row, sign):
+    """Add (sign "+") or remove (sign "-") a Property row, beds of its rooms included."""
+    beds = "(SELECT COALESCE(SUM({}), 0) FROM SharedRoom WHERE property_id = " + row + ".property_id)"
+    return system_occupancy_delta_sql({
+        "total_properties": f"{sign}1",
+        "occupied_properties": f"{sign}({row}.is_available = 0)",
+        "total_beds": sign + beds.format("total_beds"),
+        "available_beds": sign + beds.format("available_beds"),
+    })
+
+def room_occupancy_delta_sql(row, sign):
+    """Add or remove a SharedRoom row's beds; a no-op when its property is gone."""
+    return system_occupancy_delta_sql({
+        "total_beds": f"{sign}{row}.total_beds",
+        "available_beds": f"{sign}{row}.available_beds",
+    }, condition=f"EXISTS (SELECT 1 FROM Property WHERE property_id = {row}.property_id)")
+
+REVENUE_UPSERT = """
+    INSERT INTO RevenueDaily (day, owner_id, revenue, receipt_count)
+    SELECT NEW.payment_date, owner, NEW.amount, 1
+    FROM (SELECT {owner} AS owner)
+    WHERE owner IS NOT NULL
+    ON CONFLICT(day, owner_id) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        receipt_count = receipt_count + 1;
+"""
+
+def ensure_rollup_schema(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS RevenueDaily (
+            day DATE NOT NULL,
+            owner_id INTEGER NOT NULL,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            receipt_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (owner_id, day)
+        )
+    """)
+    # One row per owner per day on which occupancy changed; days without a
+    # row carry the previous day's values forward.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS OccupancyDaily (
+            day DATE NOT NULL,
+            owner_id INTEGER NOT NULL,
+            total_properties INTEGER NOT NULL,
+            occupied_properties INTEGER NOT NULL,
+            total_beds INTEGER NOT NULL,
+            available_beds INTEGER NOT NULL,
+            PRIMARY KEY (owner_id, day)
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_property_owner ON Property (owner_id, is_available)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sharedroom_property ON SharedRoom (property_id)")
+
+    # Revenue: add completed receipts as they are written (or completed later).
+    # Archival deletes are deliberately not tracked; revenue is history.
+    revenue_body = (REVENUE_UPSERT.format(owner="(SELECT owner_id FROM Property WHERE property_id = NEW.property_id)")
+                    + REVENUE_UPSERT.format(owner=ALL_OWNERS))
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_receipt_insert
+        AFTER INSERT ON Receipt WHEN NEW.payment_status = 'completed'
+        BEGIN {revenue_body} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_receipt_complete
+        AFTER UPDATE OF payment_status ON Receipt
+        WHEN NEW.payment_status = 'completed' AND OLD.payment_status != 'completed'
+        BEGIN {revenue_body} END
+    """)
+
+    # Occupancy: recompute today's row for the affected owner(s), indexed on
+    # owner_id, and apply the change to the system-wide row as a delta.
+    # Replaced rather than created-if-missing: earlier versions re-aggregated
+    # the system-wide row here.
+    owner_of = "(SELECT owner_id FROM Property WHERE property_id = {}.property_id)"
+    occupancy_triggers = {
+        "trg_rollup_property_insert": ("AFTER INSERT ON Property", ["NEW.owner_id"],
+                                       property_occupancy_delta_sql("NEW", "+")),
+        "trg_rollup_property_update": ("AFTER UPDATE OF is_available, owner_id ON Property",
+                                       ["OLD.owner_id", "NEW.owner_id"],
+                                       system_occupancy_delta_sql({"occupied_properties":
+                                           "(NEW.is_available = 0) - (OLD.is_available = 0)"})),
+        "trg_rollup_property_delete": ("AFTER DELETE ON Property", ["OLD.owner_id"],
+                                       property_occupancy_delta_sql("OLD", "-")),
+        "trg_rollup_room_insert": ("AFTER INSERT ON SharedRoom", [owner_of.format("NEW")],
+                                   room_occupancy_delta_sql("NEW", "+")),
+        "trg_rollup_room_delete": ("AFTER DELETE ON SharedRoom", [owner_of.format("OLD")],
+                                   room_occupancy_delta_sql("OLD", "-")),
+    }
+    for name, (event, owners, system_delta) in occupancy_triggers.items():
+        body = "".join(occupancy_upsert_sql(owner) for owner in owners) + system_delta
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+    body = occupancy_beds_delta_sql(owner_of.format("NEW")) + system_occupancy_delta_sql({
+        "total_beds": "NEW.total_beds - OLD.total_beds",
+        "available_beds": "NEW.available_beds - OLD.available_beds",
+    }, condition="EXISTS (SELECT 1 FROM Property WHERE property_id = NEW.property_id)")
+    cur.execute("DROP TRIGGER IF EXISTS trg_rollup_room_update")
+    cur.execute(f"""
+        CREATE TRIGGER trg_rollup_room_update
+        AFTER UPDATE OF available_beds, total_beds ON SharedRoom
+        BEGIN {body} END
+    """)
+
+    # Backfill on first run, and take today's snapshot so every owner has a
+    # starting point for the carried-forward series.
+    cur.execute("SELECT COUNT(*) FROM RevenueDaily")
+    if cur.fetchone()[0] == 0:
+        cur.execute("""
+            INSERT INTO RevenueDaily (day, owner_id, revenue, receipt_count)
+            SELECT r.payment_date, p.owner_id, SUM(r.amount), COUNT(*)
+            FROM Receipt_All r
+            JOIN Property p ON r.property_id = p.property_id
+            WHERE r.payment_status = 'completed'
+            GROUP BY r.payment_date, p.owner_id
+        """)
+        cur.execute(f"""
+            INSERT INTO RevenueDaily (day, owner_id, revenue, receipt_count)
+            SELECT payment_date, {ALL_OWNERS}, SUM(amount), COUNT(*)
+            FROM Receipt_All
+            WHERE payment_status = 'completed'
+            GROUP BY payment_date
+        """)
+    cur.execute("SELECT 1 FROM OccupancyDaily WHERE owner_id = ? AND day = DATE('now')", (ALL_OWNERS,))
+    if cur.fetchone() is None:
+        rebuild_occupancy(cur)
+    conn.commit()
+
+def rebuild_occupancy(cur):
+    """Recompute today's occupancy rows, system-wide included, on an open cursor (no commit)."""
+    cur.execute("SELECT owner_id FROM HomeOwner")
+    for (owner_id,) in cur.fetchall():
+        cur.execute(occupancy_upsert_sql(int(owner_id)))
+    cur.execute(occupancy_upsert_sql())
+
+def get_revenue_series(conn, owner_id=ALL_OWNERS, freq="D"):
+    """Revenue per day ("D") or month ("M") from the precomputed rollup."""
+    period = "day" if freq == "D" else "substr(day, 1, 7)"
+    return pd.read_sql_query(f"""
+        SELECT {period} AS period, SUM(revenue) AS revenue, SUM(receipt_count) AS receipts
+        FROM RevenueDaily
+        WHERE owner_id = ?
+        GROUP BY period
+        ORDER BY period
+    """, conn, params=(owner_id,))
+
+def get_occupancy_series(conn, owner_id=ALL_OWNERS, freq="D"):
+    """
+    Occupancy rate and bed fill rate per day or month. Rollup rows only exist
+    for days with changes, so values are carried forward to fill the gaps;
+    monthly points use the state at the end of each month.
+    """
+    df = pd.read_sql_query("""
+        SELECT day, total_properties, occupied_properties, total_beds, available_beds
+        FROM OccupancyDaily
+        WHERE owner_id = ?
+        ORDER BY day
+    """, conn, params=(owner_id,))
+    if df.empty:
+        return df
+    df["day"] = pd.to_datetime(df["day"])
+    days = pd.date_range(df["day"].min(), max(df["day"].max(), pd.Timestamp.today().normalize()), freq="D")
+    df = df.set_index("day").reindex(days).ffill()
+    if freq == "M":
+        df = df.resample("ME").last()
+    df["occupancy_rate"] = (df["occupied_properties"] / df["total_properties"]).fillna(0)
+    df["bed_fill_rate"] = ((df["total_beds"] - df["available_beds"]) / df["total_beds"]).fillna(0)
+    df.index.name = "period"
+    return df.reset_index()
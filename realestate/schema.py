@@ -0,0 +1,29 @@
+import sqlite3
+
+from . import archive, audit, blobs, changes, holds, maintenance, matching, moderation, outbox, portfolio, pricing, recommend, rollups, waitlist
+from .db import DB_FILE
+
+def init_database(db_file=DB_FILE):
+    """Create the auxiliary tables, indexes, views and triggers (idempotent)."""
+    conn = sqlite3.connect(db_file)
+    try:
+        ensure_schema(conn)
+    finally:
+        conn.close()
+
+def ensure_schema(conn):
+    """init_database() on an open connection (e.g. an in-memory database holding the base tables)."""
+    archive.ensure_receipt_archive_schema(conn)
+    rollups.ensure_rollup_schema(conn)
+    recommend.ensure_recommendation_schema(conn)
+    matching.ensure_matching_schema(conn)
+    pricing.ensure_pricing_schema(conn)
+    waitlist.ensure_waitlist_schema(conn)
+    holds.ensure_hold_schema(conn)
+    outbox.ensure_outbox_schema(conn)
+    changes.ensure_change_schema(conn)
+    audit.ensure_audit_schema(conn)
+    blobs.ensure_blob_schema(conn)
+    maintenance.ensure_maintenance_schema(conn)
+    portfolio.ensure_portfolio_schema(conn)
+    moderation.ensure_moderation_schema(conn)
@@ -0,0 +1,74 @@
+"""
+Per-room waitlists for shared rooms.
+
+Applicants who find a room full join SharedRoomWaitlist. Whenever a bed is
+freed, the code that frees it promotes the waitlist in the same
+transaction (repository.shared_rooms.promote_waitlist), so the bed goes
+straight to the head of the queue (highest priority first, then first
+come) before any other writer can see it.
+"""
+
+def ensure_waitlist_schema(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS SharedRoomWaitlist (
+            entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            joined_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (customer_id, room_id),
+            FOREIGN KEY (room_id) REFERENCES SharedRoom(room_id) ON DELETE CASCADE,
+            FOREIGN KEY (customer_id) REFERENCES Customer(customer_id) ON DELETE CASCADE
+        )
+    """)
+    # Queue order per room: the head is the first row of this index
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_waitlist_queue
+        ON SharedRoomWaitlist (room_id, priority DESC, entry_id)
+    """)
+    # Removing a room takes its queue with it (foreign keys are not enforced)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_waitlist_room_delete AFTER DELETE ON SharedRoom
+        BEGIN
+            DELETE FROM SharedRoomWaitlist WHERE room_id = OLD.room_id;
+        END
+    """)
+    conn.commit()
+
+def join_waitlist(cur, room_id, customer_id, priority=0):
+    """Queue a customer for a room on an open cursor (no commit). Returns False if already queued."""
+    cur.execute("""
+        INSERT OR IGNORE INTO SharedRoomWaitlist (room_id, customer_id, priority)
+        VALUES (?, ?, ?)
+    """, (room_id, customer_id, priority))
+    return cur.rowcount > 0
+
+def leave_waitlist(cur, room_id, customer_id):
+    cur.execute("DELETE FROM SharedRoomWaitlist WHERE room_id = ? AND customer_id = ?", (room_id, customer_id))
+    return cur.rowcount > 0
+
+def waitlist_head(cur, room_id, limit=1):
+    """The next `limit` (entry_id, customer_id) pairs in queue order."""
+    cur.execute("""
+        SELECT entry_id, customer_id
+        FROM SharedRoomWaitlist
+        WHERE room_id = ?
+        ORDER BY priority DESC, entry_id
+        LIMIT ?
+    """, (room_id, limit))
+    return [tuple(row) for row in cur.fetchall()]
+
+def waitlist_position(cur, room_id, customer_id):
+    """1-based position of a customer in a room's queue, or None if not queued."""
+    cur.execute("""
+        SELECT 1 + (
+            SELECT COUNT(*) FROM SharedRoomWaitlist ahead
+            WHERE ahead.room_id = w.room_id
+              AND (ahead.priority > w.priority OR (ahead.priority = w.priority AND ahead.entry_id < w.entry_id))
+        )
+        FROM SharedRoomWaitlist w
+        WHERE w.room_id = ? AND w.customer_id = ?
+    """, (room_id, customer_id))
+    row = cur.fetchone()
+    return row[0] if row else None
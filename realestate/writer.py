@@ -0,0 +1,186 @@
+"""
+Single writer with group commit.
+
+Each repository write commits on its own, and every commit waits for the
+journal to reach the disk, so a burst of signups and bookings spends most
+of its time in fsync. WriteQueue runs writes on one connection in one
+thread instead: callers submit a job and get a Future, and the writer
+takes whatever jobs have queued up and runs them in a single transaction,
+one fsync for the batch. While writes are arriving concurrently (the last
+batch had more than one job) it also waits up to `window` seconds for
+more; a lone caller is never held back.
+
+Jobs are the ordinary repository functions, called as fn(conn, *args).
+Each runs inside its own SAVEPOINT on a connection wrapper where commit()
+releases that savepoint and rollback() rolls back to it, so a job that
+fails or backs out (e.g. a hold on a property that was just taken) undoes
+only its own changes. Futures resolve once the batch has committed, so a
+caller that reads after result() sees its write. A job submitted with
+exclusive=True runs in a transaction of its own.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import audit, moderation
+from .db import DB_FILE, create_connection
+from .repository import bookings, properties, shared_rooms, users
+
+GROUP_COMMIT_WINDOW = 0.002   # seconds the writer waits for more jobs before committing
+GROUP_COMMIT_MAX_JOBS = 64
+WRITE_TIMEOUT = 30            # seconds a caller waits for its write
+
+# Writes app code sends by name (to this process's queue or to a coordinator)
+WRITE_OPERATIONS = {
+    "create_customer": users.create_customer,
+    "create_homeowner": users.create_homeowner,
+    "add_property": properties.add_property,
+    "book_property": bookings.book_property,
+    "hold_property": bookings.hold_property,
+    "hold_bed": bookings.hold_bed,
+    "confirm_hold": bookings.confirm_hold,
+    "cancel_hold": bookings.cancel_hold,
+    "apply_for_sharing": shared_rooms.apply_for_sharing,
+    "shortlist_room": shared_rooms.shortlist_room,
+    # Admin writes
+    "set_availability": properties.set_availability,
+    "decrease_available_beds": shared_rooms.decrease_available_beds,
+    "delete_customer": users.delete_customer,
+    "delete_property": properties.delete_property_row,
+    "remove_released_photos": properties.remove_released_photos,
+    "set_verification_statuses": moderation.set_verification_statuses,
+    "write_audit_entries": audit.write_entries,
+}
+
+class JobConnection:
+    """The writer's connection as one job sees it: commit/rollback end the job's savepoint."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._open = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def begin(self):
+        self._conn.execute("SAVEPOINT job")
+        self._open = True
+
+    def commit(self):
+        if self._open:
+            self._conn.execute("RELEASE SAVEPOINT job")
+            self._open = False
+
+    def rollback(self):
+        if self._open:
+            self._conn.execute("ROLLBACK TO SAVEPOINT job")
+            self._conn.execute("RELEASE SAVEPOINT job")
+            self._open = False
+
+class WriteQueue:
+    """Background writer that group-commits queued write jobs."""
+
+    def __init__(self, db_file=DB_FILE, window=GROUP_COMMIT_WINDOW, max_jobs=GROUP_COMMIT_MAX_JOBS):
+        self.db_file = db_file
+        self.window = window
+        self.max_jobs = max_jobs
+        self.jobs = queue.SimpleQueue()
+        self.thread = None
+        self.committed_jobs = 0
+        self.failed_jobs = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_error = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.jobs.put(None)
+
+    def submit(self, fn, *args, exclusive=False, **kwargs):
+        """Queue fn(conn, *args, **kwargs); returns a Future of its result."""
+        future = Future()
+        self.jobs.put((future, fn, args, kwargs, exclusive))
+        return future
+
+    def call(self, fn, *args, timeout=WRITE_TIMEOUT, **kwargs):
+        """Run a write through the queue and wait for it to commit."""
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def stats(self):
+        return {
+            "committed_jobs": self.committed_jobs,
+            "failed_jobs": self.failed_jobs,
+            "batches": self.batches,
+            "jobs_per_commit": self.committed_jobs / self.batches if self.batches else None,
+            "queued": self.jobs.qsize(),
+        }
+
+    def _next_batch(self, first):
+        """`first` plus the compatible jobs already queued or arriving within the window."""
+        batch = [first]
+        if first[4]:
+            return batch, None
+        deadline = time.monotonic() + (self.window if self.last_batch_size > 1 else 0)
+        while len(batch) < self.max_jobs:
+            try:
+                job = self.jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job is None:
+                self.jobs.put(None)   # stop once this batch is done
+                break
+            if job[4]:
+                return batch, job     # runs on its own after this batch
+            batch.append(job)
+        return batch, None
+
+    def _run(self):
+        conn = create_connection(self.db_file)
+        job_conn = JobConnection(conn)
+        pending = None
+        while True:
+            job = pending if pending is not None else self.jobs.get()
+            if job is None:
+                break
+            batch, pending = self._next_batch(job)
+            batch = [queued for queued in batch if queued[0].set_running_or_notify_cancel()]
+            if batch:
+                self._run_batch(conn, job_conn, batch)
+        conn.close()
+
+    def _run_batch(self, conn, job_conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, fn, args, kwargs, _ in batch:
+                job_conn.begin()
+                try:
+                    result = fn(job_conn, *args, **kwargs)
+                    job_conn.commit()
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    job_conn.rollback()
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            # The batch never committed, so none of its jobs happened
+            self.last_error = str(e)
+            conn.rollback()
+            self.failed_jobs += len(batch)
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        for future, result, error in outcomes:
+            if error is None:
+                self.committed_jobs += 1
+                future.set_result(result)
+            else:
+                self.failed_jobs += 1
+                future.set_exception(error)
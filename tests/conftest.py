@@ -0,0 +1,50 @@
+"""
+`memory_conn`: an in-memory database with the base tables from data.sql
+and every auxiliary table, holding a few customers, one owner, two rental
+properties and a full two-bed shared room (room 1 on property 1).
+"""
+import os
+
+import pytest
+
+from realestate import schema
+from realestate.db import create_connection
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def base_tables_sql():
+    """The CREATE TABLE statements of data.sql (everything before its sample rows)."""
+    with open(os.path.join(REPO_DIR, "data.sql")) as f:
+        sql = f.read()
+    return sql[:sql.index("INSERT INTO")]
+
+@pytest.fixture
+def memory_conn():
+    conn = create_connection(":memory:")
+    conn.executescript(base_tables_sql())
+    schema.ensure_schema(conn)
+    cur = conn.cursor()
+    customers = [(customer_id, f"customer{customer_id}") for customer_id in range(1, 5)]
+    cur.executemany("INSERT INTO Credentials (username, password, user_type) VALUES (?, 'pw', 'customer')",
+                    [(username,) for _, username in customers])
+    cur.executemany("""
+        INSERT INTO Customer (customer_id, username, first_name, last_name, email)
+        VALUES (?, ?, 'First', 'Last', ? || '@example.com')
+    """, [(customer_id, username, username) for customer_id, username in customers])
+    cur.execute("INSERT INTO Credentials (username, password, user_type) VALUES ('owner1', 'pw', 'owner')")
+    cur.execute("""
+        INSERT INTO HomeOwner (owner_id, username, first_name, last_name, email, verification_status)
+        VALUES (1, 'owner1', 'Owner', 'One', 'owner1@example.com', 'verified')
+    """)
+    cur.executemany("""
+        INSERT INTO Property (property_id, owner_id, property_type, sale_renting, cost, street, city, pin,
+                              area, rent, is_available, sharing_allowed)
+        VALUES (?, 1, 'apartment', 'rent', 0, 'Main Street', 'Springfield', '12345', 80, 1200, 1, ?)
+    """, [(1, 1), (2, 0)])
+    cur.execute("""
+        INSERT INTO SharedRoom (room_id, property_id, monthly_rent, total_beds, available_beds)
+        VALUES (1, 1, 400, 2, 0)
+    """)
+    conn.commit()
+    yield conn
+    conn.close()
@@ -0,0 +1,39 @@
+"""
+AuditLogger: entries are written by the logger thread only; sync() waits
+for it instead of flushing from the caller's thread.
+"""
+import os
+import shutil
+
+import pytest
+
+from realestate import audit, schema
+from realestate.db import create_connection
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "real_estate.db")
+    shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), path)
+    schema.init_database(path)
+    return path
+
+def test_sync_waits_for_the_logger_thread(db_file):
+    logger = audit.AuditLogger(db_file, interval=60)   # would not flush on its own during the test
+    logger.start()
+    try:
+        for target_id in range(3):
+            logger.log("admin", audit.DELETE_CUSTOMER, target_id)
+        assert logger.sync()
+        conn = create_connection(db_file)
+        rows, _ = audit.audit_page(conn, action=audit.DELETE_CUSTOMER)
+        conn.close()
+        assert sorted(row["target_id"] for row in rows[:3]) == [0, 1, 2]
+        assert logger.written == 3
+    finally:
+        logger.stop()
+
+def test_sync_without_a_running_thread_returns_at_once(db_file):
+    logger = audit.AuditLogger(db_file)
+    assert logger.sync() is False
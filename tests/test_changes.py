@@ -0,0 +1,54 @@
+"""
+Change log: a consumer resumes after the seq it acknowledged, and
+compaction never deletes changes a registered consumer has not acked.
+"""
+from realestate import changes
+
+def set_rent(conn, property_id, rent):
+    conn.execute("UPDATE Property SET rent = ? WHERE property_id = ?", (rent, property_id))
+    conn.commit()
+
+def test_consumer_resumes_after_the_acked_seq(memory_conn):
+    consumer = changes.ChangeConsumer(memory_conn, "listing-cache", tables=["Property"])
+    assert consumer.poll() == []
+    set_rent(memory_conn, 1, 1300)
+    set_rent(memory_conn, 2, 1400)
+    first, second = consumer.poll()
+    assert (first.table_name, first.row_id, first.op) == ("Property", 1, changes.UPDATED)
+    consumer.ack(first.seq)
+
+    # A new handle (e.g. after a restart) starts from the stored position
+    resumed = changes.ChangeConsumer(memory_conn, "listing-cache", tables=["Property"])
+    assert resumed.position == first.seq
+    assert resumed.poll() == [second]
+    resumed.ack(second.seq)
+    resumed.ack(first.seq)   # acks never move the position back
+    assert changes.ChangeConsumer(memory_conn, "listing-cache").position == second.seq
+
+def test_consumer_only_sees_its_tables(memory_conn):
+    consumer = changes.ChangeConsumer(memory_conn, "rooms", tables=["SharedRoom"])
+    set_rent(memory_conn, 1, 1300)
+    memory_conn.execute("UPDATE SharedRoom SET monthly_rent = 450 WHERE room_id = 1")
+    memory_conn.commit()
+    assert [(change.table_name, change.row_id) for change in consumer.poll()] == [("SharedRoom", 1)]
+
+def test_compaction_keeps_changes_a_consumer_has_not_acked(memory_conn):
+    changes.compact_changes(memory_conn)   # the fixture's own inserts; nobody is registered yet
+    behind = changes.ChangeConsumer(memory_conn, "behind")
+    ahead = changes.ChangeConsumer(memory_conn, "ahead")
+    for rent in (1300, 1400, 1500):
+        set_rent(memory_conn, 1, rent)
+    pending = ahead.poll()
+    assert len(pending) == 3
+    ahead.ack(pending[-1].seq)
+    behind.ack(pending[0].seq)
+
+    assert changes.compact_changes(memory_conn) == 1
+    assert behind.poll() == pending[1:]
+    assert changes.compact_changes(memory_conn) == 0
+
+    changes.drop_consumer(memory_conn, "behind")
+    assert changes.compact_changes(memory_conn) == 2
+    assert changes.retained_count(memory_conn) == 0
+    # The high-water mark survives an empty log
+    assert changes.latest_seq(memory_conn) == pending[-1].seq
@@ -0,0 +1,54 @@
+"""
+Listing grids are st.fragment functions. Streamlit reruns a fragment on its
+own (on its refresh timer, or when a widget inside it is used) by calling
+the function again with the arguments of its first call, after main() has
+returned and closed its connection. AppTest only does full reruns, so
+these tests ask its script runner for fragment-scoped ones.
+"""
+import functools
+import os
+import shutil
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()   # init_database() and shared state are per database file
+    at = AppTest.from_file(os.path.join(REPO_DIR, "final.py"), default_timeout=60)
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "john.doe"
+    at.session_state["user_type"] = "customer"
+    return at
+
+def fragment_rerun(at, monkeypatch, auto=False):
+    """Run only the fragments registered by the previous run, as the runtime does."""
+    fragment_ids = list(at._fragment_storage._fragments)
+    assert fragment_ids
+    with monkeypatch.context() as patch:
+        patch.setattr(local_script_runner, "RerunData", functools.partial(
+            local_script_runner.RerunData, fragment_id_queue=fragment_ids,
+            is_fragment_scoped_rerun=True, is_auto_rerun=auto))
+        at.run()
+
+def errors(at):
+    return [e.value for e in at.error] + [str(e.value) for e in at.exception]
+
+def test_listing_fragments_refresh_after_main_closed_its_connection(app, monkeypatch):
+    app.run()
+    assert errors(app) == []
+    fragment_rerun(app, monkeypatch, auto=True)
+    assert errors(app) == []
+
+def test_listing_search_form_reruns_only_the_fragment(app, monkeypatch):
+    app.run()
+    app.text_input(key="rent_city").input("seatle")
+    next(b for b in app.button if b.label == "Search" and b.form_id == "rent_filters_form").click()
+    fragment_rerun(app, monkeypatch)
+    assert errors(app) == []
+    assert "Showing listings in Seattle." in [c.value for c in app.caption]
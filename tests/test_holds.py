@@ -0,0 +1,47 @@
+"""
+Booking holds: an expired hold can no longer be confirmed, and releasing a
+bed hold hands the bed to the room's waitlist.
+"""
+from realestate import holds
+from realestate.repository import bookings, shared_rooms
+
+def expire(conn, receipt_id):
+    conn.execute("UPDATE BookingHold SET expires_at = DATETIME('now', '-1 minute') WHERE receipt_id = ?",
+                 (receipt_id,))
+    conn.commit()
+
+def payment_status(conn, receipt_id):
+    return conn.execute("SELECT payment_status FROM Receipt WHERE receipt_id = ?", (receipt_id,)).fetchone()[0]
+
+def test_confirming_an_expired_hold_fails(memory_conn):
+    receipt_id = bookings.hold_property(memory_conn, 1, 2, 1200)
+    expire(memory_conn, receipt_id)
+
+    assert bookings.confirm_hold(memory_conn, 1, receipt_id) == bookings.HOLD_EXPIRED
+    assert memory_conn.execute("SELECT COUNT(*) FROM Buy_Rent").fetchone()[0] == 0
+    assert payment_status(memory_conn, receipt_id) == "pending"
+
+    assert holds.release_expired_holds(memory_conn) == 1
+    assert payment_status(memory_conn, receipt_id) == "failed"
+    assert memory_conn.execute("SELECT is_available FROM Property WHERE property_id = 2").fetchone()[0] == 1
+
+def test_confirming_a_live_hold_books_the_property(memory_conn):
+    receipt_id = bookings.hold_property(memory_conn, 1, 2, 1200)
+    assert bookings.confirm_hold(memory_conn, 1, receipt_id) == bookings.CONFIRMED
+    assert payment_status(memory_conn, receipt_id) == "completed"
+
+def test_released_bed_hold_promotes_the_waitlist_head(memory_conn):
+    memory_conn.execute("UPDATE SharedRoom SET available_beds = 1 WHERE room_id = 1")
+    memory_conn.commit()
+    receipt_id = bookings.hold_bed(memory_conn, 1, 1)
+    assert shared_rooms.available_beds(memory_conn, 1) == 0
+    assert shared_rooms.apply_for_sharing(memory_conn, 2, 1) == shared_rooms.WAITLISTED
+    assert shared_rooms.apply_for_sharing(memory_conn, 3, 1) == shared_rooms.WAITLISTED
+    expire(memory_conn, receipt_id)
+
+    assert holds.release_expired_holds(memory_conn) == 1
+    assert payment_status(memory_conn, receipt_id) == "failed"
+    placed = {row[0] for row in memory_conn.execute("SELECT customer_id FROM Participates WHERE room_id = 1")}
+    assert placed == {2}
+    assert shared_rooms.available_beds(memory_conn, 1) == 0
+    assert bookings.confirm_hold(memory_conn, 1, receipt_id) == bookings.HOLD_EXPIRED
@@ -0,0 +1,87 @@
+"""
+match_pending: customers it could not place are marked attempted unless a
+match input (the queue or the shared rooms) changed while it was solving.
+"""
+import os
+import shutil
+
+import pytest
+
+from realestate import matching, schema
+from realestate.db import create_connection
+from realestate.repository import shared_rooms
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "real_estate.db")
+    shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), path)
+    schema.init_database(path)
+    return path
+
+def waiting_customers(conn, count):
+    rows = conn.execute("""
+        SELECT customer_id FROM Customer
+        WHERE customer_id NOT IN (SELECT customer_id FROM Participates)
+        ORDER BY customer_id LIMIT ?
+    """, (count,)).fetchall()
+    return [row[0] for row in rows]
+
+def run_with_commit_during_solve(monkeypatch, db_file, write):
+    """match_pending() with write(conn) committed from another connection while it solves."""
+    solve = matching.solve_match_problem
+
+    def solve_and_write(*args):
+        other = create_connection(db_file)
+        try:
+            write(other)
+        finally:
+            other.close()
+        return solve(*args)
+
+    monkeypatch.setattr(matching, "solve_match_problem", solve_and_write)
+    conn = create_connection(db_file)
+    try:
+        return matching.match_pending(conn)
+    finally:
+        conn.close()
+
+def attempted(db_file, customer_id):
+    conn = create_connection(db_file)
+    try:
+        return conn.execute("SELECT attempted FROM RoommateMatchQueue WHERE customer_id = ?",
+                            (customer_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_unrelated_commit_does_not_keep_customers_pending(monkeypatch, db_file):
+    conn = create_connection(db_file)
+    conn.execute("DELETE FROM RoommateMatchQueue")
+    conn.commit()
+    customer_id, = waiting_customers(conn, 1)
+    shared_rooms.save_roommate_preferences(conn, customer_id, city="Nowhere")
+    conn.close()
+
+    def unrelated(other):
+        other.execute("UPDATE HomeOwner SET verification_status = verification_status")
+        other.commit()
+
+    result = run_with_commit_during_solve(monkeypatch, db_file, unrelated)
+    assert result["placed"] == 0
+    assert attempted(db_file, customer_id) == 1
+
+def test_new_queue_entry_during_solve_keeps_customers_pending(monkeypatch, db_file):
+    conn = create_connection(db_file)
+    conn.execute("DELETE FROM RoommateMatchQueue")
+    conn.commit()
+    customer_id, newcomer = waiting_customers(conn, 2)
+    shared_rooms.save_roommate_preferences(conn, customer_id, city="Nowhere")
+    conn.close()
+
+    def queue_newcomer(other):
+        shared_rooms.save_roommate_preferences(other, newcomer, city="Nowhere")
+
+    run_with_commit_during_solve(monkeypatch, db_file, queue_newcomer)
+    assert attempted(db_file, customer_id) == 0
+    assert attempted(db_file, newcomer) == 0
@@ -0,0 +1,45 @@
+"""
+PriceEstimator: processes sharing a database each hold the models in
+memory, but only one of them consumes PriceModelDirty when it refits.
+"""
+import os
+import shutil
+
+import pytest
+
+from realestate import pricing, schema
+from realestate.db import create_connection
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "real_estate.db")
+    shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), path)
+    schema.init_database(path)
+    return path
+
+def test_models_refitted_by_another_process_are_reloaded(db_file):
+    fitter = pricing.PriceEstimator(db_file)
+    other = pricing.PriceEstimator(db_file)
+    fitter.run_once()
+    other.run_once()
+    before = other.estimate("rent", "", "apartment", 1000)["estimate"]
+
+    conn = create_connection(db_file)
+    conn.execute("UPDATE Property SET rent = rent * 3 WHERE sale_renting = 'rent'")
+    conn.commit()
+    conn.close()
+    assert fitter.run_once() > 0           # consumes the dirty strata
+    assert other.run_once() == 0           # nothing left queued for this process
+    after = other.estimate("rent", "", "apartment", 1000)["estimate"]
+    assert after == pytest.approx(fitter.estimate("rent", "", "apartment", 1000)["estimate"])
+    assert after > before * 2
+
+def test_reload_only_estimator_never_fits(db_file):
+    reader = pricing.PriceEstimator(db_file, refit=False)
+    reader.run_once()
+    assert reader.models == {}
+    pricing.PriceEstimator(db_file).run_once()
+    reader.run_once()
+    assert reader.models
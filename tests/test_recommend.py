@@ -0,0 +1,58 @@
+"""
+NeighbourRefresher: several processes share PropertyNeighbourDirty, so only
+the lease holder may consume it (each process has its own in-memory index).
+"""
+import os
+import shutil
+
+import pytest
+
+from realestate import recommend, schema
+from realestate.db import create_connection
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "real_estate.db")
+    shutil.copy(os.path.join(REPO_DIR, "real_estate.db"), path)
+    schema.init_database(path)
+    return path
+
+def queued(db_file):
+    conn = create_connection(db_file)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM PropertyNeighbourDirty").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_only_the_lease_holder_consumes_the_dirty_queue(db_file):
+    first = recommend.NeighbourRefresher(db_file)
+    second = recommend.NeighbourRefresher(db_file)
+    second.worker = "other-host:1"
+    assert first.run_once() > 0          # builds its index and every neighbour list
+    assert second.run_once() == 0
+
+    conn = create_connection(db_file)
+    conn.execute("UPDATE Property SET rent = rent * 2 WHERE property_id = "
+                 "(SELECT MIN(property_id) FROM Property WHERE is_available = 1)")
+    conn.commit()
+    assert second.run_once() == 0 and queued(db_file) == 1
+    assert first.run_once() > 0 and queued(db_file) == 0
+    conn.close()
+
+def test_a_worker_taking_over_the_lease_rebuilds_its_index(db_file):
+    first = recommend.NeighbourRefresher(db_file)
+    second = recommend.NeighbourRefresher(db_file)
+    second.worker = "other-host:1"
+    first.run_once()
+    second.run_once()
+    assert not second.similar.built
+
+    conn = create_connection(db_file)
+    conn.execute("UPDATE PropertyNeighbourLease SET lease_expires_at = 0")   # first stopped renewing
+    conn.commit()
+    listings = len(recommend.load_listing_rows(conn))
+    assert second.run_once() == listings
+    assert first.run_once() == 0 and not first.similar.built
+    conn.close()
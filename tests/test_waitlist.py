@@ -0,0 +1,35 @@
+"""
+promote_waitlist: freed beds go to the head of the room's queue, highest
+priority first and first come within a priority.
+"""
+from realestate import waitlist
+from realestate.repository import shared_rooms
+
+def free_bed_and_promote(conn, room_id=1):
+    cur = conn.cursor()
+    cur.execute("UPDATE SharedRoom SET available_beds = available_beds + 1 WHERE room_id = ?", (room_id,))
+    promoted = shared_rooms.promote_waitlist(cur, room_id)
+    conn.commit()
+    return promoted
+
+def test_promotes_by_priority_then_arrival(memory_conn):
+    cur = memory_conn.cursor()
+    waitlist.join_waitlist(cur, 1, 1, priority=0)
+    waitlist.join_waitlist(cur, 1, 2, priority=1)
+    waitlist.join_waitlist(cur, 1, 3, priority=1)
+    waitlist.join_waitlist(cur, 1, 4, priority=0)
+    memory_conn.commit()
+    assert waitlist.waitlist_position(cur, 1, 3) == 2
+
+    assert free_bed_and_promote(memory_conn) == [2]
+    assert free_bed_and_promote(memory_conn) == [3]
+    assert waitlist.waitlist_head(cur, 1, 5) == [(1, 1), (4, 4)]
+    placed = {row[0] for row in cur.execute("SELECT customer_id FROM Participates WHERE room_id = 1")}
+    assert placed == {2, 3}
+    assert shared_rooms.available_beds(memory_conn, 1) == 0
+
+def test_full_room_promotes_nobody(memory_conn):
+    cur = memory_conn.cursor()
+    waitlist.join_waitlist(cur, 1, 1)
+    assert shared_rooms.promote_waitlist(cur, 1) == []
+    assert waitlist.waitlist_position(cur, 1, 1) == 1
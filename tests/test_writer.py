@@ -0,0 +1,79 @@
+"""
+WriteQueue: jobs in one group commit run in savepoints of their own, so a
+job that fails or rolls back undoes only its own writes.
+"""
+import sqlite3
+
+import pytest
+
+from realestate import writer
+from realestate.db import create_connection
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "writer.db")
+    conn = create_connection(path)
+    conn.execute("CREATE TABLE Item (item_id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    return path
+
+def add_item(conn, item_id, name):
+    conn.execute("INSERT INTO Item (item_id, name) VALUES (?, ?)", (item_id, name))
+    conn.commit()
+    return item_id
+
+def add_item_then_fail(conn, item_id, name):
+    conn.execute("INSERT INTO Item (item_id, name) VALUES (?, ?)", (item_id, name))
+    raise ValueError(f"rejected {name}")
+
+def add_item_then_back_out(conn, item_id, name):
+    conn.execute("INSERT INTO Item (item_id, name) VALUES (?, ?)", (item_id, name))
+    conn.rollback()
+    return None
+
+def items(db_file):
+    conn = create_connection(db_file)
+    try:
+        return [tuple(row) for row in conn.execute("SELECT item_id, name FROM Item ORDER BY item_id")]
+    finally:
+        conn.close()
+
+def test_failing_job_rolls_back_only_its_own_savepoint(db_file):
+    queue = writer.WriteQueue(db_file)
+    # Queued before the writer starts, so all of them land in one batch
+    futures = [
+        queue.submit(add_item, 1, "first"),
+        queue.submit(add_item_then_fail, 2, "second"),
+        queue.submit(add_item_then_back_out, 3, "third"),
+        queue.submit(add_item, 4, "fourth"),
+        queue.submit(add_item, 1, "duplicate"),
+    ]
+    queue.start()
+    try:
+        assert futures[0].result(5) == 1
+        with pytest.raises(ValueError, match="rejected second"):
+            futures[1].result(5)
+        assert futures[2].result(5) is None
+        assert futures[3].result(5) == 4
+        with pytest.raises(sqlite3.IntegrityError):
+            futures[4].result(5)
+    finally:
+        queue.stop()
+    assert items(db_file) == [(1, "first"), (4, "fourth")]
+    stats = queue.stats()
+    assert stats["batches"] == 1
+    assert stats["committed_jobs"] == 3
+    assert stats["failed_jobs"] == 2
+
+def test_each_caller_gets_its_own_result(db_file):
+    queue = writer.WriteQueue(db_file)
+    queue.start()
+    try:
+        assert queue.call(add_item, 7, "seventh") == 7
+        with pytest.raises(ValueError):
+            queue.call(add_item_then_fail, 8, "eighth")
+        assert queue.call(add_item, 9, "ninth") == 9
+    finally:
+        queue.stop()
+    assert items(db_file) == [(7, "seventh"), (9, "ninth")]